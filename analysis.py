@@ -43,9 +43,11 @@ def load_and_rank(file_path, method_name):
     return df[["id", f"{method_name}_rank"]]
 
 def sort_project_results(df):
+    # With logprob scoring, ties on the integer summary score are broken by its expected value
+    by = ["summary_score", "summary_score_expected", "composite_score"] if "summary_score_expected" in df else ["summary_score", "composite_score"]
     df_sorted = df.sort_values(
-        by=["summary_score", "composite_score"], 
-        ascending=[False, False]
+        by=by, 
+        ascending=[False] * len(by)
     ).reset_index(drop=True)
     
     df_sorted["project_rank"] = df_sorted.index + 1
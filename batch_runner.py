@@ -0,0 +1,447 @@
+"""
+batch_runner.py
+
+OpenAI Batch API execution mode for the Tree-of-Thought (ToT) pipeline.
+
+Instead of calling the API per prompt, every pipeline stage is run for all resumes at once:
+
+    E1/L1/ED1/SK1/LA1/O1 -> stage 2 -> stage 3 -> S1 -> S2 -> S3
+
+For each stage the prompts are written as JSONL in the Batch API request format
+(`<BATCH_WORK_DIR>/<stage>_<part>_requests.jsonl`), submitted, polled until the batch finishes, and the
+outputs are fed into the next stage. Prompts already in the LLM response cache are not submitted, and
+batch outputs are written back to it. Requests the batch could not answer are sent directly as a fallback.
+
+Two batch clients share the same `submit` / `poll` / `download` interface:
+- `OpenAIBatchClient`: the real Batch API, or any compatible endpoint via `base_url` (e.g. a local stand-in server).
+- `LocalBatchClient`: in-process stand-in that answers each line immediately, for tests and offline runs.
+"""
+
+import json
+import os
+import time
+from openai import OpenAI
+import prompts
+from prompts import (
+    TOT_CHAINS, CHAIN_STAGE_PREFIXES, S1_prompt, S2_prompt, S3_prompt, SCORE_RESPONSE_FORMAT,
+    ScoreParseError, arepair_score_output, call_openai, completion_cache_key, local_chain_result, local_step1_output, parse_score_output,
+    run_sync, stage_route
+)
+from jd_distill import distill_job_description
+from summary_model import get_summary_model
+from section_memo import get_chain_memo
+from jd_constraints import pruned_chain_result
+from main_config import (
+    BATCH_BASE_URL,
+    BATCH_WORK_DIR,
+    BATCH_POLL_SECONDS,
+    BATCH_MAX_REQUESTS,
+    DISTILL_JOB_DESCRIPTION
+)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+# --- Batch Clients ---
+
+class OpenAIBatchClient:
+    """
+    Submits request files to the OpenAI Batch API.
+
+    Args:
+        client (OpenAI | None): Client to use. Defaults to one pointed at `base_url`.
+        base_url (str | None): Alternative API root, e.g. a local stand-in batch endpoint. None uses OpenAI.
+    """
+
+    def __init__(self, client=None, base_url=BATCH_BASE_URL):
+        self.client = client or OpenAI(base_url=base_url)
+
+    def submit(self, path, stages=None):
+        """
+        Uploads a request file and starts its batch. `stages` (custom_id -> pipeline stage) is recorded in the
+        batch metadata.
+        """
+        with open(path, "rb") as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window="24h",
+            metadata={"stages": " ".join(sorted(set(stages.values())))[:512]} if stages else None
+        )
+        return batch.id
+
+    def poll(self, batch_id):
+        """
+        Returns (status, output_file_id, error_file_id).
+        """
+        batch = self.client.batches.retrieve(batch_id)
+        return batch.status, batch.output_file_id, batch.error_file_id
+
+    def download(self, file_id):
+        return self.client.files.content(file_id).text
+
+
+class LocalBatchClient:
+    """
+    In-process stand-in for the Batch API. Each submitted line is answered with `complete(body)` and the
+    results are returned in the Batch API output format, so the full batch pipeline can be exercised offline.
+
+    Args:
+        complete (callable | None): Maps (request body, pipeline stage) to the completion text. Defaults to
+            `call_openai`, so the answers show up in the run metrics under their stage.
+    """
+
+    def __init__(self, complete=None):
+        self.complete = complete or (
+            lambda body, stage: call_openai(body["messages"][-1]["content"], model=body["model"], temperature=body["temperature"],
+                                            stage=stage, response_format=body.get("response_format"), max_tokens=body.get("max_tokens"))
+        )
+        self._files = {}
+
+    def submit(self, path, stages=None):
+        results = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                request = json.loads(line)
+                try:
+                    content = self.complete(request["body"], (stages or {}).get(request["custom_id"]))
+                    results.append({
+                        "custom_id": request["custom_id"],
+                        "response": {"status_code": 200, "body": {"choices": [{"message": {"role": "assistant", "content": content}}]}},
+                        "error": None
+                    })
+                except Exception as e:
+                    results.append({"custom_id": request["custom_id"], "response": None, "error": {"message": str(e)}})
+
+        batch_id = f"local_batch_{len(self._files) + 1}"
+        self._files[batch_id] = "\n".join(json.dumps(result) for result in results)
+        return batch_id
+
+    def poll(self, batch_id):
+        return "completed", batch_id, None
+
+    def download(self, file_id):
+        return self._files[file_id]
+
+
+# --- Stage Execution ---
+
+def _write_requests(path, pending, model, temperature, response_format=None, max_tokens=None):
+    with open(path, "w", encoding="utf-8") as f:
+        for custom_id, messages in pending:
+            body = {"model": model, "messages": messages, "temperature": temperature}
+            if response_format:
+                body["response_format"] = response_format
+            if max_tokens:
+                body["max_tokens"] = max_tokens
+            f.write(json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": body
+            }, ensure_ascii=False) + "\n")
+
+
+def run_batch_stage(batch_client, stage_name, stage_prompts, model=None, temperature=None,
+                    work_dir=BATCH_WORK_DIR, poll_seconds=BATCH_POLL_SECONDS, max_requests=BATCH_MAX_REQUESTS,
+                    response_format=None, max_tokens=None, route_stage=None, stages=None, stop_fields=None):
+    """
+    Runs one pipeline stage through the batch API.
+
+    Args:
+        batch_client: `OpenAIBatchClient` or `LocalBatchClient`.
+        stage_name (str): Used in file names and log lines.
+        stage_prompts (dict): custom_id -> prompt text.
+        model, temperature, max_tokens: Override the route of `route_stage` (defaults to `stage_name`) in the
+            active routing profile.
+        max_requests (int): Maximum number of lines per batch file (the API limit is 50,000).
+        response_format (dict | None): Passed through in every request body (e.g. JSON mode for scoring stages).
+        stages (dict | None): custom_id -> pipeline stage of each prompt (e.g. "E1"), for the batch client and the
+            direct fallback calls. Defaults to `route_stage`.
+        stop_fields (dict | None): custom_id -> the fields the caller parses, as the async engine passes them to
+            `acall_openai`, so both modes share response cache entries.
+
+    Returns:
+        dict: custom_id -> output text. Prompts whose direct fallback call failed too are left out.
+    """
+    route = stage_route(route_stage or stage_name)
+    model = route.model if model is None else model
+    temperature = route.temperature if temperature is None else temperature
+    max_tokens = route.max_tokens if max_tokens is None else max_tokens
+
+    route_stage = route_stage or stage_name
+    stages = stages or {custom_id: route_stage for custom_id in stage_prompts}
+    stop_fields = stop_fields or {}
+
+    def cache_key(custom_id, messages):
+        return completion_cache_key(model, temperature, messages, response_format=response_format, max_tokens=max_tokens,
+                                    stop_fields=stop_fields.get(custom_id))
+
+    outputs = {}
+    pending = {}
+    for custom_id, prompt in stage_prompts.items():
+        messages = [{"role": "user", "content": prompt}]
+        cached = prompts.response_cache.get(cache_key(custom_id, messages))
+        if cached is not None:
+            outputs[custom_id] = cached
+        else:
+            pending[custom_id] = messages
+
+    if not pending:
+        print(f"[INFO] Stage {stage_name}: all {len(outputs)} prompts served from cache")
+        return outputs
+
+    # Split into files under the per-batch request limit and submit them all before polling
+    os.makedirs(work_dir, exist_ok=True)
+    items = list(pending.items())
+    batch_ids = []
+    for part, start in enumerate(range(0, len(items), max_requests), start=1):
+        path = os.path.join(work_dir, f"{stage_name}_{part}_requests.jsonl")
+        _write_requests(path, items[start:start + max_requests], model, temperature, response_format, max_tokens)
+        batch_ids.append(batch_client.submit(path, {custom_id: stages[custom_id] for custom_id, _ in items[start:start + max_requests]}))
+    print(f"[INFO] Stage {stage_name}: submitted {len(pending)} prompts in {len(batch_ids)} batch(es), {len(outputs)} served from cache")
+
+    statuses = {}
+    while len(statuses) < len(batch_ids):
+        for batch_id in batch_ids:
+            if batch_id in statuses:
+                continue
+            status, output_file_id, error_file_id = batch_client.poll(batch_id)
+            if status in TERMINAL_STATUSES:
+                statuses[batch_id] = (status, output_file_id)
+        if len(statuses) < len(batch_ids):
+            time.sleep(poll_seconds)
+
+    for part, batch_id in enumerate(batch_ids, start=1):
+        status, output_file_id = statuses[batch_id]
+        if not output_file_id:
+            print(f"[WARN] Batch {batch_id} for stage {stage_name} ended with status '{status}' and no output")
+            continue
+
+        output_text = batch_client.download(output_file_id)
+        with open(os.path.join(work_dir, f"{stage_name}_{part}_results.jsonl"), "w", encoding="utf-8") as f:
+            f.write(output_text)
+
+        for line in output_text.splitlines():
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            response = result.get("response") or {}
+            if result.get("error") or response.get("status_code") != 200:
+                continue
+            custom_id = result["custom_id"]
+            content = response["body"]["choices"][0]["message"]["content"].strip()
+            outputs[custom_id] = content
+            prompts.response_cache.set(cache_key(custom_id, pending[custom_id]), content)
+
+    # Anything the batches did not answer (failed lines, expired batches) is sent directly; a prompt that fails
+    # there as well only costs its own resume (see `run_tot_batch`)
+    unanswered = [custom_id for custom_id in pending if custom_id not in outputs]
+    if unanswered:
+        print(f"[WARN] Stage {stage_name}: {len(unanswered)} prompts got no batch result, sending them directly")
+        for custom_id in unanswered:
+            try:
+                outputs[custom_id] = call_openai(pending[custom_id][-1]["content"], model=model, temperature=temperature,
+                                                 stage=stages[custom_id], response_format=response_format,
+                                                 max_tokens=max_tokens, stop_fields=stop_fields.get(custom_id))
+            except Exception as e:
+                print(f"[WARN] Stage {stage_name}: prompt {custom_id} failed after retries: {type(e).__name__}: {e}")
+
+    return outputs
+
+
+# --- Full ToT Pipeline ---
+
+def run_chain_stage(batch_client, step, stage_prompts, response_format=None):
+    """
+    Runs step 1, 2 or 3 of the category chains (custom_id = "<resume index>|<category>") as one batch per
+    distinct route, since categories can be routed to different models (e.g. SK1 on a smaller model than E1).
+    Step 3 answers are cached under the score and note fields, like `prompts.arun_score_stage` does.
+
+    Returns:
+        dict: custom_id -> output text.
+    """
+    groups = {}
+    for custom_id, prompt in stage_prompts.items():
+        stage = f"{CHAIN_STAGE_PREFIXES[custom_id.split('|')[1]]}{step}"
+        groups.setdefault(stage_route(stage), {})[custom_id] = (stage, prompt)
+
+    outputs = {}
+    for route, group in groups.items():
+        stage_name = f"stage{step}" if len(groups) == 1 else f"stage{step}_{route.model}"
+        # Stages sharing a route share a batch; each prompt keeps its own stage label
+        stop_fields = None
+        if step == 3:
+            stop_fields = {custom_id: [f"{custom_id.split('|')[1]}_score", f"{custom_id.split('|')[1]}_note"] for custom_id in group}
+        outputs.update(run_batch_stage(
+            batch_client, stage_name, {custom_id: prompt for custom_id, (_, prompt) in group.items()},
+            model=route.model, temperature=route.temperature, max_tokens=route.max_tokens,
+            response_format=response_format, route_stage=next(iter(group.values()))[0],
+            stages={custom_id: stage for custom_id, (stage, _) in group.items()}, stop_fields=stop_fields
+        ))
+    return outputs
+
+
+def _parse_or_repair(prompt, output, category, stage):
+    # Unparseable scoring answers are re-asked directly, one request each, instead of failing the whole batch
+    try:
+        return parse_score_output(output, category)
+    except ScoreParseError:
+        return run_sync(arepair_score_output(prompt, output, category, stage))
+
+
+def run_tot_batch(resumes, job_description, ids=None, batch_client=None, distill_jd=DISTILL_JOB_DESCRIPTION):
+    """
+    Evaluates all resumes with the ToT chains, one Batch API round per pipeline stage.
+
+    Args:
+        resumes (list[dict]): Parsed resume dictionaries.
+        job_description (str): Job description string.
+        ids (list[int] | None): Result ids for the resumes. Defaults to position + 1.
+        batch_client: Batch client to use. Defaults to `OpenAIBatchClient()`.
+        distill_jd (bool): If True, give each chain only its slice of the distilled job description.
+
+    Returns:
+        list[dict | None]: One result row per resume (same schema as `tot_engine.evaluate_resumes`), in input order.
+            Resumes whose scoring answers could not be parsed even after repair, or with a prompt that failed in
+            the batch and in its direct fallback call, are None.
+    """
+    batch_client = batch_client or OpenAIBatchClient()
+    if ids is None:
+        ids = [i + 1 for i in range(len(resumes))]
+    job_requirements = distill_job_description(job_description) if distill_jd and resumes else None
+
+    def job_context(category):
+        return job_requirements[category] if job_requirements else job_description
+
+    # Category chains: custom_id = "<resume index>|<category>". With the section memo, a memoized chain runs once
+    # per canonical section (or, for the languages chain, per canonical step 1 answer): later resumes with the
+    # same key copy the result of the first one
+    memo = get_chain_memo()
+    stage1_prompts, local_stage1, local_results = {}, {}, {}
+    memo_keys, memo_leaders, memo_followers = {}, {}, {}
+
+    def claim(i, category, memo_key):
+        # Returns True if resume i runs the memoized chain itself (first resume with this key and no stored result)
+        if memo_key in memo_leaders:
+            memo.hits += 1
+            memo_followers[(i, category)] = memo_leaders[memo_key]
+            return False
+        cached = memo.get(memo_key)
+        if cached is not None:
+            local_results[(i, category)] = cached[:2]
+            return False
+        memo_leaders[memo_key] = i
+        memo_keys[(i, category)] = memo_key
+        return True
+
+    for i, resume in enumerate(resumes):
+        for category, (extract_section, step1_prompt, _, _) in TOT_CHAINS.items():
+            local_result = pruned_chain_result(category, job_description) or local_chain_result(category, resume, job_context(category))
+            if local_result is not None:
+                local_results[(i, category)] = local_result
+                continue
+            memo_key = memo.key(category, resume, job_context(category)) if memo else None
+            if memo_key is not None and not claim(i, category, memo_key):
+                continue
+            local_output = local_step1_output(category, resume, job_context(category))
+            if local_output is not None:
+                local_stage1[f"{i}|{category}"] = local_output
+            else:
+                stage1_prompts[f"{i}|{category}"] = step1_prompt(extract_section(resume), job_context(category))
+    stage1 = {**run_chain_stage(batch_client, 1, stage1_prompts), **local_stage1}
+
+    # Chains memoized by their step 1 answer (e.g. languages) only know their key now
+    if memo:
+        for custom_id, output in list(stage1.items()):
+            i, category = custom_id.split("|")
+            if memo.extracts_first(category) and not claim(int(i), category, memo.extract_key(category, output, job_context(category))):
+                del stage1[custom_id]
+
+    stage2_prompts = {}
+    for custom_id, output in stage1.items():
+        category = custom_id.split("|")[1]
+        stage2_prompts[custom_id] = TOT_CHAINS[category][2](output, job_context(category))
+    stage2 = run_chain_stage(batch_client, 2, stage2_prompts)
+
+    stage3_prompts = {}
+    for custom_id, output in stage2.items():
+        category = custom_id.split("|")[1]
+        stage3_prompts[custom_id] = TOT_CHAINS[category][3](output)
+    stage3 = run_chain_stage(batch_client, 3, stage3_prompts, response_format=SCORE_RESPONSE_FORMAT)
+
+    rows = [{} for _ in resumes]
+    failed = set()
+    for (i, category), (score, note) in local_results.items():
+        rows[i][f"{category}_score"] = score
+        rows[i][f"{category}_note"] = note
+    for custom_id, output in stage3.items():
+        i, category = custom_id.split("|")
+        try:
+            score, note = _parse_or_repair(stage3_prompts[custom_id], output, category, f"{CHAIN_STAGE_PREFIXES[category]}3")
+        except ScoreParseError as e:
+            print(f"[WARN] Resume #{ids[int(i)]} skipped: {e}")
+            failed.add(int(i))
+            continue
+        rows[int(i)][f"{category}_score"] = score
+        rows[int(i)][f"{category}_note"] = note
+    for (i, category), memo_key in memo_keys.items():
+        if f"{category}_score" in rows[i]:
+            memo.put(memo_key, rows[i][f"{category}_score"], rows[i][f"{category}_note"])
+    for (i, category), leader in memo_followers.items():
+        if f"{category}_score" in rows[leader]:
+            rows[i][f"{category}_score"] = rows[leader][f"{category}_score"]
+            rows[i][f"{category}_note"] = rows[leader][f"{category}_note"]
+        else:
+            failed.add(i)
+    for i, row in enumerate(rows):
+        if i not in failed and any(f"{category}_score" not in row for category in TOT_CHAINS):
+            print(f"[WARN] Resume #{ids[i]} skipped: a category chain failed after retries")
+            failed.add(i)
+
+    # Summary chain: custom_id = "<resume index>"; confident summaries of the local summary model skip it
+    scored = [i for i in range(len(rows)) if i not in failed]
+    summary_model = get_summary_model()
+    if summary_model is not None:
+        for i in scored:
+            local_summary = summary_model.score_row(rows[i])
+            if local_summary is not None:
+                rows[i]["summary_score"], rows[i]["summary_note"] = local_summary
+                rows[i]["summary_source"] = "local"
+        scored = [i for i in scored if "summary_score" not in rows[i]]
+    s1 = run_batch_stage(batch_client, "S1", {
+        str(i): S1_prompt(
+            rows[i]["experience_score"], rows[i]["experience_note"],
+            rows[i]["location_score"], rows[i]["location_note"],
+            rows[i]["education_score"], rows[i]["education_note"],
+            rows[i]["skills_score"], rows[i]["skills_note"],
+            rows[i]["languages_score"], rows[i]["languages_note"],
+            rows[i]["other_score"], rows[i]["other_note"]
+        )
+        for i in scored
+    })
+    s2 = run_batch_stage(batch_client, "S2", {str(i): S2_prompt(s1[str(i)], job_context("summary")) for i in scored if str(i) in s1})
+    s3_prompts = {str(i): S3_prompt(s2[str(i)]) for i in scored if str(i) in s2}
+    s3 = run_batch_stage(batch_client, "S3", s3_prompts, response_format=SCORE_RESPONSE_FORMAT,
+                         stop_fields={custom_id: ["summary_score", "summary_note"] for custom_id in s3_prompts})
+
+    # Resumes whose scoring answers stayed unparseable are None, like failed resumes of the async engine
+    results = []
+    for i, row in enumerate(rows):
+        if i not in failed and "summary_score" not in row:
+            if str(i) not in s3:
+                print(f"[WARN] Resume #{ids[i]} skipped: the summary chain failed after retries")
+                failed.add(i)
+            else:
+                try:
+                    row["summary_score"], row["summary_note"] = _parse_or_repair(s3_prompts[str(i)], s3[str(i)], "summary", "S3")
+                except ScoreParseError as e:
+                    print(f"[WARN] Resume #{ids[i]} skipped: {e}")
+                    failed.add(i)
+        results.append(None if i in failed else {"id": ids[i], **row})
+    print(f"[INFO] Batch ToT evaluation finished for {len(results)} resumes")
+    return results
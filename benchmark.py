@@ -0,0 +1,166 @@
+"""
+benchmark.py
+
+Offline throughput benchmark for the Tree-of-Thought (ToT) and one-shot pipelines.
+
+All LLM calls go to `FakeLLMBackend`, so no API key is needed and no money is spent. For each corpus size
+the benchmark evaluates a synthetic corpus (the resumes from `RESUME_FILE_PATH`, made unique per candidate)
+and reports:
+- resumes per second,
+- p50 / p99 wall-clock latency per resume,
+- peak Python memory allocated during the run (tracemalloc; disable with --no-memory, as tracing slows the run),
+- the number of LLM calls made.
+
+The response cache, the section memo and the result store are bypassed (the job description distillation runs
+on an in-memory store), so nothing is reused across resumes or from earlier runs and the benchmark never writes
+to the persistent caches. Stages that are answered locally in production are answered locally here too: the
+skills match, gazetteer locations and chains the job description does not constrain make no LLM calls, so a ToT
+resume makes fewer calls than the 21 prompts of a full evaluation.
+
+Usage:
+    python benchmark.py --sizes 10 100 1000 10000 100000 --latency 0.3 --jitter 0.2 --error-rate 0.01 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import csv
+import time
+import tracemalloc
+import prompts
+from prompts import arun_oneshot_scores
+from llm_backends import FakeLLMBackend
+from llm_cache import NullResponseCache
+from result_cache import ResultStore
+from section_memo import set_chain_memo
+from scheduler import RequestScheduler
+from metrics import collector as metrics
+from tot_engine import evaluate_resume_async
+from jd_distill import adistill_job_description
+from data_loader import load_resumes
+from main_config import JOB_DESCRIPTION, RESUME_FILE_PATH, DISTILL_JOB_DESCRIPTION
+
+RESULT_FIELDS = [
+    "mode", "resumes", "seconds", "resumes_per_second",
+    "p50_latency_seconds", "p99_latency_seconds", "peak_memory_mb", "llm_calls"
+]
+
+
+def synthetic_corpus(count, templates):
+    """
+    Returns `count` resumes cycled from `templates`, each made unique so no two prompts are identical.
+    """
+    corpus = []
+    for i in range(count):
+        template = templates[i % len(templates)]
+        corpus.append({
+            **template,
+            "name": f"{template['name']} #{i + 1}",
+            "summary": f"{template['summary']} (candidate {i + 1})"
+        })
+    return corpus
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+async def run_pipeline(mode, resumes, job_description, concurrency):
+    """
+    Evaluates `resumes` with at most `concurrency` resumes in flight.
+
+    Returns:
+        tuple: (total seconds, sorted per-resume latencies)
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    job_requirements = None
+    if mode == "tot" and DISTILL_JOB_DESCRIPTION:
+        job_requirements = await adistill_job_description(job_description, result_store=ResultStore(":memory:"))
+
+    async def evaluate(resume):
+        async with semaphore:
+            started = time.perf_counter()
+            if mode == "tot":
+                await evaluate_resume_async(resume, job_description, job_requirements)
+            else:
+                await arun_oneshot_scores(resume, job_description)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(evaluate(resume) for resume in resumes))
+    return time.perf_counter() - started, sorted(latencies)
+
+
+def benchmark(mode, size, templates, concurrency, backend, trace_memory=True):
+    """
+    Runs one (mode, corpus size) measurement and returns its result row.
+    """
+    metrics.reset()
+    calls_before = backend.calls
+    if trace_memory:
+        tracemalloc.start()
+
+    resumes = synthetic_corpus(size, templates)
+    seconds, latencies = asyncio.run(run_pipeline(mode, resumes, JOB_DESCRIPTION, concurrency))
+
+    peak_memory = 0
+    if trace_memory:
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        "mode": mode,
+        "resumes": size,
+        "seconds": round(seconds, 3),
+        "resumes_per_second": round(size / seconds, 2) if seconds else 0.0,
+        "p50_latency_seconds": round(_percentile(latencies, 0.50), 4),
+        "p99_latency_seconds": round(_percentile(latencies, 0.99), 4),
+        "peak_memory_mb": round(peak_memory / (1024 * 1024), 1),
+        "llm_calls": backend.calls - calls_before
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline ToT vs one-shot throughput benchmark on the fake LLM backend.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="Corpus sizes to run.")
+    parser.add_argument("--modes", nargs="+", default=["tot", "oneshot"], choices=["tot", "oneshot"])
+    parser.add_argument("--concurrency", type=int, default=64, help="Resumes in flight at once.")
+    parser.add_argument("--latency", type=float, default=0.2, help="Mean fake LLM latency (seconds).")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Uniform +/- latency jitter (seconds).")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of a simulated 429 per call.")
+    parser.add_argument("--rpm", type=int, default=None, help="Scheduler requests-per-minute limit (default: none).")
+    parser.add_argument("--tpm", type=int, default=None, help="Scheduler tokens-per-minute limit (default: none).")
+    parser.add_argument("--base-backoff", type=float, default=1.0, help="Scheduler backoff before the first retry (seconds).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc peak-memory tracking.")
+    parser.add_argument("--output", default=None, help="Optional CSV file for the results.")
+    args = parser.parse_args()
+
+    backend = FakeLLMBackend(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, seed=args.seed)
+    prompts.set_llm_backend(backend)
+    prompts.set_response_cache(NullResponseCache())
+    set_chain_memo(None)
+    prompts.set_scheduler(RequestScheduler(rpm=args.rpm, tpm=args.tpm, base_backoff=args.base_backoff))
+
+    templates = load_resumes(RESUME_FILE_PATH)
+    results = []
+    print(" | ".join(RESULT_FIELDS))
+    for size in args.sizes:
+        for mode in args.modes:
+            row = benchmark(mode, size, templates, args.concurrency, backend, trace_memory=not args.no_memory)
+            results.append(row)
+            print(" | ".join(str(row[field]) for field in RESULT_FIELDS))
+
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+            writer.writeheader()
+            writer.writerows(results)
+        print(f"[INFO] Benchmark results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+cascade.py
+
+Two-tier cascade evaluation: a cheap one-shot screen for every resume, then the full Tree-of-Thought (ToT)
+chains only for the contenders.
+
+A resume is promoted to the ToT tier when its one-shot summary_score is at or above `score_threshold`, or when
+it is within `margin` points of the `top_k`-th best one-shot score (a safety band around the cutoff, since
+one-shot scores are noisier than ToT scores). Resumes whose one-shot score could not be parsed are promoted too,
+unless the BM25 prefilter dropped them before the one-shot screen.
+
+The output is one DataFrame with the usual result columns plus `tier` ("tot" or "oneshot"), recording which
+pipeline produced each row.
+"""
+
+import pandas as pd
+from data_loader import load_or_generate_ats_results, run_or_load_oneshot_evaluation
+from oneshot import ONESHOT_COLUMNS
+from prefilter import prefilter_query, prefilter_resumes
+from main_config import CASCADE_SCORE_THRESHOLD, CASCADE_TOP_K, CASCADE_MARGIN, CASCADE_RESULTS_PATH, PREFILTER_ENABLED, PREFILTER_MODE
+
+
+def select_contenders(oneshot_results, score_threshold=CASCADE_SCORE_THRESHOLD, top_k=CASCADE_TOP_K, margin=CASCADE_MARGIN):
+    """
+    Returns a boolean Series (aligned with `oneshot_results`) marking the resumes promoted to full ToT.
+    """
+    scores = pd.to_numeric(oneshot_results["summary_score"], errors="coerce")
+    contenders = scores.isna() | (scores >= score_threshold)
+
+    if top_k and scores.notna().any():
+        ranked = scores.dropna().sort_values(ascending=False)
+        kth_score = ranked.iloc[min(top_k, len(ranked)) - 1]
+        contenders |= scores >= kth_score - margin
+
+    return contenders
+
+
+def run_cascade_evaluation(resumes, job_description, score_threshold=CASCADE_SCORE_THRESHOLD, top_k=CASCADE_TOP_K,
+                           margin=CASCADE_MARGIN, save_path=CASCADE_RESULTS_PATH, force_rerun=False,
+                           prefilter=PREFILTER_ENABLED):
+    """
+    Scores every resume with the one-shot prompt, then runs the full ToT chains only on the contenders.
+
+    Args:
+        resumes (list[dict]): Parsed resume dictionaries.
+        job_description (str): Job description string.
+        score_threshold (int): One-shot summary_score at or above which a resume is always promoted.
+        top_k (int | None): Size of the top band that is always promoted. None/0 disables the band.
+        margin (int): Extra points below the top_k-th score that are still promoted.
+        save_path (str | None): File to save the merged results to. None skips saving.
+        force_rerun (bool): If True, ignore cached one-shot and ToT results.
+        prefilter (bool): If True, run the BM25 prefilter before the one-shot screen.
+
+    Returns:
+        pd.DataFrame: One row per resume with the result columns, `composite_score` and `tier`.
+    """
+    oneshot_results = run_or_load_oneshot_evaluation(resumes, job_description, use_cache=not force_rerun, prefilter=prefilter)
+    oneshot_results = oneshot_results.sort_values("id").reset_index(drop=True)
+
+    contenders = select_contenders(oneshot_results, score_threshold, top_k, margin)
+    if prefilter and PREFILTER_MODE == "drop":
+        # Resumes dropped by the prefilter have no one-shot score, but they are not contenders
+        contenders &= prefilter_resumes(resumes, prefilter_query(job_description))[1]
+    contender_ids = oneshot_results.loc[contenders, "id"].tolist()
+    print(f"[INFO] Cascade: promoting {len(contender_ids)} of {len(resumes)} resumes to full ToT evaluation")
+
+    merged = oneshot_results[ONESHOT_COLUMNS].copy()
+    merged["tier"] = "oneshot"
+
+    if contender_ids:
+        tot_results = load_or_generate_ats_results(
+            [resumes[resume_id - 1] for resume_id in contender_ids],
+            job_description,
+            load_path=None,
+            save_path=None,
+            stream_path=None,
+            force_rerun=force_rerun,
+            prefilter=False
+        )
+        # The ToT run numbers its subset 1..n; map back to the ids of the full corpus
+        tot_results["id"] = [contender_ids[i - 1] for i in tot_results["id"]]
+        tot_results = tot_results[tot_results["summary_score"].notna()].set_index("id")
+
+        promoted = merged["id"].isin(tot_results.index)
+        merged = merged.set_index("id")
+        merged.loc[tot_results.index, tot_results.columns] = tot_results
+        merged = merged.reset_index()
+        merged.loc[promoted.values, "tier"] = "tot"
+
+    if save_path:
+        merged.to_excel(save_path, index=False)
+        print(f"[INFO] Cascade results saved to {save_path}")
+    return merged
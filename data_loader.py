@@ -1,150 +1,512 @@
 # data_loader.py
 
+import csv
+import json
 import os
+import warnings
+from math import nan
+import openpyxl
 import pandas as pd
-from prompts import (
-    run_experience_chain,
-    run_location_chain,
-    run_education_chain,
-    run_skills_chain,
-    run_languages_chain,
-    run_other_chain,
-    run_summary_chain
-)
-from main_config import ONESHOT_CACHED_RESULTS_PATH
+from tot_engine import TOT_CATEGORIES, evaluate_resumes, evaluate_resume_with_id, process_stream_async
+from batch_runner import run_tot_batch
+from oneshot import evaluate_all_oneshot_resumes, ONESHOT_COLUMNS
+from jd_distill import adistill_job_description
+from prompts import run_sync, prompt_template_hash, oneshot_prompt, oneshot_packed_prompt, tot_prompt_templates, LOGPROB_COLUMNS, TOT_STAGES, route_key, describe_route
+from result_cache import get_result_store, result_key, text_hash
+from metrics import collector as metrics
+from prefilter import prefilter_query, prefilter_resumes
+from result_sink import ResultSink
+from journal import RunJournal, new_run_id
+from summary_model import get_summary_model
+from section_memo import get_chain_memo
+from jd_constraints import composite_weights, constraint_rules_text, report_unconstrained
+from main_config import ONESHOT_CACHED_RESULTS_PATH, MAX_CONCURRENT_RESUMES, DISTILL_JOB_DESCRIPTION, TOT_EXECUTION_MODE, METRICS_DIR, PREFILTER_ENABLED, PREFILTER_MODE, ATS_STREAM_RESULTS_PATH, ONESHOT_STREAM_RESULTS_PATH, LOGPROB_SCORING, ONESHOT_PACKED, CHAIN_SESSIONS, LOCAL_SUMMARY_MODEL, PRUNE_UNCONSTRAINED_CHAINS
+
+ATS_COLUMNS = [
+    "id",
+    "summary_score", "summary_note",
+    "location_score", "location_note",
+    "experience_score", "experience_note",
+    "education_score", "education_note",
+    "skills_score", "skills_note",
+    "languages_score", "languages_note",
+    "other_score", "other_note"]
+
+# Score statistics columns, present only when the scores are read from token logprobs
+SCORE_STATISTIC_COLUMNS = LOGPROB_COLUMNS if LOGPROB_SCORING else []
+
+# "local" for summaries scored by the local summary model (empty for LLM summaries), present only when it is enabled
+SUMMARY_SOURCE_COLUMNS = ["summary_source"] if LOCAL_SUMMARY_MODEL else []
+
+RESUME_FIELDS = ["name", "location", "summary", "education", "experience", "skills"]
+
+# Cell values pandas reads as missing by default
+NA_STRINGS = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"
+}
+
+
+def _resume_from_record(record):
+    """
+    Builds a resume dictionary from one input record. Empty and N/A cells become NaN, as with `pd.read_excel`,
+    so the same resume hashes to the same cache keys whatever file format it came from.
+    """
+    resume = {}
+    for field in RESUME_FIELDS:
+        value = record.get(field)
+        resume[field] = nan if value is None or (isinstance(value, str) and value in NA_STRINGS) else value
+    return resume
+
+
+def _iter_xlsx_records(path):
+    # Read-only mode streams rows from the sheet XML instead of loading the whole workbook
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell).strip() if cell is not None else "" for cell in next(rows, [])]
+        for row in rows:
+            if any(cell is not None for cell in row):
+                yield dict(zip(header, row))
+    finally:
+        workbook.close()
+
+
+def _iter_csv_records(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for record in csv.DictReader(f):
+            yield record
+
+
+def _iter_jsonl_records(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _iter_parquet_records(path, batch_size):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Reading Parquet resumes requires pyarrow (pip install pyarrow)") from e
+    parquet_file = pq.ParquetFile(path)
+    columns = [field for field in RESUME_FIELDS if field in parquet_file.schema_arrow.names]
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+        yield from batch.to_pylist()
+
+
+def iter_resumes(path="resumes.xlsx", batch_size=1024):
+    """
+    Lazily yields resume dictionaries from an .xlsx, .csv, .jsonl or .parquet file, one row at a time,
+    so a run can start scoring the first resume while the rest of the file is still unread.
+
+    Args:
+        path (str): Input file; the format is picked from its extension.
+        batch_size (int): Rows per record batch read from Parquet files.
+
+    Yields:
+        dict: One resume with the keys in `RESUME_FIELDS`.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".xlsx", ".xlsm"):
+        records = _iter_xlsx_records(path)
+    elif extension == ".csv":
+        records = _iter_csv_records(path)
+    elif extension in (".jsonl", ".ndjson"):
+        records = _iter_jsonl_records(path)
+    elif extension == ".parquet":
+        records = _iter_parquet_records(path, batch_size)
+    else:
+        raise ValueError(f"Unsupported resume file format: {path}")
+
+    for record in records:
+        yield _resume_from_record(record)
+
 
 def load_resumes(path="resumes.xlsx"):
     """
     Reads and parses resume data from an Excel file into a structured format.
     Each resume is converted into a dictionary containing key sections like name, location, summary, education, experience, and skills.
     Returns a list of these resume dictionaries for further processing.
+    CSV, JSONL and Parquet files are read as well; use `iter_resumes` to stream large files instead of loading them whole.
     """
-    df = pd.read_excel(path)
-    resumes = []
-    for _, row in df.iterrows():
-        resume = {
-            "name": row["name"],
-            "location": row["location"],
-            "summary": row["summary"],
-            "education": row["education"],
-            "experience": row["experience"],
-            "skills": row["skills"]
-        }
-        resumes.append(resume)
-    return resumes
+    return list(iter_resumes(path))
 
 
 
-def load_or_generate_ats_results(resumes, job_description, load_path="ATS_Results_Stored.xlsx", save_path="ATS_Results.xlsx", force_rerun=False):
+def _prefilter_missing(resumes, job_description, missing, mode=PREFILTER_MODE, result_store=None):
+    """
+    Applies the BM25 prefilter to the resumes that still need an LLM evaluation, scoring them against
+    `prefilter_query(job_description)`. The cutoff is computed over the whole corpus, so cached resumes still count towards it.
+
+    Returns:
+        list[int]: Indices of `missing` to evaluate ("drop": only those above the cutoff;
+        "deprioritize": all of them, strongest lexical match first).
+    """
+    scores, keep = prefilter_resumes(resumes, prefilter_query(job_description, result_store=result_store))
+    if mode == "deprioritize":
+        return sorted(missing, key=lambda i: -scores[i])
+
+    kept = [i for i in missing if keep[i]]
+    if len(kept) < len(missing):
+        print(f"[INFO] Prefilter: skipping {len(missing) - len(kept)} resumes below the BM25 cutoff")
+    return kept
+
+
+def scoring_prompt_hash(templates, summary_model=None):
+    """
+    Prompt hash the result store keys are built from. Runs with `LOGPROB_SCORING` produce extra columns, and runs
+    with a local `summary_model` produce different summaries, so their results are cached separately from plain runs.
+    """
+    prompt_hash = prompt_template_hash(templates)
+    if LOGPROB_SCORING:
+        prompt_hash = text_hash(f"{prompt_hash}|logprobs")
+    if summary_model is not None:
+        prompt_hash = text_hash(f"{prompt_hash}|summary_model:{summary_model.fingerprint}")
+    return prompt_hash
+
+
+def tot_result_identity(distill_jd, sessions, summary_model=None):
+    """
+    Returns (distill_jd, prompt_hash, model_key, model_route) of a ToT run: whether the chains really get the
+    distilled job description (chain sessions send the full text) and the result store key parts. Shared by
+    `load_or_generate_ats_results` and `stream_ats_results_async`, so both read each other's results.
+    """
+    # Distilled runs feed the chains different job text, so they are cached separately
+    distill_jd = distill_jd and not sessions
+    prompt_hash = scoring_prompt_hash(tot_prompt_templates(distill_jd, sessions), summary_model)
+    # Results are cached per route, so switching the routing profile re-evaluates with the new models
+    stages = TOT_STAGES + (["JD"] if distill_jd else [])
+    return distill_jd, prompt_hash, route_key(stages), describe_route(stages)
+
+
+def row_composite_score(row, weights=None):
+    """
+    Weighted composite of the category scores of one result row (NaN if any score is missing),
+    matching the composite_score column of `load_or_generate_ats_results`.
+    `weights` are the job's `jd_constraints.composite_weights` (the standard weights if None).
+    """
+    weights = weights or composite_weights()
+    scores = [row.get(f"{category}_score") for category in weights]
+    if any(score is None or score != score for score in scores):
+        return nan
+    return sum(weight * score for weight, score in zip(weights.values(), scores))
+
+
+def load_or_generate_ats_results(resumes, job_description, load_path=None, save_path="ATS_Results.xlsx", force_rerun=False, max_concurrency=MAX_CONCURRENT_RESUMES, result_store=None, execution_mode=TOT_EXECUTION_MODE, batch_client=None, prefilter=PREFILTER_ENABLED, stream_path=ATS_STREAM_RESULTS_PATH, resume_run=None):
     """
     Manages the ATS (Applicant Tracking System) evaluation process with caching capabilities.
-    Either loads existing evaluation results from cache or performs a full evaluation of resumes against a job description.
+    Results are cached per resume, keyed by (resume content, job description, prompt templates, model),
+    so only resumes without a valid cached result are evaluated and then merged with the cached rows.
     Implements a weighted scoring system across multiple resume components and saves results for future use.
 
     Args:
         resumes (list[dict]): Parsed resume dictionaries.
         job_description (str): Job description string.
-        load_path (str): File to load cached results from.
-        save_path (str): File to save new results to after rerun.
-        force_rerun (bool): If True, always recompute; otherwise load if exists.
+        load_path (str | None): Deprecated and ignored: results are only reused from the result store, since a
+            results snapshot has no resume or job description hashes to validate its rows against.
+        save_path (str | None): Excel file to export the merged results to at the end. None skips the export.
+        force_rerun (bool): If True, re-evaluate every resume and overwrite its cached result.
+        max_concurrency (int): Maximum number of resumes evaluated concurrently by the async ToT engine.
+        result_store (ResultStore | None): Per-resume result store. Defaults to `RESULT_STORE_PATH`.
+        execution_mode (str): "async" for the concurrent ToT engine, "batch" for one Batch API round per stage.
+        batch_client: Batch client for "batch" mode (e.g. `batch_runner.LocalBatchClient()`). Defaults to the OpenAI Batch API.
+        prefilter (bool): If True, run the BM25 prefilter (`PREFILTER_MODE`) before any LLM call.
+        stream_path (str | None): JSONL/Parquet file the rows are appended to while the run is in progress
+            (cached rows first, then each new row as it completes). None disables it.
+        resume_run (str | None): Id of an interrupted run to resume. Its journal is replayed: resumes with a journaled
+            summary are not evaluated again and partially finished resumes only run their missing chains.
+            None starts a new run (its id is printed and its journal written to `JOURNAL_DIR`). Only the async
+            engine journals its steps.
 
     Returns:
         pd.DataFrame: Full ATS results.
+
+    Raises:
+        ValueError: If `resume_run` is given in "batch" mode, which has no journal to resume from.
     """
-    if not force_rerun and os.path.exists(load_path):
-        ats_results = pd.read_excel(load_path)
-        print(f"[INFO] Loaded cached ATS results from {load_path}")
-        return ats_results
+    if load_path is not None:
+        warnings.warn("load_path is deprecated and ignored; cached results come from the result store",
+                      DeprecationWarning, stacklevel=2)
+    if resume_run and execution_mode == "batch":
+        raise ValueError("resume_run needs execution_mode='async'; batch runs are not journaled")
+    store = result_store if result_store is not None else get_result_store()
+    # Chain sessions only apply to the async engine
+    sessions = CHAIN_SESSIONS and execution_mode != "batch"
+    summary_model = get_summary_model()
+    _, prompt_hash, model_key, model_route = tot_result_identity(DISTILL_JOB_DESCRIPTION, sessions, summary_model)
+    keys = [result_key("tot", resume, job_description, prompt_hash, model_key) for resume in resumes]
+    cached = {} if force_rerun else store.get_many(keys)
+
+    journal = RunJournal(resume_run) if resume_run else None
+    journaled = journal.replay() if journal is not None else {}
+    if journal is not None:
+        print(f"[INFO] Resuming run {journal.run_id}: {len(journaled)} resumes have journaled steps")
+
+    # Resumes whose summary made it into the journal are complete; store them like any cached result
+    recovered = {}
+    for key in keys:
+        steps = journaled.get(key, {})
+        if key not in cached and "summary" in steps and all(category in steps for category in TOT_CATEGORIES):
+            recovered[key] = {}
+            for step in TOT_CATEGORIES + ["summary"]:
+                score, note, details = steps[step]
+                recovered[key].update({f"{step}_score": score, f"{step}_note": note, **details})
+    if recovered:
+        store.put_many(recovered.items())
+        cached.update(recovered)
+
+    missing = [i for i, key in enumerate(keys) if key not in cached]
+    if missing and prefilter:
+        missing = _prefilter_missing(resumes, job_description, missing, result_store=store)
+    print(f"[INFO] Reusing {len(cached)} cached ToT results, evaluating {len(missing)} resumes...")
+    if journal is None and missing and execution_mode != "batch":
+        journal = RunJournal(new_run_id())
+        print(f"[INFO] Run id {journal.run_id} (pass resume_run='{journal.run_id}' to resume it after an interruption)")
+    metrics.reset()
+    if summary_model is not None:
+        summary_model.reset_stats()
+    chain_memo = get_chain_memo()
+    if chain_memo is not None:
+        chain_memo.reset_stats()
+
+    sink = ResultSink(stream_path, ATS_COLUMNS + ["composite_score"] + SCORE_STATISTIC_COLUMNS + SUMMARY_SOURCE_COLUMNS + ["model_route"]) if stream_path else None
 
-    print("No valid cached ATS results found or force_rerun=True. Running full ToT evaluation...")
+    weights = composite_weights(job_description)
+    report_unconstrained(job_description)
+
+    def emit(row):
+        if sink is not None:
+            sink.write({**row, "composite_score": row_composite_score(row, weights), "model_route": model_route})
+
+    def store_new(row):
+        # Persist each resume as soon as it finishes, so a crash loses at most the resumes in flight
+        store.put(keys[row["id"] - 1], {k: v for k, v in row.items() if k != "id"})
+        emit(row)
+
+    def journal_step(resume_id, step, score, note, details):
+        key = keys[resume_id - 1]
+        if step == "summary":
+            journal.record_summary(key, resume_id, score, note, details)
+        else:
+            journal.record_chain(key, resume_id, step, score, note, details)
+
+    for i, key in enumerate(keys):
+        if key in cached:
+            emit({**cached[key], "id": i + 1})
 
     # Normal ToT Logic Loop
-    ats_columns = [
-    "id",
-    "summary_score", "summary_note",
-    "location_score", "location_note",
-    "experience_score", "experience_note",
-    "education_score", "education_note",
-    "skills_score", "skills_note",
-    "languages_score", "languages_note",
-    "other_score", "other_note"]
-    ats_results = pd.DataFrame(columns=ats_columns)
-
-    for i, resume in enumerate(resumes):
-
-        # Run ToT scoring chains
-        experience_score, experience_note = run_experience_chain(resume, job_description)
-        location_score, location_note = run_location_chain(resume, job_description)
-        education_score, education_note = run_education_chain(resume, job_description)
-        skills_score, skills_note = run_skills_chain(resume, job_description)
-        languages_score, languages_note = run_languages_chain(resume, job_description)
-        other_score, other_note = run_other_chain(resume, job_description)
-
-        # Store partial results
-        ats_results.loc[i] = {
-            "id": i + 1,
-            "summary_score": None,
-            "summary_note": None,
-            "location_score": location_score,
-            "location_note": location_note,
-            "experience_score": experience_score,
-            "experience_note": experience_note,
-            "education_score": education_score,
-            "education_note": education_note,
-            "skills_score": skills_score,
-            "skills_note": skills_note,
-            "languages_score": languages_score,
-            "languages_note": languages_note,
-            "other_score": other_score,
-            "other_note": other_note
-        }
-
-        # Compute summary score
-        summary_score, summary_note = run_summary_chain(ats_results.loc[i], job_description)
-        ats_results.loc[i, "summary_score"] = summary_score
-        ats_results.loc[i, "summary_note"] = summary_note
-
-        # Print checkpoint summary
-        print(f" Evaluated resume #{i + 1} - Experience Score: {experience_score} & Summary Score: {summary_score}")
-
-    # Compute composite score before saving for tie-breakers
-    ats_results["composite_score"] = (
-    0.3 * ats_results["experience_score"] +
-    0.2 * ats_results["skills_score"] +
-    0.2 * ats_results["education_score"] +
-    0.1 * ats_results["languages_score"] +
-    0.1 * ats_results["other_score"] +
-    0.1 * ats_results["location_score"]
+    try:
+        if missing and execution_mode == "batch":
+            # One Batch API round per pipeline stage across all missing resumes
+            new_rows = run_tot_batch(
+                [resumes[i] for i in missing],
+                job_description,
+                ids=[i + 1 for i in missing],
+                batch_client=batch_client
+            )
+            for row in new_rows:
+                if row is not None:
+                    store_new(row)
+        elif missing:
+            # Category chains run in parallel per resume; the summary chain waits for all six
+            new_rows = evaluate_resumes(
+                [resumes[i] for i in missing],
+                job_description,
+                max_concurrency=max_concurrency,
+                ids=[i + 1 for i in missing],
+                on_result=store_new,
+                completed=[journaled.get(keys[i]) for i in missing],
+                on_step=journal_step
+            )
+        else:
+            new_rows = []
+    finally:
+        if journal is not None:
+            journal.close()
+        if sink is not None:
+            sink.close()
+            print(f"[INFO] {sink.rows_written} ATS result rows written to {stream_path}")
+
+    new_results = {
+        keys[i]: {k: v for k, v in row.items() if k != "id"}
+        for i, row in zip(missing, new_rows) if row is not None
+    }
+    cached.update(new_results)
+    failed = len(missing) - len(new_results)
+    if failed:
+        print(f"[WARN] {failed} resumes could not be evaluated; their rows are empty and they will be retried on the next run")
+
+    ats_results = pd.DataFrame(
+        [{**cached.get(key, {}), "id": i + 1} for i, key in enumerate(keys)],
+        columns=ATS_COLUMNS
     )
+    for column in SCORE_STATISTIC_COLUMNS + SUMMARY_SOURCE_COLUMNS:
+        ats_results[column] = [cached.get(key, {}).get(column) for key in keys]
 
-    ats_results.to_excel(save_path, index=False)
-    print(f"[INFO] New ATS results saved to {save_path}")
+    # Compute composite score before saving for tie-breakers; categories the job does not constrain are left out
+    # and the remaining weights renormalized (see `jd_constraints`)
+    ats_results["composite_score"] = sum(
+        weight * ats_results[f"{category}_score"] for category, weight in weights.items()
+    )
+    ats_results["model_route"] = [model_route if key in cached else None for key in keys]
+
+    if save_path:
+        # Optional final Excel export; the streamed file already holds every row
+        ats_results.to_excel(save_path, index=False)
+        print(f"[INFO] New ATS results saved to {save_path}")
+    if summary_model is not None:
+        summary_model.report()
+    if chain_memo is not None:
+        chain_memo.report()
+    metrics.export(os.path.join(METRICS_DIR, "tot"))
     return ats_results
 
-def run_or_load_oneshot_evaluation(resumes, job_description, use_cache=True):
+async def stream_ats_results_async(resumes, job_description, on_result, max_concurrency=MAX_CONCURRENT_RESUMES,
+                                   result_store=None, force_rerun=False, distill_jd=DISTILL_JOB_DESCRIPTION):
+    """
+    Async version of `stream_ats_results`.
+    """
+    store = result_store if result_store is not None else get_result_store()
+    summary_model = get_summary_model()
+    distill_jd, prompt_hash, model_key, model_route = tot_result_identity(distill_jd, CHAIN_SESSIONS, summary_model)
+    job_requirements = await adistill_job_description(job_description) if distill_jd else None
+    counts = {"cached": 0, "evaluated": 0, "failed": 0}
+    weights = composite_weights(job_description)
+    report_unconstrained(job_description)
+    chain_memo = get_chain_memo()
+    if chain_memo is not None:
+        chain_memo.reset_stats()
+
+    async def handle(resume_id, resume):
+        key = result_key("tot", resume, job_description, prompt_hash, model_key)
+        row = None if force_rerun else store.get_many([key]).get(key)
+        if row is not None:
+            counts["cached"] += 1
+            row = {"id": resume_id, **row}
+        else:
+            row = await evaluate_resume_with_id(resume_id, resume, job_description, job_requirements)
+            if row is None:
+                counts["failed"] += 1
+                return
+            store.put(key, {k: v for k, v in row.items() if k != "id"})
+            counts["evaluated"] += 1
+        on_result({**row, "composite_score": row_composite_score(row, weights), "model_route": model_route})
+
+    total = await process_stream_async(resumes, handle, max_concurrency=max_concurrency)
+    print(f"[INFO] Streamed {total} resumes: {counts['cached']} cached, {counts['evaluated']} evaluated, {counts['failed']} failed")
+    if summary_model is not None:
+        summary_model.report()
+    if chain_memo is not None:
+        chain_memo.report()
+    return counts
+
+
+def stream_ats_results(resumes, job_description, on_result=None, max_concurrency=MAX_CONCURRENT_RESUMES,
+                       result_store=None, force_rerun=False, distill_jd=DISTILL_JOB_DESCRIPTION):
+    """
+    Streaming counterpart of `load_or_generate_ats_results` for large corpora.
+    Resumes are pulled lazily from a file (via `iter_resumes`) or any iterable, with at most `max_concurrency`
+    in flight and a bounded read-ahead, so scoring starts on the first resume and memory stays flat.
+    Results are looked up in and written to the per-resume result store exactly like the batch path; the
+    BM25 prefilter is not applied, since its cutoff needs the whole corpus.
+
+    Args:
+        resumes (str | Iterable[dict]): Path of an .xlsx/.csv/.jsonl/.parquet resume file, or an iterable of resumes.
+        job_description (str): Job description string.
+        on_result (Callable | None): Called with each result row (with 'id' and 'composite_score', e.g. `ResultSink.write`) as soon as it
+            is ready, in completion order. If None, the rows are collected and returned as a DataFrame.
+        max_concurrency (int): Maximum number of resumes evaluated concurrently.
+        result_store (ResultStore | None): Per-resume result store. Defaults to `RESULT_STORE_PATH`.
+        force_rerun (bool): If True, re-evaluate every resume and overwrite its cached result.
+        distill_jd (bool): If True, give each chain only its slice of the distilled job description.
+
+    Returns:
+        pd.DataFrame | dict: The results sorted by id if `on_result` is None, otherwise the cached/evaluated/failed counts.
+    """
+    if isinstance(resumes, str):
+        resumes = iter_resumes(resumes)
+    rows = [] if on_result is None else None
+    counts = run_sync(stream_ats_results_async(
+        resumes, job_description, on_result or rows.append, max_concurrency=max_concurrency,
+        result_store=result_store, force_rerun=force_rerun, distill_jd=distill_jd
+    ))
+    if rows is None:
+        return counts
+    columns = ATS_COLUMNS + ["composite_score"] + SCORE_STATISTIC_COLUMNS + SUMMARY_SOURCE_COLUMNS + ["model_route"]
+    return pd.DataFrame(rows, columns=columns).sort_values("id").reset_index(drop=True)
+
+def run_or_load_oneshot_evaluation(resumes, job_description, use_cache=True, result_store=None, prefilter=PREFILTER_ENABLED,
+                                   stream_path=ONESHOT_STREAM_RESULTS_PATH, export_excel=True, packed=ONESHOT_PACKED):
     """
     Handles one-shot evaluation of resumes against a job description with caching support.
-    Either retrieves previously cached results or performs a new evaluation if no cache exists.
-    Saves results to both a cache file and an active results file for immediate use.
+    Results are cached per resume like the ToT results, so only resumes without a valid cached result are evaluated.
+    Rows are appended to `stream_path` as they are produced; at the end the merged results are exported to both
+    a cache file and an active results file for immediate use.
 
     Parameters:
         resumes (list): List of resume dictionaries.
         job_description (str): The job description text.
-        use_cache (bool): If True, try to load cached results from disk.
+        use_cache (bool): If True, reuse cached per-resume results.
+        result_store (ResultStore | None): Per-resume result store. Defaults to `RESULT_STORE_PATH`.
+        prefilter (bool): If True, run the BM25 prefilter (`PREFILTER_MODE`) before any LLM call.
+        stream_path (str | None): JSONL/Parquet file the rows are appended to while the run is in progress. None disables it.
+        export_excel (bool): If True, export the merged results to the two Excel files at the end.
+        packed (bool): If True, pack several resumes into each one-shot prompt (see `ONESHOT_PACK_TOKEN_BUDGET`).
 
     Returns:
         pd.DataFrame: The one-shot results.
     """
-    if use_cache and os.path.exists(ONESHOT_CACHED_RESULTS_PATH):
-        print(f"[INFO] Loaded cached One-Shot results from {ONESHOT_CACHED_RESULTS_PATH}")
-        return pd.read_excel(ONESHOT_CACHED_RESULTS_PATH)
+    store = result_store if result_store is not None else get_result_store()
+    # Packed answers are cached apart from single-resume ones; the stored composite score depends on the constraint rules
+    prompt_hash = scoring_prompt_hash([oneshot_prompt] + ([oneshot_packed_prompt] if packed else []) + ([constraint_rules_text] if PRUNE_UNCONSTRAINED_CHAINS else []))
+    stage = "oneshot_packed" if packed else "oneshot"
+    model_key, model_route = route_key([stage]), describe_route([stage])
+    keys = [result_key("oneshot", resume, job_description, prompt_hash, model_key) for resume in resumes]
+    cached = store.get_many(keys) if use_cache else {}
+
+    missing = [i for i, key in enumerate(keys) if key not in cached]
+    if missing and prefilter:
+        missing = _prefilter_missing(resumes, job_description, missing, result_store=store)
+    print(f"[INFO] Reusing {len(cached)} cached One-Shot results, evaluating {len(missing)} resumes...")
+    metrics.reset()
 
-    print("[INFO] Running One-Shot evaluation for all resumes...")
-    oneshot_results = evaluate_all_oneshot_resumes(resumes, job_description)
+    sink = ResultSink(stream_path, ONESHOT_COLUMNS + SCORE_STATISTIC_COLUMNS + ["model_route"]) if stream_path else None
+    try:
+        if sink is not None:
+            sink.write_many({"id": i + 1, **cached[key], "model_route": model_route} for i, key in enumerate(keys) if key in cached)
+        if missing:
+            new_df = evaluate_all_oneshot_resumes(
+                [resumes[i] for i in missing],
+                job_description,
+                ids=[i + 1 for i in missing],
+                on_result=(lambda row: sink.write({**row, "model_route": model_route})) if sink is not None else None,
+                packed=packed
+            )
+            # Rows are matched by id, since resumes that failed have none
+            new_results = {
+                keys[row["id"] - 1]: {k: v for k, v in row.items() if k != "id"}
+                for row in new_df.to_dict("records")
+            }
+            store.put_many(new_results.items())
+            cached.update(new_results)
+    finally:
+        if sink is not None:
+            sink.close()
+            print(f"[INFO] {sink.rows_written} One-Shot result rows written to {stream_path}")
+
+    oneshot_results = pd.DataFrame(
+        [{"id": i + 1, **cached.get(key, {})} for i, key in enumerate(keys)],
+        columns=ONESHOT_COLUMNS + SCORE_STATISTIC_COLUMNS
+    )
+    oneshot_results["model_route"] = [model_route if key in cached else None for key in keys]
 
-    # Save to both cache and active use path
-    oneshot_results.to_excel(ONESHOT_CACHED_RESULTS_PATH, index=False)
-    oneshot_results.to_excel("ATS_Oneshot_Results.xlsx", index=False)
-    print(f"[INFO] One-Shot results saved to {ONESHOT_CACHED_RESULTS_PATH} and ATS_Oneshot_Results.xlsx")
+    if export_excel:
+        # Save to both cache and active use path
+        oneshot_results.to_excel(ONESHOT_CACHED_RESULTS_PATH, index=False)
+        oneshot_results.to_excel("ATS_Oneshot_Results.xlsx", index=False)
+        print(f"[INFO] One-Shot results saved to {ONESHOT_CACHED_RESULTS_PATH} and ATS_Oneshot_Results.xlsx")
+    metrics.export(os.path.join(METRICS_DIR, "oneshot"))
 
-    return oneshot_results
\ No newline at end of file
+    return oneshot_results
@@ -0,0 +1,102 @@
+"""
+jd_constraints.py
+
+Once-per-job analysis of which categories a job description constrains. Categories it does not (no spoken-language
+requirement, a fully remote role) skip their chain and are left out of the composite score; anything the analysis
+cannot rule out stays constrained.
+"""
+
+import json
+import re
+from functools import lru_cache
+from main_config import PRUNE_UNCONSTRAINED_CHAINS, PRUNABLE_CATEGORIES, UNCONSTRAINED_CATEGORY_SCORE, UNCONSTRAINED_CATEGORY_NOTE
+
+# Weights of the category scores in the composite score
+CATEGORY_WEIGHTS = {"experience": 0.3, "skills": 0.2, "education": 0.2, "languages": 0.1, "other": 0.1, "location": 0.1}
+
+SPOKEN_LANGUAGES = [
+    "english", "spanish", "french", "german", "italian", "portuguese", "dutch", "russian", "polish", "ukrainian",
+    "mandarin", "cantonese", "chinese", "japanese", "korean", "vietnamese", "tagalog", "thai", "indonesian",
+    "hindi", "urdu", "bengali", "punjabi", "tamil", "arabic", "hebrew", "turkish", "farsi", "persian", "swahili",
+]
+
+LANGUAGE_REQUIREMENT = re.compile(
+    r"\b(" + "|".join(SPOKEN_LANGUAGES) +
+    r"|bilingual|multilingual|fluen(?:t|cy)|native speaker|spoken language|foreign language|language skills"
+    r"|verbal and written|written and verbal|written and spoken)\b",
+    re.I
+)
+
+REMOTE_ROLE = re.compile(r"\b(fully remote|100% remote|remote[- ]first|remote[- ]only|work from anywhere|remote (?:role|position|job))\b", re.I)
+OFFICE_WORK = re.compile(r"\b(hybrid|on-?site|in[- ]office|in the office|in person|in-person|relocat\w*|commut\w*)\b", re.I)
+
+# Languages are constrained by a spoken language or fluency requirement (programming languages do not count);
+# location is unconstrained only for a fully remote role that mentions no office, hybrid or on-site work
+CONSTRAINT_RULES = {
+    "languages": lambda job_description: bool(LANGUAGE_REQUIREMENT.search(job_description)),
+    "location": lambda job_description: not REMOTE_ROLE.search(job_description) or bool(OFFICE_WORK.search(job_description)),
+}
+
+
+@lru_cache(maxsize=32)
+def job_constraints(job_description):
+    """
+    Returns {category: True if the job description constrains it} for the six categories. Categories without a
+    rule (experience, skills, education, other) are always constrained.
+    """
+    return {
+        category: CONSTRAINT_RULES[category](job_description) if category in CONSTRAINT_RULES else True
+        for category in CATEGORY_WEIGHTS
+    }
+
+
+def unconstrained_categories(job_description):
+    """
+    Returns the categories of `PRUNABLE_CATEGORIES` whose chains are skipped for a job description (none unless
+    `PRUNE_UNCONSTRAINED_CHAINS` is on).
+    """
+    if not PRUNE_UNCONSTRAINED_CHAINS:
+        return []
+    constraints = job_constraints(job_description)
+    return [category for category in PRUNABLE_CATEGORIES if not constraints.get(category, True)]
+
+
+def pruned_chain_result(category, job_description):
+    """
+    Returns the neutral (score, note) of a chain the job description does not constrain, or None if it runs.
+    `job_description` is the full job description, not a distilled slice.
+    """
+    if category not in unconstrained_categories(job_description):
+        return None
+    return UNCONSTRAINED_CATEGORY_SCORE, UNCONSTRAINED_CATEGORY_NOTE.format(category=category)
+
+
+def composite_weights(job_description=None):
+    """
+    Returns the composite score weights for a job description: `CATEGORY_WEIGHTS` without the unconstrained
+    categories, renormalized to sum to 1 (`CATEGORY_WEIGHTS` itself if `job_description` is None).
+    """
+    if job_description is None:
+        return dict(CATEGORY_WEIGHTS)
+    pruned = unconstrained_categories(job_description)
+    weights = {category: weight for category, weight in CATEGORY_WEIGHTS.items() if category not in pruned}
+    total = sum(weights.values())
+    return {category: weight / total for category, weight in weights.items()}
+
+
+def constraint_rules_text():
+    # Rendered into the prompt hash (see `prompts.tot_prompt_templates`), so rule or neutral score edits invalidate cached results
+    return json.dumps({
+        "categories": PRUNABLE_CATEGORIES, "score": UNCONSTRAINED_CATEGORY_SCORE, "note": UNCONSTRAINED_CATEGORY_NOTE,
+        "languages": LANGUAGE_REQUIREMENT.pattern, "remote": REMOTE_ROLE.pattern, "office": OFFICE_WORK.pattern,
+    })
+
+
+def report_unconstrained(job_description):
+    """
+    Prints which chains are skipped for a job description, if any.
+    """
+    pruned = unconstrained_categories(job_description)
+    if pruned:
+        print(f"[INFO] The job description does not constrain {', '.join(pruned)}; those chains are skipped "
+              f"(score {UNCONSTRAINED_CATEGORY_SCORE}) and left out of the composite score")
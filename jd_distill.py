@@ -0,0 +1,97 @@
+"""
+jd_distill.py
+
+Once-per-job preprocessing of the job description.
+
+Most ToT prompts embed the job description, which is largely boilerplate ("About USDS", "Why Join Us").
+`distill_job_description` asks the LLM once per job description to extract only the per-category
+requirements (experience, location, education, skills, languages, other). The result is cached in the
+result store under the job description hash, and each category chain then receives only its own slice,
+which cuts input tokens on every call for every resume. Only complete distillations (every category parsed)
+are stored, so a malformed answer is retried on the next run instead of degrading every later one.
+"""
+
+from prompts import JD_prompt, acall_openai, backend_key, prompt_template_hash, route_key, run_sync
+from result_cache import get_result_store, text_hash
+
+JD_CATEGORIES = ["experience", "location", "education", "skills", "languages", "other"]
+
+
+def parse_jd_requirements(output):
+    """
+    Parses the 'category: requirements' lines returned by JD_prompt.
+    Returns a dict with the categories that were found (unknown keys and blank values are ignored).
+    """
+    requirements = {}
+    for line in output.strip().splitlines():
+        if ":" not in line:
+            continue
+        key, value = line.split(":", 1)
+        key = key.strip().strip("-*• ").lower()
+        value = value.strip()
+        if key in JD_CATEGORIES and value:
+            requirements[key] = value
+    return requirements
+
+
+def is_complete_distillation(output):
+    """
+    True if a JD_prompt answer has requirements for every category of `JD_CATEGORIES`.
+    """
+    return len(parse_jd_requirements(output)) == len(JD_CATEGORIES)
+
+
+def build_job_requirements(requirements, job_description):
+    """
+    Turns parsed per-category requirements into the text each chain receives in place of the job description.
+    Categories the distillation missed fall back to the full job description. The 'summary' entry (used by S2)
+    lists all categories together.
+    """
+    job_requirements = {}
+    for category in JD_CATEGORIES:
+        if category in requirements:
+            job_requirements[category] = f"{category.capitalize()} requirements: {requirements[category]}"
+        else:
+            job_requirements[category] = job_description
+
+    if len(requirements) == len(JD_CATEGORIES):
+        job_requirements["summary"] = "\n".join(
+            f"{category.capitalize()} requirements: {requirements[category]}" for category in JD_CATEGORIES
+        )
+    else:
+        job_requirements["summary"] = job_description
+    return job_requirements
+
+
+async def adistill_job_description(job_description, model=None, result_store=None):
+    """
+    Returns the per-category job requirements, computing them at most once per
+    (job description, distillation prompt, model). `model` defaults to the route of the "JD" stage.
+
+    Returns:
+        dict: category -> requirements text, plus 'summary' for the summary chain.
+    """
+    store = result_store if result_store is not None else get_result_store()
+    key = text_hash("|".join(["jd_distill", text_hash(job_description), prompt_template_hash([JD_prompt]), backend_key(model) if model else route_key(["JD"])]))
+
+    cached = store.get_many([key])
+    if key in cached and len(cached[key]) == len(JD_CATEGORIES):
+        return build_job_requirements(cached[key], job_description)
+
+    output = await acall_openai(JD_prompt(job_description), model=model, stage="JD", validate=is_complete_distillation)
+    requirements = parse_jd_requirements(output)
+
+    # Only complete distillations are stored (here and in the response cache); a partial one (e.g. a malformed answer)
+    # is used for this run and retried on the next
+    if len(requirements) == len(JD_CATEGORIES):
+        store.put(key, requirements)
+    else:
+        missing = [category for category in JD_CATEGORIES if category not in requirements]
+        print(f"[WARN] Job description distillation missed {missing}; those chains get the full job description "
+              f"and the distillation is retried on the next run.")
+
+    return build_job_requirements(requirements, job_description)
+
+
+def distill_job_description(job_description, model=None, result_store=None):
+    return run_sync(adistill_job_description(job_description, model=model, result_store=result_store))
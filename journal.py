@@ -0,0 +1,131 @@
+"""
+journal.py
+
+Crash-safe write-ahead journal of a ToT run.
+
+Every completed category chain (resume, category, score, note) and every completed summary is appended
+to `<JOURNAL_DIR>/<run_id>.jsonl` as soon as it finishes. Recording an entry only queues it: a writer thread
+appends whatever has queued up and flushes it (and fsyncs it with `JOURNAL_FSYNC`), so the event loop never
+waits for the disk and a burst of steps costs one write. Entries are keyed by the resume's result key, so they
+only ever apply to the same resume, job description, prompts and model.
+
+If a run dies part-way, `load_or_generate_ats_results(..., resume_run=<run_id>)` replays the journal:
+resumes with a journaled summary are not evaluated again, and partially finished resumes only run the
+chains still missing (e.g. five of six chains done -> one chain, then the summary).
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from result_cache import _json_default
+from main_config import JOURNAL_DIR, JOURNAL_FSYNC
+
+
+def new_run_id():
+    """
+    Returns a sortable, unique run id, e.g. '20240501-142233-3f9a1c'.
+    """
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+def _ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+class RunJournal:
+    """
+    Append-only JSONL journal of one run.
+
+    Args:
+        run_id (str): Run id; the journal file is `<directory>/<run_id>.jsonl`.
+        directory (str): Journal directory.
+        fsync (bool): If True, fsync after every write (survives power loss, not just a process crash).
+    """
+
+    def __init__(self, run_id, directory=JOURNAL_DIR, fsync=JOURNAL_FSYNC):
+        self.run_id = run_id
+        self.path = os.path.join(directory, f"{run_id}.jsonl")
+        self.fsync = fsync
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        if self._file.tell() and not _ends_with_newline(self.path):
+            # Terminate a torn last line so the first new entry does not run into it
+            self._file.write("\n")
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name=f"journal-{run_id}", daemon=True)
+        self._writer.start()
+
+    def _append(self, entry):
+        self._queue.put(json.dumps({**entry, "time": time.time()}, default=_json_default, ensure_ascii=False))
+
+    def _write_loop(self):
+        while True:
+            lines = [self._queue.get()]
+            while True:
+                try:
+                    lines.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            entries = [line for line in lines if line is not None]
+            try:
+                if entries:
+                    self._file.write("\n".join(entries) + "\n")
+                    self._file.flush()
+                    if self.fsync:
+                        os.fsync(self._file.fileno())
+            except OSError as e:
+                print(f"[WARN] Could not write {len(entries)} entries to journal {self.path}: {e}")
+            finally:
+                for _ in lines:
+                    self._queue.task_done()
+            # None is queued by `close`
+            if len(entries) < len(lines):
+                return
+
+    def flush(self):
+        """
+        Waits until every recorded entry is written.
+        """
+        self._queue.join()
+
+    def record_chain(self, resume_key, resume_id, category, score, note, details=None):
+        self._append({"type": "chain", "key": resume_key, "id": resume_id, "category": category, "score": score, "note": note,
+                      "details": details or {}})
+
+    def record_summary(self, resume_key, resume_id, score, note, details=None):
+        self._append({"type": "summary", "key": resume_key, "id": resume_id, "score": score, "note": note,
+                      "details": details or {}})
+
+    def replay(self):
+        """
+        Reads back the journal.
+
+        Returns:
+            dict: {resume key: {category or 'summary': (score, note, details)}} for every journaled step.
+        """
+        completed = {}
+        self.flush()
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn last line from a crash mid-write; everything before it is intact
+                    continue
+                step = entry["category"] if entry.get("type") == "chain" else "summary"
+                completed.setdefault(entry["key"], {})[step] = (entry["score"], entry["note"], entry.get("details", {}))
+        return completed
+
+    def close(self):
+        """
+        Writes the outstanding entries, stops the writer thread and closes the file.
+        """
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+        self._file.close()
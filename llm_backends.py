@@ -0,0 +1,334 @@
+"""
+llm_backends.py
+
+Pluggable LLM backends used by `prompts.acall_openai` (select one with `prompts.set_llm_backend`).
+
+Every backend exposes `async complete(model, messages, temperature, response_format=None, n=None, top_logprobs=None,
+max_tokens=None)` and returns an `LLMResponse`; `response_format={"type": "json_object"}` asks for a JSON object
+reply, `n` for several sampled choices in one request, `top_logprobs` for per-token log probabilities and
+`max_tokens` caps the completion length. Backends also expose `stream(model, messages, temperature,
+response_format=None, max_tokens=None)`, an async generator of `StreamDelta`s.
+
+- `OpenAIBackend`: the OpenAI chat completions API (the default).
+- `FakeLLMBackend`: local, deterministic stand-in that needs no API key. It recognises what each prompt asks for
+  from its "Output format" section and returns a valid answer: a JSON object of `<category>_score` /
+  `<category>_note` fields for the stage-3, S3 and one-shot prompts (one per candidate tag for packed one-shot
+  prompts, or `<category>_score: N` lines for prompts
+  that ask for lines), the per-category lines
+  for the job description distillation prompt, and a few sentences of free text otherwise. Latency, per-token
+  latency, jitter and a transient error rate are configurable, which makes it the basis for offline throughput benchmarks
+  (see `benchmark.py`). With `top_logprobs` it returns synthetic token logprobs that put the score tokens'
+  probability mass on neighbouring integers.
+
+Each backend names its `cache_namespace`, which `prompts` adds to response cache and result store keys so that
+answers of one backend are never served to another (a benchmark on the fake backend cannot leave fake scores
+behind for real runs). `OpenAIBackend` uses None, which keeps the keys written before backends were namespaced.
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+from openai import AsyncOpenAI
+
+
+class LLMResponse:
+    """
+    Backend-independent completion result.
+
+    Args:
+        text (str): Completion text (of the first choice).
+        prompt_tokens (int): Prompt tokens billed for the request.
+        completion_tokens (int): Completion tokens billed for the request.
+        cached_tokens (int): Prompt tokens served from the provider's prompt-prefix cache (part of `prompt_tokens`).
+        choices (list[str] | None): Texts of all choices when several were requested (`n`). Defaults to [text].
+        logprobs (list[dict] | None): When requested (`top_logprobs`), one {"token", "logprob", "top": [[token, logprob], ...]}
+            entry per output token of the first choice.
+    """
+
+    def __init__(self, text, prompt_tokens=0, completion_tokens=0, choices=None, logprobs=None, cached_tokens=0):
+        self.text = text
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.cached_tokens = cached_tokens
+        self.choices = choices if choices is not None else [text]
+        self.logprobs = logprobs
+
+
+class StreamDelta:
+    """
+    One piece of a streamed completion: a text delta, and on the last piece the usage (None before).
+    """
+
+    def __init__(self, text, prompt_tokens=None, completion_tokens=None, cached_tokens=0):
+        self.text = text
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.cached_tokens = cached_tokens
+
+
+def _cached_tokens(usage):
+    details = getattr(usage, "prompt_tokens_details", None)
+    return (getattr(details, "cached_tokens", 0) or 0) if details is not None else 0
+
+
+class OpenAIBackend:
+    """
+    Sends requests to the OpenAI chat completions API. The client is created on first use, so importing
+    the pipeline (e.g. to run it on the fake backend) does not require an API key.
+    """
+
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            # Retries are handled by the scheduler so they share its rate limits and deadlines
+            self._client = AsyncOpenAI(max_retries=0)
+        return self._client
+
+    async def complete(self, model, messages, temperature, response_format=None, n=None, top_logprobs=None, max_tokens=None):
+        options = {"response_format": response_format} if response_format else {}
+        if max_tokens:
+            options["max_tokens"] = max_tokens
+        if n and n > 1:
+            options["n"] = n
+        if top_logprobs:
+            options["logprobs"] = True
+            options["top_logprobs"] = top_logprobs
+        response = await self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            **options
+        )
+        usage = response.usage
+        choices = [choice.message.content for choice in response.choices]
+        logprobs = None
+        if top_logprobs and response.choices[0].logprobs is not None:
+            logprobs = [
+                {"token": item.token, "logprob": item.logprob, "top": [[top.token, top.logprob] for top in item.top_logprobs]}
+                for item in response.choices[0].logprobs.content or []
+            ]
+        return LLMResponse(
+            choices[0],
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+            choices=choices,
+            logprobs=logprobs,
+            cached_tokens=_cached_tokens(usage)
+        )
+
+
+    async def stream(self, model, messages, temperature, response_format=None, max_tokens=None):
+        """
+        Streams a completion as `StreamDelta`s. Closing the generator early closes the HTTP stream,
+        which stops generation (and billing) on the server.
+        """
+        options = {"response_format": response_format} if response_format else {}
+        if max_tokens:
+            options["max_tokens"] = max_tokens
+        response = await self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            stream=True,
+            stream_options={"include_usage": True},
+            **options
+        )
+        try:
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield StreamDelta(chunk.choices[0].delta.content)
+                if chunk.usage is not None:
+                    yield StreamDelta("", prompt_tokens=chunk.usage.prompt_tokens, completion_tokens=chunk.usage.completion_tokens,
+                                      cached_tokens=_cached_tokens(chunk.usage))
+        finally:
+            await response.close()
+
+class FakeTransientError(Exception):
+    """
+    Simulated rate-limit error. Its status code makes the scheduler retry it like a real 429.
+    """
+    status_code = 429
+
+
+SCORE_FIELD = re.compile(r"^\s*(\w+)_score:\s*<", re.MULTILINE)
+JSON_SCORE_FIELD = re.compile(r'"(\w+)_score":\s*<')
+FAKE_TOKEN = re.compile(r"\d+|\s+|[^\d\s]+")
+FAKE_CANDIDATE_TAG = re.compile(r"^Candidate (\w+):", re.MULTILINE)
+
+FAKE_SENTENCES = [
+    "The candidate shows relevant experience with backend services and large-scale systems.",
+    "Their background partially matches the stated requirements.",
+    "Some preferred qualifications, such as big data frameworks, are not clearly demonstrated.",
+    "The resume lists programming languages that overlap with the role.",
+    "Communication and collaboration skills are implied but not strongly evidenced.",
+    "Overall the profile is a moderate fit for the position.",
+]
+
+FAKE_JD_LINES = [
+    "experience: 2+ years building large-scale consumer-facing services or backend systems",
+    "location: Hybrid, 3 days a week in office in Culver City, CA; US work authorization required",
+    "education: BS in Computer Science, Computer Engineering or a related major",
+    "skills: C/C++, Python, Java or Golang; search, ranking or machine learning; Hadoop, Spark or Flink",
+    "languages: No specific requirement stated.",
+    "other: Effective team communication and collaboration, curiosity, self-direction",
+]
+
+
+class FakeLLMBackend:
+    """
+    Deterministic offline backend.
+
+    Args:
+        latency (float): Mean simulated response time in seconds (time to the first token).
+        jitter (float): Maximum +/- deviation added uniformly to `latency` (seconds).
+        token_latency (float): Simulated generation time per output token in seconds.
+        error_rate (float): Probability that a request raises `FakeTransientError`.
+        seed (int): Seed for the latency/error sequence and for the generated content.
+        prefix_cache_min_tokens (int): Simulated provider prompt caching: a request whose leading messages
+            (at least this many tokens) were already sent reports them as cached tokens.
+    """
+
+    cache_namespace = "fake"
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, seed=0, token_latency=0.0, prefix_cache_min_tokens=1024):
+        self.latency = latency
+        self.jitter = jitter
+        self.token_latency = token_latency
+        self.error_rate = error_rate
+        self.seed = seed
+        self._random = random.Random(seed)
+        self._samples_drawn = {}
+        self._seen_prefixes = set()
+        self.prefix_cache_min_tokens = prefix_cache_min_tokens
+        self.calls = 0
+
+    def _prompt_usage(self, messages):
+        """
+        Returns (prompt tokens, cached tokens): the longest run of leading messages sent before counts as cached.
+        """
+        cached, tokens, digest = 0, 0, hashlib.sha256()
+        for message in messages:
+            digest.update(f"{message['role']}|{message['content']}|".encode("utf-8"))
+            tokens += len(message["content"]) // 4
+            if digest.hexdigest() in self._seen_prefixes:
+                cached = tokens
+            self._seen_prefixes.add(digest.copy().hexdigest())
+        return tokens, cached if cached >= self.prefix_cache_min_tokens else 0
+
+    def _content_random(self, prompt, variant=0):
+        # Content depends only on (seed, prompt, variant), so retries and reruns return the same answer
+        digest = hashlib.sha256(f"{self.seed}|{variant}|{prompt}".encode("utf-8")).digest()
+        return random.Random(int.from_bytes(digest[:8], "big"))
+
+    def generate(self, prompt, variant=0):
+        """
+        Returns a well-formed answer for the prompt, based on the fields its output format asks for.
+        Different `variant`s of the same prompt give different (sampled) answers.
+        """
+        rng = self._content_random(prompt, variant)
+        output_format = prompt.rsplit("Output format", 1)[-1] if "Output format" in prompt else ""
+
+        if "one line per category" in output_format:
+            return "\n".join(FAKE_JD_LINES)
+
+        json_fields = JSON_SCORE_FIELD.findall(output_format)
+        if json_fields:
+            def answer():
+                fields = {}
+                for field in json_fields:
+                    fields[f"{field}_score"] = rng.randint(20, 95)
+                    fields[f"{field}_note"] = rng.choice(FAKE_SENTENCES)
+                return fields
+            if "<candidate tag>" in output_format:
+                # Packed prompt: one object per candidate
+                return json.dumps({tag: answer() for tag in FAKE_CANDIDATE_TAG.findall(prompt)}, indent=2)
+            return json.dumps(answer(), indent=2)
+
+        fields = SCORE_FIELD.findall(output_format)
+        if fields:
+            blocks = [
+                f"{field}_score: {rng.randint(20, 95)}\n{field}_note: {rng.choice(FAKE_SENTENCES)}"
+                for field in fields
+            ]
+            return "\n\n".join(blocks)
+
+        return " ".join(rng.sample(FAKE_SENTENCES, 3))
+
+    async def _first_token(self):
+        self.calls += 1
+        delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+        if delay:
+            await asyncio.sleep(delay)
+        if self.error_rate and self._random.random() < self.error_rate:
+            raise FakeTransientError("Simulated rate limit")
+
+    @staticmethod
+    def _truncate(text, max_tokens):
+        # ~4 characters per token, like the token estimates elsewhere
+        return text[:max_tokens * 4] if max_tokens else text
+
+    async def complete(self, model, messages, temperature, response_format=None, n=None, top_logprobs=None, max_tokens=None):
+        await self._first_token()
+
+        prompt = messages[-1]["content"]
+        if n and n > 1:
+            # Each further request for samples of a prompt continues where the last one stopped
+            first = self._samples_drawn.get(prompt, 0)
+            self._samples_drawn[prompt] = first + n
+            choices = [self._truncate(self.generate(prompt, variant), max_tokens) for variant in range(first, first + n)]
+        else:
+            choices = [self._truncate(self.generate(prompt), max_tokens)]
+        if self.token_latency:
+            await asyncio.sleep(self.token_latency * max(len(FAKE_TOKEN.findall(text)) for text in choices))
+        logprobs = None
+        if top_logprobs:
+            logprobs = self.token_logprobs(choices[0], top_logprobs, self._content_random(prompt, "logprobs"))
+        prompt_tokens, cached_tokens = self._prompt_usage(messages)
+        return LLMResponse(
+            choices[0],
+            prompt_tokens=prompt_tokens,
+            completion_tokens=sum(len(text) for text in choices) // 4,
+            choices=choices,
+            logprobs=logprobs,
+            cached_tokens=cached_tokens
+        )
+
+    async def stream(self, model, messages, temperature, response_format=None, max_tokens=None):
+        """
+        Yields the answer `complete` would give token by token (`token_latency` apart), then the usage.
+        """
+        await self._first_token()
+        prompt_tokens, cached_tokens = self._prompt_usage(messages)
+        text = self._truncate(self.generate(messages[-1]["content"]), max_tokens)
+        for token in FAKE_TOKEN.findall(text):
+            if self.token_latency:
+                await asyncio.sleep(self.token_latency)
+            yield StreamDelta(token)
+        yield StreamDelta("", prompt_tokens=prompt_tokens, completion_tokens=len(text) // 4, cached_tokens=cached_tokens)
+
+    @staticmethod
+    def token_logprobs(text, top_logprobs, rng):
+        """
+        Splits `text` into rough tokens and gives every integer token a spread of neighbouring alternatives
+        (the returned integer is always the most likely one).
+        """
+        entries = []
+        for token in FAKE_TOKEN.findall(text):
+            if not token.isdigit():
+                entries.append({"token": token, "logprob": 0.0, "top": [[token, 0.0]]})
+                continue
+            value = int(token)
+            spread = rng.uniform(1.0, 6.0)
+            candidates = sorted({max(0, min(100, value + offset)) for offset in range(-10, 11)},
+                                key=lambda v: abs(v - value))[:top_logprobs]
+            weights = [math.exp(-((v - value) / spread) ** 2) for v in candidates]
+            total = sum(weights)
+            top = [[str(v), math.log(w / total)] for v, w in zip(candidates, weights)]
+            entries.append({"token": token, "logprob": top[0][1], "top": top})
+        return entries
@@ -0,0 +1,216 @@
+"""
+llm_cache.py
+
+Persistent, content-addressed cache for LLM responses.
+
+A response is stored under a SHA-256 hash of (model, temperature, messages), so re-sending a byte-identical
+request (e.g. re-running the notebook after a crash, or after editing only the stage-3 prompts) is served
+from disk instead of the API. Only requests whose text actually changed reach the model again.
+
+Two implementations share the same small interface (`get`, `set`, `stats`, `clear`, and the awaitable
+`aget` / `aset` used from the event loop):
+- `SQLiteResponseCache`: on-disk store with a total size limit (LRU eviction) and a TTL.
+- `NullResponseCache`: disables caching while keeping the same call sites.
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+
+def make_cache_key(model, temperature, messages, **options):
+    """
+    Returns a stable hex digest for one chat completion request.
+    Extra request options (e.g. response_format) are part of the key when set.
+    """
+    request = {"model": model, "temperature": temperature, "messages": messages}
+    request.update({name: value for name, value in options.items() if value is not None})
+    payload = json.dumps(
+        request,
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class NullResponseCache:
+    """
+    Cache that never stores anything. Counts every lookup as a miss.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def get(self, key):
+        self.misses += 1
+        return None
+
+    def set(self, key, value):
+        pass
+
+    async def aget(self, key):
+        return self.get(key)
+
+    async def aset(self, key, value):
+        self.set(key, value)
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "entries": 0,
+            "total_bytes": 0
+        }
+
+
+class SQLiteResponseCache(NullResponseCache):
+    """
+    SQLite-backed response cache.
+
+    The database runs in WAL mode, the summed size of the entries is kept as a running total instead of being
+    recomputed on every insert, and hits only record their access time in memory; those times are written in
+    one statement with the next insert (or every `access_flush_size` hits). A crash therefore only loses recency
+    information, never responses. `aget` / `aset` run the SQLite work on a worker thread, so concurrent
+    resumes on the event loop do not stall on disk I/O.
+
+    Args:
+        path (str): Database file. Created on first use.
+        max_bytes (int): Upper bound on the summed size of stored responses. Least recently used entries
+            are evicted once it is exceeded, down to `EVICTION_TARGET` of it.
+        ttl_seconds (float | None): Entries older than this are treated as missing. None disables expiry.
+        access_flush_size (int): Number of buffered access times that forces a write.
+    """
+
+    # Eviction frees a little more than needed, so a full cache does not evict on every insert
+    EVICTION_TARGET = 0.9
+
+    def __init__(self, path, max_bytes=512 * 1024 * 1024, ttl_seconds=None, access_flush_size=256):
+        super().__init__()
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.access_flush_size = access_flush_size
+        self._lock = threading.Lock()
+        self._pending_access = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, size, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            # Expired entries are left in place: the next `set` of the key replaces them, or eviction removes them
+            if row is None or (self.ttl_seconds is not None and now - row[2] > self.ttl_seconds):
+                self.misses += 1
+                return None
+
+            value, size, _ = row
+            self._pending_access[key] = now
+            if len(self._pending_access) >= self.access_flush_size:
+                self._flush_access()
+                self._conn.commit()
+            self.hits += 1
+            self.bytes_read += size
+            return value
+
+    def set(self, key, value):
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now)
+            )
+            self._pending_access.pop(key, None)
+            self._total_bytes += size - (previous[0] if previous else 0)
+            self.bytes_written += size
+            self._flush_access()
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    async def aget(self, key):
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key, value):
+        await asyncio.to_thread(self.set, key, value)
+
+    def _flush_access(self):
+        """
+        Writes the buffered access times. Caller must hold the lock and commit.
+        """
+        if self._pending_access:
+            self._conn.executemany(
+                "UPDATE responses SET last_access = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._pending_access.items()]
+            )
+            self._pending_access.clear()
+
+    def _evict(self):
+        """
+        Deletes least recently used entries until the total size is under `EVICTION_TARGET` of `max_bytes`.
+        Caller must hold the lock, flush the access times first and commit.
+        """
+        target = self.max_bytes * self.EVICTION_TARGET
+        while self._total_bytes > target:
+            oldest = self._conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC LIMIT 256").fetchall()
+            if not oldest:
+                break
+            deleted = []
+            for key, size in oldest:
+                if self._total_bytes <= target:
+                    break
+                deleted.append((key,))
+                self._total_bytes -= size
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", deleted)
+
+    def flush(self):
+        """
+        Writes the buffered access times (e.g. before inspecting the database from another process).
+        """
+        with self._lock:
+            self._flush_access()
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._pending_access.clear()
+            self._total_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            total = self._total_bytes
+        stats = super().stats()
+        stats["entries"] = entries
+        stats["total_bytes"] = total
+        return stats
@@ -0,0 +1,248 @@
+"""
+location_gazetteer.py
+
+Offline fast path for the location chain (L1 -> L2 -> L3).
+
+Whether "Irvine, CA" is within commuting range of the job is a lookup, not a judgement call. The bundled
+gazetteer (`gazetteer.csv`: city, state/region, country, latitude, longitude) resolves both the resume location
+and the office location(s) named in the job description. Location strings are normalized first (ZIP codes,
+"Greater ... Area", "St." / "Ft." abbreviations, state and country names), unknown spellings are matched fuzzily
+within their state, and the haversine distance between the two is mapped to a score through
+`LOCATION_SCORE_BANDS`. Results are memoized per normalized location string, since most applicants share a few
+hundred cities.
+
+Only entries the gazetteer can settle are scored here. Unparseable or ambiguous locations, resumes mentioning
+remote work or relocation, and job descriptions without a recognizable office location or with remote work go
+through the LLM chain as before (`score_location` returns None).
+"""
+
+import csv
+import json
+import math
+import os
+import re
+from collections import namedtuple
+from difflib import get_close_matches
+from functools import lru_cache
+from main_config import LOCATION_SCORE_BANDS, LOCATION_MISSING_SCORE
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gazetteer.csv")
+
+EARTH_RADIUS_MILES = 3958.8
+
+# Unknown cities in a known state are scored only if every part of the state is certainly beyond the last finite
+# band: the closest gazetteer city of that state must be this much farther away
+STATE_MARGIN_MILES = 250
+
+US_STATES = {
+    "alabama": "al", "alaska": "ak", "arizona": "az", "arkansas": "ar", "california": "ca", "colorado": "co",
+    "connecticut": "ct", "delaware": "de", "district of columbia": "dc", "florida": "fl", "georgia": "ga",
+    "hawaii": "hi", "idaho": "id", "illinois": "il", "indiana": "in", "iowa": "ia", "kansas": "ks",
+    "kentucky": "ky", "louisiana": "la", "maine": "me", "maryland": "md", "massachusetts": "ma", "michigan": "mi",
+    "minnesota": "mn", "mississippi": "ms", "missouri": "mo", "montana": "mt", "nebraska": "ne", "nevada": "nv",
+    "new hampshire": "nh", "new jersey": "nj", "new mexico": "nm", "new york": "ny", "north carolina": "nc",
+    "north dakota": "nd", "ohio": "oh", "oklahoma": "ok", "oregon": "or", "pennsylvania": "pa",
+    "rhode island": "ri", "south carolina": "sc", "south dakota": "sd", "tennessee": "tn", "texas": "tx",
+    "utah": "ut", "vermont": "vt", "virginia": "va", "washington": "wa", "west virginia": "wv",
+    "wisconsin": "wi", "wyoming": "wy",
+}
+
+# Region spellings -> the region key used in the index (US state codes, provinces, countries)
+REGION_ALIASES = {
+    **US_STATES,
+    "washington dc": "dc", "ontario": "on", "quebec": "qc", "british columbia": "bc",
+    "usa": "united states", "us": "united states", "united states of america": "united states", "america": "united states",
+    "uk": "united kingdom", "england": "united kingdom", "great britain": "united kingdom", "gb": "united kingdom",
+    "korea": "south korea",
+}
+
+REGION_KEYS = set(REGION_ALIASES) | set(REGION_ALIASES.values())
+
+COUNTRY_NAMES = {
+    "US": "united states", "CA": "canada", "MX": "mexico", "GB": "united kingdom", "FR": "france", "DE": "germany",
+    "IN": "india", "CN": "china", "SG": "singapore", "KR": "south korea", "JP": "japan", "AU": "australia",
+}
+
+CITY_ALIASES = {
+    "nyc": "new york", "new york city": "new york", "manhattan": "new york", "sf": "san francisco",
+    "bangalore": "bengaluru", "washington dc": "washington",
+}
+
+# Words that make the commute question depend on more than distance
+AMBIGUOUS_LOCATION = re.compile(r"\b(remote|relocat\w*|willing|open to|anywhere|hybrid|various|multiple|bay area)\b", re.I)
+REMOTE_JOB = re.compile(r"\b(remote|work from home|wfh)\b", re.I)
+
+ZIP_CODE = re.compile(r"\b\d{5}(?:-\d{4})?\b")
+AREA_WORDS = re.compile(r"\b(greater|metropolitan|metro|area|region)\b")
+ABBREVIATIONS = {"st": "saint", "ft": "fort", "mt": "mount"}
+
+Place = namedtuple("Place", ["city", "region", "country", "latitude", "longitude"])
+
+
+def _clean(text):
+    text = re.sub(r"[^a-z0-9, ]", " ", str(text).lower().replace(".", ""))
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _region_key(text):
+    text = _clean(text)
+    return REGION_ALIASES.get(text, text)
+
+
+def _city_key(text):
+    words = _clean(text).split()
+    if words and words[0] in ABBREVIATIONS:
+        words[0] = ABBREVIATIONS[words[0]]
+    city = " ".join(words)
+    return CITY_ALIASES.get(city, city)
+
+
+def _load_gazetteer(path=GAZETTEER_PATH):
+    index, by_city, by_region = {}, {}, {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for record in csv.DictReader(f):
+            place = Place(record["city"], record["region"], record["country"], float(record["latitude"]), float(record["longitude"]))
+            city = _city_key(place.city)
+            by_city.setdefault(city, []).append(place)
+            for region in {_region_key(place.region), COUNTRY_NAMES.get(place.country, place.country.lower())}:
+                index[(city, region)] = place
+                by_region.setdefault(region, {})[city] = place
+    return index, by_city, by_region
+
+
+GAZETTEER_INDEX, CITIES_BY_NAME, CITIES_BY_REGION = _load_gazetteer()
+
+
+def haversine_miles(a, b):
+    """
+    Great-circle distance between two places, in miles.
+    """
+    lat1, lon1, lat2, lon2 = map(math.radians, (a.latitude, a.longitude, b.latitude, b.longitude))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(math.sqrt(h))
+
+
+def normalize_location(text):
+    """
+    Normalizes a location string to "city, region[, country]" keys ('' for a missing location). ZIP codes and
+    "Greater ... Area" wording are dropped, so "Greater Boston Area, MA 02110" and "Boston, Massachusetts" agree.
+    """
+    if text is None or text != text:
+        return ""
+    text = AREA_WORDS.sub(" ", ZIP_CODE.sub(" ", str(text).lower()))
+    parts = [part for part in (_clean(part) for part in text.split(",")) if part]
+    if len(parts) == 1:
+        # "Culver City CA" / "Austin Texas": split a trailing region off
+        words = parts[0].split()
+        for size in (3, 2, 1):
+            if len(words) > size and " ".join(words[-size:]) in REGION_KEYS:
+                parts = [" ".join(words[:-size]), " ".join(words[-size:])]
+                break
+    if not parts:
+        return ""
+    return ", ".join([_city_key(parts[0])] + [_region_key(part) for part in parts[1:]])
+
+
+def resolve_location(normalized):
+    """
+    Resolves a normalized location to a gazetteer `Place`, or to its region key (str) if only the region is known.
+
+    Returns:
+        Place | str | None: None if the location is unknown or ambiguous.
+    """
+    city, *regions = normalized.split(", ")
+    for region in regions:
+        if (city, region) in GAZETTEER_INDEX:
+            return GAZETTEER_INDEX[(city, region)]
+    for region in regions:
+        close = get_close_matches(city, CITIES_BY_REGION.get(region, {}), n=1, cutoff=0.85)
+        if close:
+            return CITIES_BY_REGION[region][close[0]]
+    if not regions:
+        places = CITIES_BY_NAME.get(city, [])
+        return places[0] if len(places) == 1 else None
+    known = [region for region in regions if region in CITIES_BY_REGION]
+    return known[0] if known else None
+
+
+@lru_cache(maxsize=32)
+def job_locations(job_description):
+    """
+    Returns the gazetteer places named as "City, ST" / "City, State" in a job description, or () if the job is
+    remote or names none.
+    """
+    if REMOTE_JOB.search(job_description):
+        return ()
+    places = []
+    for match in re.finditer(r",\s*([A-Z]{2}|[A-Z][a-z]+(?: [A-Z][a-z]+)?)\b", job_description):
+        region = _region_key(match.group(1))
+        preceding = re.findall(r"[A-Za-z.']+", job_description[max(0, match.start() - 60):match.start()])
+        for size in (4, 3, 2, 1):
+            if len(preceding) >= size and (_city_key(" ".join(preceding[-size:])), region) in GAZETTEER_INDEX:
+                place = GAZETTEER_INDEX[(_city_key(" ".join(preceding[-size:])), region)]
+                if place not in places:
+                    places.append(place)
+                break
+    return tuple(places)
+
+
+def location_band(miles):
+    """
+    Returns the (score, description) of the `LOCATION_SCORE_BANDS` band for a distance in miles.
+    """
+    for max_miles, score, description in LOCATION_SCORE_BANDS:
+        if max_miles is None or miles <= max_miles:
+            return score, description
+    return LOCATION_SCORE_BANDS[-1][1], LOCATION_SCORE_BANDS[-1][2]
+
+
+def location_note(place, distance, job_place, description):
+    return f"The candidate is based in {place}, {distance} from the job in {job_place}, which means {description}."
+
+
+def location_scoring_text():
+    # Rendered into the prompt hash (see `prompts.tot_prompt_templates`), so band or gazetteer edits invalidate cached results
+    with open(GAZETTEER_PATH, encoding="utf-8") as f:
+        gazetteer = f.read()
+    return json.dumps({"bands": LOCATION_SCORE_BANDS, "missing": LOCATION_MISSING_SCORE, "gazetteer": gazetteer})
+
+
+@lru_cache(maxsize=4096)
+def _score_normalized(normalized, job_places):
+    resolved = resolve_location(normalized)
+    if resolved is None:
+        return None
+    if isinstance(resolved, str):
+        # Unknown city in a known region: only settle it if the whole region is beyond the last finite band
+        nearest, job = min(
+            (haversine_miles(place, job), job) for place in CITIES_BY_REGION[resolved].values() for job in job_places
+        )
+        farthest_band = max(band[0] for band in LOCATION_SCORE_BANDS if band[0] is not None)
+        if nearest - STATE_MARGIN_MILES <= farthest_band:
+            return None
+        score, description = location_band(nearest)
+        city = normalized.split(", ")[0].title()
+        region = resolved.upper() if len(resolved) == 2 else resolved.title()
+        return score, location_note(f"{city}, {region}", f"more than {farthest_band} miles", f"{job.city}, {job.region}", description)
+    miles, job = min((haversine_miles(resolved, job), job) for job in job_places)
+    score, description = location_band(miles)
+    return score, location_note(f"{resolved.city}, {resolved.region}", f"about {miles:.0f} miles", f"{job.city}, {job.region}", description)
+
+
+def score_location(resume_location, job_description):
+    """
+    Scores a resume location against the job location without the LLM.
+
+    Returns:
+        tuple | None: (location_score, location_note), or None if the LLM chain should decide (unknown or ambiguous
+            location, remote or relocation wording, or no office location in the job description).
+    """
+    job_places = job_locations(job_description)
+    if not job_places:
+        return None
+    if resume_location is not None and resume_location == resume_location and AMBIGUOUS_LOCATION.search(str(resume_location)):
+        return None
+    normalized = normalize_location(resume_location)
+    if not normalized:
+        return LOCATION_MISSING_SCORE, "The candidate does not list a location on the resume, which is unprofessional and leaves commute feasibility unknown."
+    return _score_normalized(normalized, job_places)
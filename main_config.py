@@ -44,4 +44,198 @@ ATS_CACHED_RESULTS_PATH = "ATS_Results_Stored.xlsx"
 WEBSITE_RESULTS_PATH = "ATS_Website_Results.xlsx"
 
 ONESHOT_RESULTS_PATH = "ATS_Oneshot_Results.xlsx"
-ONESHOT_CACHED_RESULTS_PATH ="Oneshot_Results_Stored.xlsx"
\ No newline at end of file
+ONESHOT_CACHED_RESULTS_PATH ="Oneshot_Results_Stored.xlsx"
+
+# Maximum number of resumes the async ToT engine evaluates at the same time
+MAX_CONCURRENT_RESUMES = 8
+
+# Persistent LLM response cache (keyed by model, temperature and messages)
+LLM_CACHE_ENABLED = True
+LLM_CACHE_PATH = "llm_cache.sqlite"
+LLM_CACHE_MAX_BYTES = 512 * 1024 * 1024
+LLM_CACHE_TTL_SECONDS = 30 * 24 * 3600
+
+# LLM backend: "openai" for the API, "fake" for the deterministic offline backend (no API key needed)
+LLM_BACKEND = "openai"
+
+# Models used by the ToT chains and by the one-shot prompt
+TOT_MODEL = "gpt-3.5-turbo"
+ONESHOT_MODEL = "gpt-4o"
+
+# Per-resume result store, keyed by (resume, job description, prompt templates, model)
+RESULT_STORE_PATH = "results_store.sqlite"
+
+# Distill the job description once per job into per-category requirements and give each chain only its slice
+DISTILL_JOB_DESCRIPTION = True
+
+# How load_or_generate_ats_results runs the ToT chains: "async" (concurrent API calls) or "batch" (OpenAI Batch API)
+TOT_EXECUTION_MODE = "async"
+
+# Batch API mode: request/result JSONL files, polling interval, lines per batch file, and an optional
+# alternative endpoint (e.g. a local stand-in server); None uses the OpenAI API
+BATCH_WORK_DIR = "batch_runs"
+BATCH_POLL_SECONDS = 60
+BATCH_MAX_REQUESTS = 50000
+BATCH_BASE_URL = None
+
+# Client-side rate limits (set to the account quota) and retry/timeout policy for every LLM request
+OPENAI_RPM_LIMIT = 3500
+OPENAI_TPM_LIMIT = 200000
+OPENAI_MAX_RETRIES = 6
+OPENAI_REQUEST_TIMEOUT_SECONDS = 60
+OPENAI_REQUEST_DEADLINE_SECONDS = 300
+
+# USD per 1M (prompt, completion) tokens, used for the cost columns of the run metrics
+MODEL_PRICES_PER_MILLION_TOKENS = {
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+# Prompt tokens served from the provider's prompt-prefix cache are billed at this fraction of the prompt price
+CACHED_PROMPT_PRICE_FACTOR = 0.5
+
+# Directory for the per-run LLM metrics reports (JSON, CSV, Prometheus text file)
+METRICS_DIR = "run_metrics"
+
+# Cascade mode: one-shot screen for everyone, full ToT only for contenders (one-shot summary_score at or above
+# the threshold, or within CASCADE_MARGIN points of the CASCADE_TOP_K-th best one-shot score)
+CASCADE_SCORE_THRESHOLD = 60
+CASCADE_TOP_K = 50
+CASCADE_MARGIN = 5
+CASCADE_RESULTS_PATH = "ATS_Cascade_Results.xlsx"
+
+# BM25 lexical prefilter run before any LLM call, against the distilled job requirements (the job description
+# without DISTILL_JOB_DESCRIPTION). "deprioritize" evaluates everyone but the strongest lexical matches first;
+# "drop" skips resumes below the cutoff (their rows stay empty). The best PREFILTER_MIN_KEEP resumes are always
+# kept; the rest need at least PREFILTER_RELATIVE_CUTOFF times the best BM25 score. Off by default
+PREFILTER_ENABLED = False
+PREFILTER_MODE = "deprioritize"
+PREFILTER_MIN_KEEP = 100
+PREFILTER_RELATIVE_CUTOFF = 0.2
+PREFILTER_INDEX_PATH = "resume_index.npz"
+
+# Result files appended to while a run is in progress (.jsonl, or .parquet with pyarrow), and their flush interval
+ATS_STREAM_RESULTS_PATH = "ATS_Results.jsonl"
+ONESHOT_STREAM_RESULTS_PATH = "ATS_Oneshot_Results.jsonl"
+RESULT_SINK_FLUSH_ROWS = 50
+RESULT_SINK_FLUSH_SECONDS = 10
+
+# Write-ahead journal of every completed chain and summary, replayed by load_or_generate_ats_results(resume_run=<run_id>).
+# Entries are written and flushed by a background thread, which survives a process crash; JOURNAL_FSYNC also fsyncs
+# each write so entries survive power loss, at the cost of disk syncs during the run
+JOURNAL_DIR = "run_journal"
+JOURNAL_FSYNC = False
+
+# Request JSON-mode responses for the scoring stages (stage 3, S3, one-shot), and how many times a scoring
+# stage whose answer cannot be parsed is re-asked before the resume is given up on
+STRUCTURED_OUTPUT = True
+SCORE_REPAIR_ATTEMPTS = 2
+
+# run_tot_multiple_times: samples drawn by the first and each further scoring request, the cap per scoring step,
+# and the standard error (score points) at which sampling of a step stops
+MULTI_RUN_INITIAL_SAMPLES = 3
+MULTI_RUN_SAMPLE_STEP = 3
+MULTI_RUN_MAX_SAMPLES = 9
+MULTI_RUN_SE_THRESHOLD = 2.0
+
+# Request token logprobs on the scoring stages (stage 3, S3, one-shot) and store the expected score and the
+# entropy (bits) of the score distribution as *_score_expected / *_score_entropy; the top alternatives per token
+LOGPROB_SCORING = False
+LOGPROB_TOP_ALTERNATIVES = 10
+
+# Per-stage model routing. Each profile maps a stage to its route: {"model", "temperature", "max_tokens"} (missing
+# keys fall back to TOT_MODEL, the default temperature and no cap). A stage uses its own entry (E1..O3, S1..S3, JD,
+# oneshot), else the entry of its step ("stage1" = E1/L1/ED1/SK1/LA1/O1, "stage2", "stage3"), else "default";
+# repair calls use the route of the stage they repair. MODEL_ROUTING_PROFILE is the profile used unless a run
+# selects another (prompts.use_routing_profile); "default" reproduces TOT_MODEL / ONESHOT_MODEL everywhere.
+MODEL_ROUTING_PROFILES = {
+    "default": {
+        "default": {"model": TOT_MODEL},
+        "oneshot": {"model": ONESHOT_MODEL},
+    },
+    "fast": {
+        "default": {"model": "gpt-4o-mini"},
+        "stage1": {"model": "gpt-4o-mini", "temperature": 0.0, "max_tokens": 400},
+        "S1": {"model": "gpt-4o-mini", "temperature": 0.0, "max_tokens": 400},
+        "oneshot": {"model": "gpt-4o-mini"},
+    },
+    "balanced": {
+        "default": {"model": "gpt-3.5-turbo"},
+        "stage1": {"model": "gpt-4o-mini", "temperature": 0.0, "max_tokens": 400},
+        "S1": {"model": "gpt-4o-mini", "temperature": 0.0, "max_tokens": 400},
+        "JD": {"model": "gpt-4o-mini", "temperature": 0.0},
+        "stage3": {"model": "gpt-4o"},
+        "S3": {"model": "gpt-4o"},
+        "oneshot": {"model": "gpt-4o"},
+    },
+    "accurate": {
+        "default": {"model": "gpt-4o"},
+        "stage1": {"model": "gpt-4o-mini", "temperature": 0.0},
+        "oneshot": {"model": "gpt-4o"},
+    },
+}
+MODEL_ROUTING_PROFILE = "default"
+
+# Stream the scoring stages (stage 3, S3, one-shot) and close the stream as soon as the score/note fields the
+# pipeline needs are complete, instead of waiting for the end of the completion
+STREAM_COMPLETIONS = True
+
+# max_tokens caps for the free-text steps (by stage or chain step, see MODEL_ROUTING_PROFILES), used by every
+# route that does not set its own max_tokens
+STAGE_MAX_TOKENS = {"stage1": 400, "stage2": 300, "S1": 400, "S2": 300}
+
+# Packed one-shot mode: several resumes per prompt with a single copy of the job description. Candidates are added
+# to a prompt while its estimated prompt plus answer tokens (ONESHOT_PACK_ANSWER_TOKENS per candidate) stay within
+# ONESHOT_PACK_TOKEN_BUDGET, up to ONESHOT_PACK_MAX_CANDIDATES per prompt
+ONESHOT_PACKED = False
+ONESHOT_PACK_TOKEN_BUDGET = 12000
+ONESHOT_PACK_MAX_CANDIDATES = 8
+ONESHOT_PACK_ANSWER_TOKENS = 250
+
+# Run each ToT chain as one conversation: a system message with the role instructions and the full job description
+# (identical for every resume, chain and step, so the provider's prompt-prefix cache serves it) followed by the
+# steps as successive turns. Replaces the per-chain job description slices of DISTILL_JOB_DESCRIPTION.
+CHAIN_SESSIONS = False
+
+# Score summaries with the local summary model (summary_model.py) when its error bound at SUMMARY_MODEL_COVERAGE is
+# at most SUMMARY_MODEL_MAX_ERROR score points; it is trained on first use from at least SUMMARY_MODEL_MIN_ROWS rows
+LOCAL_SUMMARY_MODEL = False
+SUMMARY_MODEL_PATH = "summary_model.npz"
+SUMMARY_MODEL_TRAINING_PATHS = [ATS_CACHED_RESULTS_PATH, ATS_STREAM_RESULTS_PATH]
+SUMMARY_MODEL_MIN_ROWS = 50
+SUMMARY_MODEL_MAX_ERROR = 5.0
+SUMMARY_MODEL_COVERAGE = 0.9
+SUMMARY_MODEL_CALIBRATION_FRACTION = 0.25
+SUMMARY_MODEL_RIDGE = 1.0
+
+# Replace SK1 (skills extraction) with the deterministic skills matcher (skills_matcher.py): the resume's skills
+# are matched against the job description through a synonym taxonomy and the matched/missing lists go straight
+# to SK2. False keeps the LLM step
+LOCAL_SKILLS_MATCH = True
+
+# Score the location chain in-process (location_gazetteer.py): resume and job locations are resolved with the
+# bundled gazetteer and the distance picks a (max miles, score, description) band; None is the open-ended last
+# band. Unknown or ambiguous locations, remote or relocation wording, and jobs without an office location still
+# go through the LLM chain. A resume without a location gets LOCATION_MISSING_SCORE
+LOCAL_LOCATION_SCORING = True
+LOCATION_SCORE_BANDS = [
+    (25, 95, "an easy daily commute"),
+    (50, 80, "a feasible but longer commute"),
+    (100, 55, "a long commute that may require relocation"),
+    (500, 35, "relocation is required"),
+    (None, 20, "a long-distance relocation is required"),
+]
+LOCATION_MISSING_SCORE = 10
+
+# Memoize the chains listed in SECTION_MEMO_CHAINS in the result store by canonical section (section_memo.py:
+# casing, punctuation, abbreviations and item order normalized) and job text, so resumes whose section only
+# differs in form reuse one chain run. The languages chain is keyed by its canonical LA1 answer instead
+SECTION_MEMO = True
+SECTION_MEMO_CHAINS = ["location", "education", "languages"]
+
+# Skip the chains of PRUNABLE_CATEGORIES the job description does not constrain (jd_constraints.py); they get the
+# score and note below ({category} is filled in) and are left out of the composite score
+PRUNE_UNCONSTRAINED_CHAINS = True
+PRUNABLE_CATEGORIES = ["languages", "location"]
+UNCONSTRAINED_CATEGORY_SCORE = 50
+UNCONSTRAINED_CATEGORY_NOTE = "The job description states no {category} requirement, so this category was not evaluated and does not count toward the composite score."
@@ -0,0 +1,195 @@
+"""
+metrics.py
+
+Token, latency and cost instrumentation for LLM calls. `prompts.acall_openai` records every call, and
+`collector.export()` writes the per-stage summary as `<prefix>_metrics.json`, `<prefix>_calls.csv` and
+`<prefix>_metrics.prom` (Prometheus text format) at the end of a run.
+"""
+
+import csv
+import json
+import math
+import os
+import threading
+import time
+from main_config import MODEL_PRICES_PER_MILLION_TOKENS, CACHED_PROMPT_PRICE_FACTOR
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, math.inf)
+
+CALL_FIELDS = [
+    "timestamp", "stage", "model", "prompt_tokens", "cached_prompt_tokens", "completion_tokens",
+    "cost_usd", "latency_seconds", "retries", "cache_hit"
+]
+
+
+def call_cost(model, prompt_tokens, completion_tokens, cached_tokens=0):
+    """
+    Returns the USD cost of a call from `MODEL_PRICES_PER_MILLION_TOKENS` (0.0 for unknown models).
+    Cached prompt tokens are billed at `CACHED_PROMPT_PRICE_FACTOR` times the prompt price.
+    """
+    prompt_price, completion_price = MODEL_PRICES_PER_MILLION_TOKENS.get(model, (0.0, 0.0))
+    billed_prompt_tokens = prompt_tokens - cached_tokens + cached_tokens * CACHED_PROMPT_PRICE_FACTOR
+    return (billed_prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _bucket_label(bound):
+    return "+Inf" if bound == math.inf else f"{bound:g}"
+
+
+class MetricsCollector:
+    """
+    Thread-safe in-memory store of per-call records.
+    """
+
+    def __init__(self):
+        self._records = []
+        self._lock = threading.Lock()
+
+    def record(self, stage, model, prompt_tokens=0, completion_tokens=0, latency=0.0, retries=0, cache_hit=False, cached_tokens=0):
+        entry = {
+            "timestamp": time.time(),
+            "stage": stage or "unlabeled",
+            "model": model,
+            "prompt_tokens": prompt_tokens,
+            "cached_prompt_tokens": cached_tokens,
+            "completion_tokens": completion_tokens,
+            "cost_usd": call_cost(model, prompt_tokens, completion_tokens, cached_tokens),
+            "latency_seconds": latency,
+            "retries": retries,
+            "cache_hit": cache_hit
+        }
+        with self._lock:
+            self._records.append(entry)
+
+    def records(self):
+        with self._lock:
+            return list(self._records)
+
+    def reset(self):
+        with self._lock:
+            self._records = []
+
+    def summary(self):
+        """
+        Aggregates the records per (stage, model).
+
+        Returns:
+            dict: {"stages": [per-stage dicts], "totals": run totals}
+        """
+        groups = {}
+        for entry in self.records():
+            groups.setdefault((entry["stage"], entry["model"]), []).append(entry)
+
+        stages = []
+        for (stage, model), entries in sorted(groups.items()):
+            latencies = sorted(entry["latency_seconds"] for entry in entries)
+            stages.append({
+                "stage": stage,
+                "model": model,
+                "calls": len(entries),
+                "cache_hits": sum(entry["cache_hit"] for entry in entries),
+                "retries": sum(entry["retries"] for entry in entries),
+                "prompt_tokens": sum(entry["prompt_tokens"] for entry in entries),
+                "cached_prompt_tokens": sum(entry["cached_prompt_tokens"] for entry in entries),
+                "completion_tokens": sum(entry["completion_tokens"] for entry in entries),
+                "cost_usd": round(sum(entry["cost_usd"] for entry in entries), 6),
+                "latency_seconds_sum": sum(latencies),
+                "latency_seconds_mean": sum(latencies) / len(latencies),
+                "latency_seconds_p50": _percentile(latencies, 0.50),
+                "latency_seconds_p90": _percentile(latencies, 0.90),
+                "latency_seconds_p99": _percentile(latencies, 0.99),
+                "latency_seconds_max": latencies[-1],
+                "latency_histogram": {
+                    _bucket_label(bound): sum(latency <= bound for latency in latencies) for bound in LATENCY_BUCKETS
+                }
+            })
+
+        totals = {
+            key: sum(stage[key] for stage in stages)
+            for key in ["calls", "cache_hits", "retries", "prompt_tokens", "cached_prompt_tokens", "completion_tokens", "cost_usd"]
+        }
+        totals["cost_usd"] = round(totals["cost_usd"], 6)
+        return {"stages": stages, "totals": totals}
+
+    def to_prometheus(self, summary=None):
+        """
+        Renders the summary in the Prometheus text exposition format.
+        """
+        summary = summary or self.summary()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{val}"' for key, val in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}")
+
+        stages = summary["stages"]
+        base = [{"stage": s["stage"], "model": s["model"]} for s in stages]
+
+        metric("tot_llm_calls_total", "counter", "LLM calls by stage and model.",
+               [(labels, s["calls"]) for labels, s in zip(base, stages)])
+        metric("tot_llm_cache_hits_total", "counter", "LLM calls served from the response cache.",
+               [(labels, s["cache_hits"]) for labels, s in zip(base, stages)])
+        metric("tot_llm_retries_total", "counter", "Scheduler retries of LLM calls.",
+               [(labels, s["retries"]) for labels, s in zip(base, stages)])
+        metric("tot_llm_tokens_total", "counter", "Tokens reported by the API, by kind.",
+               [({**labels, "kind": "prompt"}, s["prompt_tokens"]) for labels, s in zip(base, stages)] +
+               [({**labels, "kind": "cached_prompt"}, s["cached_prompt_tokens"]) for labels, s in zip(base, stages)] +
+               [({**labels, "kind": "completion"}, s["completion_tokens"]) for labels, s in zip(base, stages)])
+        metric("tot_llm_cost_usd_total", "counter", "Estimated LLM cost in USD.",
+               [(labels, s["cost_usd"]) for labels, s in zip(base, stages)])
+
+        lines.append("# HELP tot_llm_latency_seconds LLM call latency in seconds.")
+        lines.append("# TYPE tot_llm_latency_seconds histogram")
+        for s in stages:
+            label_text = f'stage="{s["stage"]}",model="{s["model"]}"'
+            for bucket, count in s["latency_histogram"].items():
+                lines.append(f'tot_llm_latency_seconds_bucket{{{label_text},le="{bucket}"}} {count}')
+            lines.append(f"tot_llm_latency_seconds_sum{{{label_text}}} {s['latency_seconds_sum']}")
+            lines.append(f"tot_llm_latency_seconds_count{{{label_text}}} {s['calls']}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, prefix):
+        """
+        Writes the JSON summary, the per-call CSV and the Prometheus file for the current records.
+
+        Args:
+            prefix (str): Path prefix, e.g. 'run_metrics/tot' -> 'run_metrics/tot_metrics.json', ...
+
+        Returns:
+            dict: The summary that was written.
+        """
+        directory = os.path.dirname(prefix)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        summary = self.summary()
+        with open(f"{prefix}_metrics.json", "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+        with open(f"{prefix}_calls.csv", "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=CALL_FIELDS)
+            writer.writeheader()
+            writer.writerows(self.records())
+
+        with open(f"{prefix}_metrics.prom", "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus(summary))
+
+        totals = summary["totals"]
+        print(f"[INFO] LLM metrics: {totals['calls']} calls ({totals['cache_hits']} cached), "
+              f"{totals['prompt_tokens']} prompt ({totals['cached_prompt_tokens']} cached) / {totals['completion_tokens']} completion tokens, "
+              f"${totals['cost_usd']:.4f}, written to {prefix}_metrics.*")
+        return summary
+
+
+collector = MetricsCollector()
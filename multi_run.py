@@ -0,0 +1,198 @@
+"""
+multi_run.py
+
+Multi-run averaging of the Tree-of-Thought (ToT) scores (`run_tot_multiple_times`).
+
+Repeating whole chains to average out LLM variance costs ~21 calls per repeat. Here each chain's
+extraction (step 1) and evaluation (step 2) run once and are shared by all repeats; only the scoring step
+(stage 3, and S3 for the summary) is re-sampled, using the API's `n` parameter so several samples come
+back from one request. Sampling stops per resume and category as soon as the standard error of the mean
+score falls below `se_threshold`, so consistent categories cost one request and only noisy ones draw more.
+
+The output has the schema of `ATS_Results.xlsx` (category and summary scores are sample means) plus one
+`<category>_score_variance` column per score.
+"""
+
+import asyncio
+import statistics
+import pandas as pd
+from prompts import (
+    TOT_CHAINS, CHAIN_STAGE_PREFIXES, SCORE_RESPONSE_FORMAT, S1_prompt, S2_prompt, S3_prompt, ScoreParseError,
+    acall_openai, acall_openai_samples, arepair_score_output, local_chain_result, local_step1_output, parse_score_output,
+    TOT_STAGES, prompt_template_hash, route_key, run_sync, tot_prompt_templates
+)
+from jd_distill import adistill_job_description
+from result_cache import get_result_store, result_key, text_hash
+from data_loader import ATS_COLUMNS, row_composite_score
+from jd_constraints import composite_weights, pruned_chain_result
+from main_config import (
+    MAX_CONCURRENT_RESUMES, DISTILL_JOB_DESCRIPTION,
+    MULTI_RUN_INITIAL_SAMPLES, MULTI_RUN_SAMPLE_STEP, MULTI_RUN_MAX_SAMPLES, MULTI_RUN_SE_THRESHOLD
+)
+
+SCORE_STEPS = list(TOT_CHAINS) + ["summary"]
+VARIANCE_COLUMNS = [f"{step}_score_variance" for step in SCORE_STEPS]
+
+
+def standard_error(scores):
+    if len(scores) < 2:
+        return float("inf")
+    return statistics.stdev(scores) / len(scores) ** 0.5
+
+
+async def asample_score(prompt, category, stage, initial_samples=MULTI_RUN_INITIAL_SAMPLES, sample_step=MULTI_RUN_SAMPLE_STEP,
+                        max_samples=MULTI_RUN_MAX_SAMPLES, se_threshold=MULTI_RUN_SE_THRESHOLD):
+    """
+    Samples a scoring prompt until the standard error of the mean score is at most `se_threshold`
+    (or `max_samples` samples were drawn). Unparseable samples are dropped.
+
+    Returns:
+        tuple: (mean score, sample variance, note of the sample closest to the mean, number of scores)
+    """
+    scores, notes = [], []
+    drawn, sample_round = 0, 0
+    last_output = ""
+    while drawn < max_samples:
+        n = min(initial_samples if sample_round == 0 else sample_step, max_samples - drawn)
+        outputs = await acall_openai_samples(prompt, n, stage=stage, response_format=SCORE_RESPONSE_FORMAT,
+                                             sample_round=sample_round)
+        drawn += n
+        sample_round += 1
+        for output in outputs:
+            last_output = output
+            try:
+                score, note = parse_score_output(output, category)
+            except ScoreParseError:
+                continue
+            scores.append(score)
+            notes.append(note)
+        if standard_error(scores) <= se_threshold:
+            break
+
+    if not scores:
+        score, note = await arepair_score_output(prompt, last_output, category, stage)
+        scores, notes = [score], [note]
+
+    mean = statistics.fmean(scores)
+    variance = statistics.variance(scores) if len(scores) > 1 else 0.0
+    closest = min(range(len(scores)), key=lambda i: abs(scores[i] - mean))
+    return mean, variance, notes[closest], len(scores)
+
+
+async def evaluate_resume_sampled_async(resume, job_description, job_requirements=None, **sampling):
+    """
+    Evaluates one resume with shared extraction/evaluation steps and adaptively sampled scoring steps.
+
+    Returns:
+        dict: Mean '<step>_score', '<step>_note' and '<step>_score_variance' for every category and the summary.
+    """
+    def job_context(category):
+        return job_requirements[category] if job_requirements else job_description
+
+    async def sample_category(category):
+        local_result = pruned_chain_result(category, job_description) or local_chain_result(category, resume, job_context(category))
+        if local_result is not None:
+            # Computed in-process, so there is nothing to sample
+            return local_result[0], 0.0, local_result[1], 1
+        extract_section, step1_prompt, step2_prompt, step3_prompt = TOT_CHAINS[category]
+        prefix = CHAIN_STAGE_PREFIXES[category]
+        step1_output = local_step1_output(category, resume, job_context(category))
+        if step1_output is None:
+            step1_output = await acall_openai(step1_prompt(extract_section(resume), job_context(category)), stage=f"{prefix}1")
+        step2_output = await acall_openai(step2_prompt(step1_output, job_context(category)), stage=f"{prefix}2")
+        return await asample_score(step3_prompt(step2_output), category, f"{prefix}3", **sampling)
+
+    results = await asyncio.gather(*(sample_category(category) for category in TOT_CHAINS))
+
+    row = {}
+    for category, (mean, variance, note, _) in zip(TOT_CHAINS, results):
+        row[f"{category}_score"] = round(mean, 2)
+        row[f"{category}_note"] = note
+        row[f"{category}_score_variance"] = round(variance, 2)
+
+    # The summary chain sees the mean category scores
+    s1_output = await acall_openai(S1_prompt(
+        row["experience_score"], row["experience_note"],
+        row["location_score"], row["location_note"],
+        row["education_score"], row["education_note"],
+        row["skills_score"], row["skills_note"],
+        row["languages_score"], row["languages_note"],
+        row["other_score"], row["other_note"]
+    ), stage="S1")
+    s2_output = await acall_openai(S2_prompt(s1_output, job_context("summary")), stage="S2")
+    mean, variance, note, _ = await asample_score(S3_prompt(s2_output), "summary", "S3", **sampling)
+    row["summary_score"] = round(mean, 2)
+    row["summary_note"] = note
+    row["summary_score_variance"] = round(variance, 2)
+    return row
+
+
+def run_tot_multiple_times(resumes, job_description, max_samples=MULTI_RUN_MAX_SAMPLES, se_threshold=MULTI_RUN_SE_THRESHOLD,
+                           initial_samples=MULTI_RUN_INITIAL_SAMPLES, sample_step=MULTI_RUN_SAMPLE_STEP,
+                           max_concurrency=MAX_CONCURRENT_RESUMES, distill_jd=DISTILL_JOB_DESCRIPTION,
+                           result_store=None, force_rerun=False, save_path=None):
+    """
+    Averages the ToT scores over several samples per scoring step, with adaptive stopping.
+
+    Args:
+        resumes (list[dict]): Parsed resume dictionaries.
+        job_description (str): Job description string.
+        max_samples (int): Upper bound on the samples drawn per resume and scoring step.
+        se_threshold (float): Sampling of a step stops once the standard error of its mean score is at most this.
+        initial_samples (int): Samples drawn by the first request of each step (>= 2 to estimate the error).
+        sample_step (int): Samples drawn by each further request.
+        max_concurrency (int): Maximum number of resumes evaluated concurrently.
+        distill_jd (bool): If True, give each chain only its slice of the distilled job description.
+        result_store (ResultStore | None): Per-resume result store. Defaults to `RESULT_STORE_PATH`.
+        force_rerun (bool): If True, re-evaluate every resume and overwrite its cached result.
+        save_path (str | None): Excel file to save the results to. None skips saving.
+
+    Returns:
+        pd.DataFrame: `ATS_Results.xlsx` columns plus `composite_score` and the `*_score_variance` columns.
+    """
+    store = result_store if result_store is not None else get_result_store()
+    prompt_hash = prompt_template_hash(tot_prompt_templates(distill_jd, sessions=False))
+    # Averaged results depend on the sampling settings as well as the prompts
+    sampling_hash = text_hash(f"{prompt_hash}|{initial_samples}|{sample_step}|{max_samples}|{se_threshold}")
+    model_key = route_key(TOT_STAGES + (["JD"] if distill_jd else []))
+    keys = [result_key("tot_multi", resume, job_description, sampling_hash, model_key) for resume in resumes]
+    cached = {} if force_rerun else store.get_many(keys)
+    missing = [i for i, key in enumerate(keys) if key not in cached]
+    print(f"[INFO] Reusing {len(cached)} cached multi-run results, evaluating {len(missing)} resumes...")
+
+    sampling = {
+        "initial_samples": initial_samples, "sample_step": sample_step,
+        "max_samples": max_samples, "se_threshold": se_threshold
+    }
+
+    async def evaluate_all():
+        semaphore = asyncio.Semaphore(max_concurrency)
+        job_requirements = await adistill_job_description(job_description) if distill_jd and missing else None
+
+        async def evaluate(i):
+            async with semaphore:
+                try:
+                    row = await evaluate_resume_sampled_async(resumes[i], job_description, job_requirements, **sampling)
+                except Exception as e:
+                    print(f"[WARN] Resume #{i + 1} failed after retries and was skipped: {type(e).__name__}: {e}")
+                    return
+            store.put(keys[i], row)
+            cached[keys[i]] = row
+            print(f" Evaluated resume #{i + 1} - Summary Score: {row['summary_score']} (variance {row['summary_score_variance']})")
+
+        await asyncio.gather(*(evaluate(i) for i in missing))
+
+    if missing:
+        run_sync(evaluate_all())
+
+    rows = []
+    weights = composite_weights(job_description)
+    for i, key in enumerate(keys):
+        row = {**cached.get(key, {}), "id": i + 1}
+        rows.append({**row, "composite_score": row_composite_score(row, weights)})
+    results = pd.DataFrame(rows, columns=ATS_COLUMNS + ["composite_score"] + VARIANCE_COLUMNS)
+
+    if save_path:
+        results.to_excel(save_path, index=False)
+        print(f"[INFO] Multi-run ATS results saved to {save_path}")
+    return results
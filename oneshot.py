@@ -1,48 +1,71 @@
-from prompts import run_oneshot_chain, parse_oneshot_response
+from prompts import run_oneshot_scores, run_oneshot_packed, LOGPROB_COLUMNS
+from jd_constraints import composite_weights
+from main_config import LOGPROB_SCORING, ONESHOT_PACKED
 import pandas as pd
 
-def evaluate_all_oneshot_resumes(resumes, job_description):
+ONESHOT_COLUMNS = [
+    "id",
+    "summary_score", "summary_note",
+    "location_score", "location_note",
+    "experience_score", "experience_note",
+    "education_score", "education_note",
+    "skills_score", "skills_note",
+    "languages_score", "languages_note",
+    "other_score", "other_note",
+    "composite_score"
+]
+
+def oneshot_row(resume_id, parsed, weights=None):
+    # Compute composite score using the job's weights (see `jd_constraints.composite_weights`), standard ones by default
+    # Safe fallback using get() and default to 0 if value is None
+    weights = weights or composite_weights()
+    composite_score = sum(weight * (parsed.get(f"{category}_score") or 0) for category, weight in weights.items())
+
+    return {
+        "id": resume_id,
+        **parsed,
+        "composite_score": round(composite_score, 2)
+    }
+
+def evaluate_all_oneshot_resumes(resumes, job_description, ids=None, on_result=None, packed=ONESHOT_PACKED):
     """
     Loops through resumes and evaluates each one using the one-shot prompt approach.
     Returns a DataFrame identical in structure to ats_results.
+    `ids` optionally gives the result id of each resume (defaults to position + 1).
+    `on_result` is optionally called with each row as soon as it is ready (e.g. `ResultSink.write`).
+    With `packed`, several resumes share one prompt (see `prompts.arun_oneshot_packed`); resumes whose evaluation
+    failed are left out of the DataFrame.
     """
-    oneshot_columns = [
-        "id",
-        "summary_score", "summary_note",
-        "location_score", "location_note",
-        "experience_score", "experience_note",
-        "education_score", "education_note",
-        "skills_score", "skills_note",
-        "languages_score", "languages_note",
-        "other_score", "other_note",
-        "composite_score"
-    ]
-    
-    df = pd.DataFrame(columns=oneshot_columns)
+    if ids is None:
+        ids = [i + 1 for i in range(len(resumes))]
+    # Categories the job description does not constrain are left out of the composite score
+    weights = composite_weights(job_description)
+
+    # Rows are collected as plain records; the DataFrame is built once at the end
+    rows = []
+
+    if packed:
+        rows = [None] * len(resumes)
+
+        def collect(i, parsed):
+            rows[i] = oneshot_row(ids[i], parsed, weights)
+            if on_result is not None:
+                on_result(rows[i])
+
+        run_oneshot_packed(resumes, job_description, on_parsed=collect)
+        # Resumes that failed have no row and stay unevaluated
+        rows = [row for row in rows if row is not None]
+        return pd.DataFrame(rows, columns=ONESHOT_COLUMNS + (LOGPROB_COLUMNS if LOGPROB_SCORING else []))
 
     for i, resume in enumerate(resumes):
-        print(f"Running one-shot evaluation for resume {i + 1}...")
-
-        # Run one-shot LLM call and parse result
-        response = run_oneshot_chain(resume, job_description)
-        parsed = parse_oneshot_response(response)
-
-        # Compute composite score using standard weights
-        # Safe fallback using get() and default to 0 if value is None
-        composite_score = (
-            0.3 * (parsed.get("experience_score") or 0) +
-            0.2 * (parsed.get("skills_score") or 0) +
-            0.2 * (parsed.get("education_score") or 0) +
-            0.1 * (parsed.get("languages_score") or 0) +
-            0.1 * (parsed.get("other_score") or 0) +
-            0.1 * (parsed.get("location_score") or 0)
-        )
-
-
-        df.loc[i] = {
-            "id": i + 1,
-            **parsed,
-            "composite_score": round(composite_score, 2)
-        }
-
-    return df
+        print(f"Running one-shot evaluation for resume {ids[i]}...")
+
+        # Run one-shot LLM call and parse result (re-asking the call if scores are missing)
+        parsed = run_oneshot_scores(resume, job_description)
+
+        row = oneshot_row(ids[i], parsed, weights)
+        rows.append(row)
+        if on_result is not None:
+            on_result(row)
+
+    return pd.DataFrame(rows, columns=ONESHOT_COLUMNS + (LOGPROB_COLUMNS if LOGPROB_SCORING else []))
@@ -0,0 +1,222 @@
+"""
+prefilter.py
+
+Local BM25 lexical prefilter that runs before any LLM call.
+
+Each resume's summary, experience, skills and education fields are tokenized into a sparse term-frequency
+matrix (one row per resume, one column per term, `scipy.sparse.csr_matrix`). The job description is scored
+against every row with Okapi BM25, and resumes far below the best lexical match can be kept out of the
+LLM pipeline. The index is keyed by resume hash, saved to disk (`PREFILTER_INDEX_PATH`) and updated
+incrementally: resumes already indexed are never re-tokenized, and new ones are appended as new rows.
+
+The query is `prefilter_query`: with `DISTILL_JOB_DESCRIPTION` on, the distilled per-category requirements
+(the same cached distillation the ToT chains use) rather than the raw posting, whose boilerplate ("About us",
+benefits, equal opportunity statements) would otherwise reward resumes for sharing it.
+
+The cutoff is deliberately recall-safe: the best `PREFILTER_MIN_KEEP` resumes are always kept, and only
+resumes scoring below `PREFILTER_RELATIVE_CUTOFF` times the best score are dropped.
+"""
+
+import os
+import re
+from collections import Counter
+import numpy as np
+import scipy.sparse as sp
+from result_cache import resume_hash
+from jd_distill import distill_job_description
+from main_config import PREFILTER_INDEX_PATH, PREFILTER_MIN_KEEP, PREFILTER_RELATIVE_CUTOFF, DISTILL_JOB_DESCRIPTION
+
+INDEXED_FIELDS = ["summary", "experience", "skills", "education"]
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have", "in", "is", "it", "its",
+    "of", "on", "or", "our", "that", "the", "their", "this", "to", "we", "will", "with", "you", "your"
+}
+
+
+def tokenize(text):
+    """
+    Lowercases `text` and splits it into terms. Keeps '+', '#' and '.' inside terms so that C++, C# and
+    Node.js survive; trailing dots (sentence ends) are stripped.
+    """
+    tokens = (token.rstrip(".") for token in TOKEN_PATTERN.findall(str(text).lower()))
+    return [token for token in tokens if token and token not in STOPWORDS]
+
+
+def resume_document(resume):
+    """
+    Returns the text of the indexed resume fields (missing / NaN fields are skipped).
+    """
+    return "\n".join(str(resume[field]) for field in INDEXED_FIELDS if field in resume and resume[field] == resume[field])
+
+
+class BM25Index:
+    """
+    Incrementally built BM25 index over resumes.
+
+    Args:
+        k1 (float): Term-frequency saturation.
+        b (float): Document-length normalization.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocabulary = {}
+        self.doc_ids = []
+        self._doc_rows = {}
+        self.term_freqs = sp.csr_matrix((0, 0), dtype=np.float32)
+        self.modified = False
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def add(self, resumes):
+        """
+        Indexes the resumes that are not in the index yet.
+
+        Returns:
+            int: Number of newly indexed resumes.
+        """
+        rows, cols, values = [], [], []
+        new_ids = []
+        for resume in resumes:
+            doc_id = resume_hash(resume)
+            if doc_id in self._doc_rows or doc_id in new_ids:
+                continue
+            row = len(new_ids)
+            new_ids.append(doc_id)
+            for term, count in Counter(tokenize(resume_document(resume))).items():
+                rows.append(row)
+                cols.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+                values.append(count)
+
+        if not new_ids:
+            return 0
+
+        # New terms widen the matrix; existing rows just get empty columns
+        shape = (len(new_ids), len(self.vocabulary))
+        old = self.term_freqs
+        old.resize((old.shape[0], len(self.vocabulary)))
+        new = sp.csr_matrix((values, (rows, cols)), shape=shape, dtype=np.float32)
+        self.term_freqs = sp.vstack([old, new], format="csr")
+
+        for doc_id in new_ids:
+            self._doc_rows[doc_id] = len(self.doc_ids)
+            self.doc_ids.append(doc_id)
+        self.modified = True
+        return len(new_ids)
+
+    def score(self, query, resumes):
+        """
+        Returns the BM25 score of `query` against each of `resumes` (which must already be indexed).
+
+        Returns:
+            np.ndarray: One score per resume, in input order.
+        """
+        rows = np.array([self._doc_rows[resume_hash(resume)] for resume in resumes], dtype=np.int64)
+        query_terms = Counter(term for term in tokenize(query) if term in self.vocabulary)
+        if not query_terms or not len(rows):
+            return np.zeros(len(rows))
+
+        columns = np.array([self.vocabulary[term] for term in query_terms])
+        weights = np.array(list(query_terms.values()), dtype=np.float64)
+
+        doc_count = self.term_freqs.shape[0]
+        doc_freq = np.bincount(self.term_freqs.indices, minlength=self.term_freqs.shape[1])[columns]
+        idf = np.log(1 + (doc_count - doc_freq + 0.5) / (doc_freq + 0.5))
+
+        lengths = np.asarray(self.term_freqs.sum(axis=1)).ravel()
+        average_length = lengths.mean() or 1.0
+        norm = self.k1 * (1 - self.b + self.b * lengths[rows] / average_length)
+
+        tf = self.term_freqs[rows][:, columns].toarray()
+        saturated = tf * (self.k1 + 1) / (tf + norm[:, None])
+        return saturated @ (idf * weights)
+
+    def save(self, path):
+        terms = [None] * len(self.vocabulary)
+        for term, column in self.vocabulary.items():
+            terms[column] = term
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        np.savez_compressed(
+            path,
+            data=self.term_freqs.data,
+            indices=self.term_freqs.indices,
+            indptr=self.term_freqs.indptr,
+            shape=np.array(self.term_freqs.shape),
+            terms=np.array(terms, dtype=str),
+            doc_ids=np.array(self.doc_ids, dtype=str),
+            params=np.array([self.k1, self.b])
+        )
+        self.modified = False
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as saved:
+            k1, b = saved["params"]
+            index = cls(k1=float(k1), b=float(b))
+            index.term_freqs = sp.csr_matrix(
+                (saved["data"], saved["indices"], saved["indptr"]), shape=tuple(saved["shape"])
+            )
+            index.vocabulary = {term: column for column, term in enumerate(saved["terms"].tolist())}
+            index.doc_ids = saved["doc_ids"].tolist()
+        index._doc_rows = {doc_id: row for row, doc_id in enumerate(index.doc_ids)}
+        return index
+
+
+_indexes = {}
+
+
+def get_resume_index(path=PREFILTER_INDEX_PATH):
+    """
+    Returns the shared `BM25Index` for `path`, loading it from disk on first use (or starting an empty one).
+    """
+    if path not in _indexes:
+        _indexes[path] = BM25Index.load(path) if path and os.path.exists(path) else BM25Index()
+    return _indexes[path]
+
+
+def prefilter_query(job_description, result_store=None):
+    """
+    Returns the text resumes are scored against: the distilled requirements of every category if
+    `DISTILL_JOB_DESCRIPTION` is on (the full job description if the distillation is incomplete), else the job description.
+    """
+    if not DISTILL_JOB_DESCRIPTION:
+        return job_description
+    return distill_job_description(job_description, result_store=result_store)["summary"]
+
+
+def prefilter_resumes(resumes, job_description, index=None, min_keep=PREFILTER_MIN_KEEP,
+                      relative_cutoff=PREFILTER_RELATIVE_CUTOFF, index_path=PREFILTER_INDEX_PATH):
+    """
+    Scores every resume against the job description and applies the recall-safe cutoff.
+
+    Args:
+        resumes (list[dict]): Parsed resume dictionaries.
+        job_description (str): Query text, normally `prefilter_query(job_description)`.
+        index (BM25Index | None): Index to use. Defaults to the shared index saved at `index_path`.
+        min_keep (int): The best `min_keep` resumes are always kept.
+        relative_cutoff (float): Other resumes are kept if they score at least this fraction of the best score.
+        index_path (str | None): Where the default index is saved after new resumes are added. None keeps it in memory.
+
+    Returns:
+        tuple: (np.ndarray of BM25 scores, np.ndarray of booleans marking the kept resumes), both in input order
+    """
+    index = index if index is not None else get_resume_index(index_path)
+    added = index.add(resumes)
+    if index.modified and index_path:
+        index.save(index_path)
+    if added:
+        print(f"[INFO] Prefilter: indexed {added} new resumes ({len(index)} total)")
+
+    scores = index.score(job_description, resumes)
+    keep = np.ones(len(resumes), dtype=bool)
+    if len(resumes) > min_keep and scores.max() > 0:
+        kth_best = np.sort(scores)[::-1][max(min_keep, 1) - 1]
+        keep = (scores >= kth_best) | (scores >= relative_cutoff * scores.max())
+    return scores, keep
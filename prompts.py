@@ -7,35 +7,622 @@ is processed through a 3-step prompt chain:
 
 1. Extraction (e.g., E1, L1): Extract relevant resume content matching the job description.
 2. Evaluation (e.g., E2, L2): Analyze the match between resume and job description.
-3. Scoring (e.g., E3, L3): Assign a score (0-100) and a rationale.
+3. Scoring (e.g., E3, L3): Assign a score (0-100) and a rationale, returned as a JSON object.
+   Scoring outputs are parsed tolerantly (JSON first, then 'key: value' lines); if that still fails,
+   only the scoring stage is re-asked, never the whole chain.
 
 The module includes:
 - Prompt template functions for each stage.
 - Execution functions (e.g., `run_experience_chain`) that call OpenAI and parse outputs.
-- A centralized `call_openai` method.
+- A centralized `call_openai` method that sends prompts to a pluggable LLM backend (see `llm_backends.py`), backed by a persistent response cache (see `llm_cache.py`)
+  and a shared rate-limit-aware scheduler with retries (see `scheduler.py`). Every call is recorded with its
+  stage label, tokens, latency and cost (see `metrics.py`).
 
 Designed for use with ResumeScanner.ipynb, where input parsing, scoring orchestration, and result storage are handled.
 
 """
 
-# Load API key from .env, Instantiate OpenAI client
-from openai import OpenAI
+# Load API key from .env, select the LLM backend
+import asyncio
+import contextlib
+import hashlib
+import inspect
+import json
+import math
+import re
+import threading
+import time
 import os
+from collections import namedtuple
 from dotenv import load_dotenv
+from llm_cache import NullResponseCache, SQLiteResponseCache, make_cache_key
+from scheduler import RequestScheduler, estimate_tokens, DEFAULT_COMPLETION_TOKENS
+from metrics import collector as metrics
+from llm_backends import LLMResponse, OpenAIBackend, FakeLLMBackend
+from skills_matcher import match_skills, skills_match_summary, skill_taxonomy_text
+from location_gazetteer import score_location, location_note, location_scoring_text
+from jd_constraints import constraint_rules_text
+from main_config import (
+    LLM_BACKEND,
+    LLM_CACHE_ENABLED, LLM_CACHE_PATH, LLM_CACHE_MAX_BYTES, LLM_CACHE_TTL_SECONDS,
+    TOT_MODEL, MODEL_ROUTING_PROFILES, MODEL_ROUTING_PROFILE,
+    STRUCTURED_OUTPUT, SCORE_REPAIR_ATTEMPTS, LOGPROB_SCORING, LOGPROB_TOP_ALTERNATIVES, STREAM_COMPLETIONS, STAGE_MAX_TOKENS,
+    CHAIN_SESSIONS, LOCAL_SKILLS_MATCH, LOCAL_LOCATION_SCORING, PRUNE_UNCONSTRAINED_CHAINS, MAX_CONCURRENT_RESUMES, ONESHOT_PACK_TOKEN_BUDGET, ONESHOT_PACK_MAX_CANDIDATES, ONESHOT_PACK_ANSWER_TOKENS,
+    OPENAI_RPM_LIMIT, OPENAI_TPM_LIMIT, OPENAI_MAX_RETRIES, OPENAI_REQUEST_TIMEOUT_SECONDS, OPENAI_REQUEST_DEADLINE_SECONDS
+)
 
 load_dotenv()
-client = OpenAI()
+llm_backend = FakeLLMBackend() if LLM_BACKEND == "fake" else OpenAIBackend()
 
+scheduler = RequestScheduler(
+    rpm=OPENAI_RPM_LIMIT,
+    tpm=OPENAI_TPM_LIMIT,
+    max_retries=OPENAI_MAX_RETRIES,
+    timeout=OPENAI_REQUEST_TIMEOUT_SECONDS,
+    deadline=OPENAI_REQUEST_DEADLINE_SECONDS
+)
 
-# --- OpenAI Call Function ---
+if LLM_CACHE_ENABLED:
+    response_cache = SQLiteResponseCache(LLM_CACHE_PATH, max_bytes=LLM_CACHE_MAX_BYTES, ttl_seconds=LLM_CACHE_TTL_SECONDS)
+else:
+    response_cache = NullResponseCache()
 
-def call_openai(prompt, model="gpt-3.5-turbo"):
-    response = client.chat.completions.create(
-        model=model,
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.3
+
+def set_llm_backend(backend):
+    """
+    Replaces the backend used by `call_openai` (e.g. `FakeLLMBackend(latency=0.5)` for offline runs).
+    """
+    global llm_backend
+    llm_backend = backend
+
+
+def set_scheduler(new_scheduler):
+    """
+    Replaces the scheduler (rate limits, retries, deadlines) used by `call_openai`.
+    """
+    global scheduler
+    scheduler = new_scheduler
+
+
+def set_response_cache(cache):
+    """
+    Replaces the response cache used by `call_openai` (e.g. `NullResponseCache()` to bypass it).
+    """
+    global response_cache
+    response_cache = cache
+
+
+# --- Event Loop Helper ---
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop():
+    """
+    Returns a long-lived event loop running on a daemon thread, starting it on first use.
+    Keeping a single loop lets the async client reuse its connection pool across calls and
+    lets synchronous callers (scripts and Jupyter, which already runs its own loop) share it.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="tot-event-loop", daemon=True).start()
+    return _loop
+
+
+def run_sync(coro):
+    """
+    Runs a coroutine on the shared background loop and blocks until it returns.
+    Must not be called from code that is itself running on that loop.
+    """
+    loop = _background_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        raise RuntimeError("run_sync() cannot be called from inside the ToT event loop; await the coroutine instead.")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+# --- OpenAI Call Functions ---
+
+DEFAULT_TEMPERATURE = 0.3
+
+
+# --- Model Routing ---
+
+Route = namedtuple("Route", ["model", "temperature", "max_tokens"])
+
+_routing_profile = MODEL_ROUTING_PROFILE
+
+
+def set_routing_profile(name):
+    """
+    Selects the model routing profile (a key of `MODEL_ROUTING_PROFILES`) for all following calls.
+
+    Returns:
+        str: The previously selected profile.
+    """
+    global _routing_profile
+    if name not in MODEL_ROUTING_PROFILES:
+        raise ValueError(f"Unknown routing profile '{name}', expected one of {sorted(MODEL_ROUTING_PROFILES)}")
+    previous, _routing_profile = _routing_profile, name
+    return previous
+
+
+def get_routing_profile():
+    return _routing_profile
+
+
+@contextlib.contextmanager
+def use_routing_profile(name):
+    """
+    Runs a block with another routing profile, e.g. `with use_routing_profile("fast"): load_or_generate_ats_results(...)`.
+    """
+    previous = set_routing_profile(name)
+    try:
+        yield
+    finally:
+        set_routing_profile(previous)
+
+
+def _stage_step(stage):
+    # "SK1" -> "stage1": the batch stage that runs this chain step for every category
+    if stage and stage[-1] in "123" and stage[:-1] in CHAIN_STAGE_PREFIXES.values():
+        return f"stage{stage[-1]}"
+    return None
+
+
+def stage_route(stage, profile=None):
+    """
+    Resolves the model, temperature and max_tokens of a pipeline stage in a routing profile
+    (the selected one by default); see `MODEL_ROUTING_PROFILES`.
+
+    Returns:
+        Route: (model, temperature, max_tokens)
+    """
+    table = MODEL_ROUTING_PROFILES[profile or _routing_profile]
+    stage = stage or ""
+    base = stage.removesuffix("_repair").removesuffix("_packed")
+    names = (stage, base, _stage_step(base))
+    entry = next((table[name] for name in names + ("default",) if name in table), {})
+    if "max_tokens" in entry:
+        max_tokens = entry["max_tokens"]
+    else:
+        max_tokens = next((STAGE_MAX_TOKENS[name] for name in names if name in STAGE_MAX_TOKENS), None)
+    return Route(entry.get("model", TOT_MODEL), entry.get("temperature", DEFAULT_TEMPERATURE), max_tokens)
+
+
+def backend_namespace():
+    """
+    Cache namespace of the active backend (`llm_backends` module docstring); None for the OpenAI API.
+    """
+    return getattr(llm_backend, "cache_namespace", None)
+
+
+def backend_key(model_key):
+    """
+    Qualifies a result store model identifier with the active backend's cache namespace, if it has one.
+    """
+    namespace = backend_namespace()
+    return model_key if namespace is None else f"{model_key}@{namespace}"
+
+
+def route_key(stages, profile=None):
+    """
+    Model identifier for result store keys: the model name if every stage uses it with the default
+    temperature and no cap (so results cached before routing stay valid), otherwise a hash of the routes.
+    Either is qualified by the backend's cache namespace (`backend_key`).
+    """
+    routes = [stage_route(stage, profile) for stage in stages]
+    if len(set(routes)) == 1 and routes[0].temperature == DEFAULT_TEMPERATURE and routes[0].max_tokens is None:
+        return backend_key(routes[0].model)
+    return backend_key("route:" + hashlib.sha256(json.dumps([[stage, *route] for stage, route in zip(stages, routes)]).encode("utf-8")).hexdigest()[:16])
+
+
+def describe_route(stages, profile=None):
+    """
+    Human-readable route recorded in the results, e.g. 'balanced | gpt-4o-mini@0.0/400: E1 L1 | gpt-4o@0.3: E3 S3'.
+    """
+    groups = {}
+    for stage in stages:
+        route = stage_route(stage, profile)
+        label = f"{route.model}@{route.temperature}" + (f"/{route.max_tokens}" if route.max_tokens else "")
+        groups.setdefault(label, []).append(stage)
+    return " | ".join([profile or _routing_profile] + [f"{label}: {' '.join(names)}" for label, names in groups.items()])
+
+
+async def _astream_until(messages, model, temperature, stop_when, **options):
+    """
+    Streams one completion and closes the stream as soon as `stop_when(text so far)` is true.
+
+    Returns:
+        LLMResponse: The text received. A stream closed early reports no usage; its tokens are estimated.
+    """
+    parts, usage = [], None
+    stream = llm_backend.stream(model, messages, temperature, **options)
+    try:
+        async for delta in stream:
+            if delta.completion_tokens is not None:
+                usage = delta
+            if delta.text:
+                parts.append(delta.text)
+                if stop_when("".join(parts)):
+                    break
+    finally:
+        await stream.aclose()
+
+    text = "".join(parts)
+    if usage is None:
+        return LLMResponse(text, prompt_tokens=sum(len(message["content"]) for message in messages) // 4,
+                           completion_tokens=len(text) // 4)
+    return LLMResponse(text, prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens,
+                       cached_tokens=usage.cached_tokens)
+
+
+async def _arequest(messages, model, temperature, stage, estimated_tokens=None, stop_when=None, **options):
+    """
+    Sends one request to the active LLM backend through the scheduler and records it in the run metrics.
+    With `stop_when`, the completion is streamed and cut off once `stop_when(text so far)` is true.
+
+    Returns:
+        LLMResponse: The backend response.
+    """
+    if stop_when is not None:
+        make_request = lambda: _astream_until(messages, model, temperature, stop_when, **options)
+    else:
+        make_request = lambda: llm_backend.complete(model, messages, temperature, **options)
+
+    started = time.perf_counter()
+    response, retries = await scheduler.run(
+        make_request,
+        estimated_tokens=estimated_tokens or estimate_tokens(messages)
+    )
+    latency = time.perf_counter() - started
+
+    metrics.record(
+        stage,
+        model,
+        prompt_tokens=response.prompt_tokens,
+        completion_tokens=response.completion_tokens,
+        latency=latency,
+        retries=retries,
+        cached_tokens=response.cached_tokens
+    )
+    return response
+
+
+def _resolve_route(stage, model, temperature, max_tokens):
+    # Explicit arguments win over the stage's route
+    route = stage_route(stage)
+    return (
+        route.model if model is None else model,
+        route.temperature if temperature is None else temperature,
+        route.max_tokens if max_tokens is None else max_tokens
+    )
+
+
+def completion_cache_key(model, temperature, messages, response_format=None, max_tokens=None, stop_fields=None, **options):
+    """
+    Response cache key of one completion request, shared by `acall_openai` and the batch runner so both execution
+    modes serve each other's answers. `stop_fields` only count with `STREAM_COMPLETIONS`, as in `acall_openai`.
+    Further `options` (sampling, logprobs) and the backend's cache namespace are part of the key.
+    """
+    stop_fields = list(stop_fields) if STREAM_COMPLETIONS and stop_fields else None
+    return make_cache_key(model, temperature, messages, response_format=response_format, max_tokens=max_tokens,
+                          stop_fields=stop_fields, backend=backend_namespace(), **options)
+
+
+async def acall_openai(prompt, model=None, temperature=None, stage=None, response_format=None, max_tokens=None,
+                       stop_fields=None, history=None, validate=None):
+    """
+    Sends one prompt to the active LLM backend and returns the response text.
+    `stage` (e.g. "E1", "S3", "oneshot") labels the call in the run metrics and selects its route
+    (model, temperature, max_tokens) in the active routing profile; explicit arguments override the route.
+    `response_format` (e.g. `{"type": "json_object"}`) is passed through to the API.
+    `stop_fields` (e.g. ["experience_score", "experience_note"]) are the only fields the caller parses: with
+    `STREAM_COMPLETIONS`, the completion is streamed and closed as soon as they are all complete.
+    `history` (list of chat messages) is sent before the prompt, making it the next turn of a conversation.
+    `validate` (callable), if given, must return True for an answer to be stored in or served from the response cache,
+    so a malformed answer is returned once but asked again on the next call.
+    """
+    model, temperature, max_tokens = _resolve_route(stage, model, temperature, max_tokens)
+    messages = list(history or []) + [{"role": "user", "content": prompt}]
+    stop_fields = list(stop_fields) if STREAM_COMPLETIONS and stop_fields else None
+
+    # Byte-identical requests are served from the response cache (cut-off answers only to callers needing the same fields)
+    cache_key = completion_cache_key(model, temperature, messages, response_format=response_format, max_tokens=max_tokens,
+                                     stop_fields=stop_fields)
+    cached = await response_cache.aget(cache_key)
+    if cached is not None and (validate is None or validate(cached)):
+        metrics.record(stage, model, cache_hit=True)
+        return cached
+
+    response = await _arequest(messages, model, temperature, stage, estimated_tokens=estimate_tokens(messages, max_tokens=max_tokens),
+                               stop_when=(lambda text: score_fields_complete(text, stop_fields)) if stop_fields else None,
+                               response_format=response_format, max_tokens=max_tokens)
+    content = response.text.strip()
+    if validate is None or validate(content):
+        await response_cache.aset(cache_key, content)
+    return content
+
+
+async def acall_openai_samples(prompt, n, model=None, temperature=None, stage=None,
+                               response_format=None, sample_round=0, max_tokens=None):
+    """
+    Draws `n` sampled completions of one prompt in a single request (the API's `n` parameter).
+    `sample_round` tells successive draws for the same prompt apart in the response cache, so a rerun
+    gets the same samples back while a further round asks for new ones.
+
+    Returns:
+        list[str]: The n completion texts.
+    """
+    model, temperature, max_tokens = _resolve_route(stage, model, temperature, max_tokens)
+    messages = [{"role": "user", "content": prompt}]
+
+    cache_key = completion_cache_key(model, temperature, messages, response_format=response_format, max_tokens=max_tokens,
+                                     n=n, sample_round=sample_round)
+    cached = await response_cache.aget(cache_key)
+    if cached is not None:
+        metrics.record(stage, model, cache_hit=True)
+        return json.loads(cached)
+
+    response = await _arequest(
+        messages, model, temperature, stage,
+        estimated_tokens=estimate_tokens(messages, max_tokens=n * (max_tokens or DEFAULT_COMPLETION_TOKENS)),
+        response_format=response_format, n=n, max_tokens=max_tokens
     )
-    return response.choices[0].message.content.strip()
+    texts = [text.strip() for text in response.choices]
+    await response_cache.aset(cache_key, json.dumps(texts))
+    return texts
+
+
+async def acall_openai_logprobs(prompt, model=None, temperature=None, stage=None,
+                                response_format=None, top_logprobs=LOGPROB_TOP_ALTERNATIVES, max_tokens=None, history=None):
+    """
+    Like `acall_openai`, but also requests the log probabilities of every output token and of its
+    `top_logprobs` most likely alternatives.
+
+    Returns:
+        tuple: (response text, list of {"token", "logprob", "top": [[token, logprob], ...]} per output token)
+    """
+    model, temperature, max_tokens = _resolve_route(stage, model, temperature, max_tokens)
+    messages = list(history or []) + [{"role": "user", "content": prompt}]
+
+    cache_key = completion_cache_key(model, temperature, messages, response_format=response_format, max_tokens=max_tokens,
+                                     top_logprobs=top_logprobs)
+    cached = await response_cache.aget(cache_key)
+    if cached is not None:
+        metrics.record(stage, model, cache_hit=True)
+        cached = json.loads(cached)
+        return cached["text"], cached["logprobs"]
+
+    response = await _arequest(messages, model, temperature, stage, estimated_tokens=estimate_tokens(messages, max_tokens=max_tokens),
+                               response_format=response_format, top_logprobs=top_logprobs, max_tokens=max_tokens)
+    content = response.text.strip()
+    await response_cache.aset(cache_key, json.dumps({"text": content, "logprobs": response.logprobs}))
+    return content, response.logprobs
+
+
+def call_openai(prompt, model=None, temperature=None, stage=None, response_format=None, max_tokens=None, stop_fields=None):
+    return run_sync(acall_openai(prompt, model=model, temperature=temperature, stage=stage, response_format=response_format,
+                                 max_tokens=max_tokens, stop_fields=stop_fields))
+
+
+# --- Structured Output Parsing ---
+
+# JSON mode for the scoring stages (stage 3, S3, one-shot); the prompts ask for JSON either way
+SCORE_RESPONSE_FORMAT = {"type": "json_object"} if STRUCTURED_OUTPUT else None
+
+SCORE_PATTERN = re.compile(r'"?(\w+)_score"?\**\s*[:=]\s*\**\s*"?(-?\d+(?:\.\d+)?)')
+SCORE_KEY_BEFORE_VALUE = re.compile(r'"?(\w+)_score"?\**\s*[:=]\s*\**\s*"?\s*$')
+NOTE_PATTERN = re.compile(r'"?(\w+)_note"?\**\s*[:=]\s*\**\s*(.+)')
+
+
+class ScoreParseError(ValueError):
+    """
+    Raised when a scoring stage's output has no parseable score.
+    """
+
+
+def _json_object(output):
+    """
+    Returns the JSON object in `output` (ignoring code fences or text around it), or None.
+    An object cut off after a complete field (a stream closed early) is closed and parsed as well.
+    """
+    start, end = output.find("{"), output.rfind("}")
+    if start == -1:
+        return None
+    candidates = [output[start:end + 1]] if end > start else []
+    candidates.append(output[start:].rstrip().rstrip(",") + "}")
+    for candidate in candidates:
+        try:
+            parsed = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(parsed, dict):
+            return parsed
+    return None
+
+
+def score_fields_complete(output, fields):
+    """
+    True once every field in `fields` ('<category>_score' / '<category>_note') is complete in a partial
+    output: a score once a character follows its number, a JSON note once its closing quote arrived and
+    a 'key: value' note once its line ended.
+    """
+    for field in fields:
+        name = re.escape(field)
+        if field.endswith("_score"):
+            pattern = rf'"?{name}"?\**\s*[:=]\s*\**\s*"?-?\d+(?:\.\d+)?[^\d.]'
+        else:
+            pattern = rf'"{name}"\s*:\s*"(?:[^"\\]|\\.)*"|(?<!"){name}\**\s*[:=][^\n]*\S[^\n]*\n'
+        if not re.search(pattern, output, re.IGNORECASE):
+            return False
+    return True
+
+
+def parse_score_fields(output):
+    """
+    Tolerantly parses '<category>_score' / '<category>_note' fields from a scoring stage's output:
+    a JSON object first, then 'key: value' lines anywhere in the text (preambles, blank lines,
+    markdown bold and quotes are ignored).
+
+    Returns:
+        dict: {'<category>_score': int, '<category>_note': str} for every field found.
+    """
+    fields = {}
+    parsed = _json_object(output)
+    if parsed is not None:
+        for key, value in parsed.items():
+            key = str(key).strip().lower()
+            if key.endswith("_score"):
+                try:
+                    fields[key] = int(round(float(value)))
+                except (TypeError, ValueError):
+                    continue
+            elif key.endswith("_note") and value is not None:
+                fields[key] = str(value).strip()
+        if fields:
+            return fields
+
+    for line in output.splitlines():
+        score_match = SCORE_PATTERN.search(line)
+        if score_match:
+            fields.setdefault(f"{score_match.group(1).lower()}_score", int(round(float(score_match.group(2)))))
+            continue
+        note_match = NOTE_PATTERN.search(line)
+        if note_match:
+            fields.setdefault(f"{note_match.group(1).lower()}_note", note_match.group(2).strip().strip('",*').strip())
+    return fields
+
+
+def parse_score_output(output, category=None):
+    """
+    Parses a stage-3 / S3 output into a (score, note) tuple.
+    With `category` given, its '<category>_score' field is preferred; otherwise the first score found is used.
+    Raises `ScoreParseError` if no score can be found.
+    """
+    fields = parse_score_fields(output)
+    score_key = f"{category}_score" if category and f"{category}_score" in fields else None
+    if score_key is None:
+        score_key = next((key for key in fields if key.endswith("_score")), None)
+    if score_key is None:
+        raise ScoreParseError(f"No score found in output: {output[:200]!r}")
+    note = fields.get(score_key[:-len("_score")] + "_note", "")
+    return fields[score_key], note
+
+
+def score_distributions(token_logprobs):
+    """
+    Finds the token of every '<field>_score' value in a scored output and returns the probability
+    distribution over its integer alternatives (0-100), renormalized over the alternatives returned.
+    Alternatives that are a proper prefix of another digit alternative or of the chosen token ("7" next to "72")
+    are the first token of a longer number, not a score, and are ignored. So is a score split over several tokens.
+
+    Returns:
+        dict: {'<field>_score': {score: probability}}
+    """
+    distributions = {}
+    text = ""
+    token_logprobs = token_logprobs or []
+    for position, entry in enumerate(token_logprobs):
+        token = entry["token"]
+        field = SCORE_KEY_BEFORE_VALUE.search(text)
+        following = token_logprobs[position + 1]["token"] if position + 1 < len(token_logprobs) else ""
+        if (field and token.strip().isdigit() and not following[:1].isdigit()
+                and f"{field.group(1).lower()}_score" not in distributions):
+            digits = {alternative.strip() for alternative, _ in entry["top"] if alternative.strip().isdigit()}
+            digits.add(token.strip())
+            probabilities = {}
+            for alternative, logprob in entry["top"]:
+                alternative = alternative.strip()
+                truncated = any(other != alternative and other.startswith(alternative) for other in digits)
+                if alternative.isdigit() and not truncated and 0 <= int(alternative) <= 100:
+                    probabilities[int(alternative)] = probabilities.get(int(alternative), 0.0) + math.exp(logprob)
+            total = sum(probabilities.values())
+            if total > 0:
+                distributions[f"{field.group(1).lower()}_score"] = {value: p / total for value, p in probabilities.items()}
+        text += token
+    return distributions
+
+
+def score_statistics(token_logprobs):
+    """
+    Returns {'<field>_score_expected': E[score], '<field>_score_entropy': entropy in bits} for every
+    score found in the output's token logprobs.
+    """
+    statistics = {}
+    for field, distribution in score_distributions(token_logprobs).items():
+        statistics[f"{field}_expected"] = round(sum(value * p for value, p in distribution.items()), 2)
+        statistics[f"{field}_entropy"] = round(-sum(p * math.log2(p) for p in distribution.values() if p > 0), 4)
+    return statistics
+
+
+def repair_prompt(prompt, bad_output):
+    """
+    Re-asks a scoring prompt whose answer could not be parsed, quoting the bad answer.
+    """
+    return f"""{prompt}
+
+Your previous answer was:
+{bad_output}
+
+It did not follow the output format. Answer again with only the JSON object described in the output format above.
+"""
+
+
+async def arepair_score_output(prompt, output, category, stage, model=None, attempts=SCORE_REPAIR_ATTEMPTS, history=None):
+    """
+    Re-asks only the failed scoring stage (not the whole chain) until its answer parses.
+    `history` is the conversation the stage was part of (chain sessions).
+
+    Returns:
+        tuple: (score, note)
+    """
+    for attempt in range(1, attempts + 1):
+        print(f"[WARN] Could not parse {stage} output, re-asking ({attempt}/{attempts})")
+        output = await acall_openai(repair_prompt(prompt, output), model=model, stage=f"{stage}_repair",
+                                    response_format=SCORE_RESPONSE_FORMAT, history=history)
+        try:
+            return parse_score_output(output, category)
+        except ScoreParseError:
+            continue
+    raise ScoreParseError(f"{stage} output still unparseable after {attempts} repair attempts")
+
+
+async def arun_score_stage(prompt, category, stage, model=None, details=None, need_note=True, history=None):
+    """
+    Runs a scoring stage (stage 3 or S3) and parses it, repairing only this stage if needed.
+    `history` makes the stage the next turn of a chain session.
+    With `LOGPROB_SCORING`, '<category>_score_expected' / '<category>_score_entropy' are added to `details`.
+    With `STREAM_COMPLETIONS`, the answer is cut off once the score (and the note, if `need_note`) is complete.
+
+    Returns:
+        tuple: (score, note)
+    """
+    if LOGPROB_SCORING:
+        output, token_logprobs = await acall_openai_logprobs(prompt, model=model, stage=stage, response_format=SCORE_RESPONSE_FORMAT,
+                                                             history=history)
+    else:
+        stop_fields = [f"{category}_score"] + ([f"{category}_note"] if need_note else [])
+        output = await acall_openai(prompt, model=model, stage=stage, response_format=SCORE_RESPONSE_FORMAT, stop_fields=stop_fields,
+                                    history=history)
+        token_logprobs = None
+    try:
+        score, note = parse_score_output(output, category)
+    except ScoreParseError:
+        return await arepair_score_output(prompt, output, category, stage, model=model, history=history)
+
+    if token_logprobs and details is not None:
+        statistics = score_statistics(token_logprobs)
+        for suffix in ("expected", "entropy"):
+            if f"{category}_score_{suffix}" in statistics:
+                details[f"{category}_score_{suffix}"] = statistics[f"{category}_score_{suffix}"]
+    return score, note
 
 
 ### Prompts for E's (Experience)
@@ -87,36 +674,15 @@ Be precise and do not inflate the score without strong evidence.
 Input:
 {E2_output}
 
-Output format:
-experience_score: <integer between 0 and 100>
-experience_note: <one sentence note>
+Output format (a single JSON object, nothing else):
+{{"experience_score": <integer between 0 and 100>, "experience_note": "<one sentence note>"}}
 """
 
 
 # --- Prompt Chain Execution ---
 
 def run_experience_chain(resume, job_description):
-    # Step E1
-    e1_prompt = E1_prompt(resume["experience"], job_description)
-    E1_output = call_openai(e1_prompt)
-    #print("\nE1 Output:\n", E1_output)
-
-    # Step E2
-    e2_prompt = E2_prompt(E1_output, job_description)
-    E2_output = call_openai(e2_prompt)
-    #print("\nE2 Output:\n", E2_output)
-
-    # Step E3
-    e3_prompt = E3_prompt(E2_output)
-    E3_output = call_openai(e3_prompt)
-    #print("\nE3 Output:\n", E3_output)
-
-    # Extract score/note
-    lines = E3_output.strip().split("\n")
-    experience_score = int(lines[0].split(":")[1].strip())
-    experience_note = lines[1].split(":", 1)[1].strip()
-
-    return experience_score, experience_note
+    return run_sync(arun_category_chain("experience", resume, job_description))
 
 
 
@@ -169,32 +735,15 @@ Be precise and do not inflate the score without strong evidence. Be very picky w
 Input:
 {L2_output}
 
-Output format:
-location_score: <integer between 0 and 100>
-location_note: <one sentence note>
+Output format (a single JSON object, nothing else):
+{{"location_score": <integer between 0 and 100>, "location_note": "<one sentence note>"}}
 """ 
 
 # --- Prompt Chain Execution ---
 
 def run_location_chain(resume, job_description):
-    # Step L1
-    l1_prompt = L1_prompt(resume["location"], job_description)
-    L1_output = call_openai(l1_prompt)
-
-    # Step L2
-    l2_prompt = L2_prompt(L1_output, job_description)
-    L2_output = call_openai(l2_prompt)
-
-    # Step L3
-    l3_prompt = L3_prompt(L2_output)
-    L3_output = call_openai(l3_prompt)
+    return run_sync(arun_category_chain("location", resume, job_description))
 
-    # Extract score/note
-    lines = L3_output.strip().split("\n")
-    location_score = int(lines[0].split(":")[1].strip())
-    location_note = lines[1].split(":", 1)[1].strip()
-
-    return location_score, location_note
 
 
 ### Prompt for ED's (Education)
@@ -245,31 +794,14 @@ Be precise and do not inflate the score without strong evidence. DO not be afrai
 Input:
 {ED2_output}
 
-Output format:
-education_score: <integer between 0 and 100>
-education_note: <one sentence note>
+Output format (a single JSON object, nothing else):
+{{"education_score": <integer between 0 and 100>, "education_note": "<one sentence note>"}}
 """ 
 
 # --- Prompt Chain Execution ---
 
 def run_education_chain(resume, job_description):
-    # Step ED1
-    ed1_prompt = ED1_prompt(resume["education"], job_description)
-    ED1_output = call_openai(ed1_prompt)
-
-    # Step ED2
-    ed2_prompt = ED2_prompt(ED1_output, job_description)
-    ED2_output = call_openai(ed2_prompt)
-
-    # Step ED3
-    ed3_prompt = ED3_prompt(ED2_output)
-    ED3_output = call_openai(ed3_prompt)
-    
-    # Extract score/note
-    lines = ED3_output.strip().split("\n")
-    education_score = int(lines[0].split(":")[1].strip())
-    education_note = lines[1].split(":", 1)[1].strip()
-    return education_score, education_note
+    return run_sync(arun_category_chain("education", resume, job_description))
 
 ### Prompt for SK's (Skills)
 
@@ -319,32 +851,14 @@ Be precise and do not inflate the score without strong evidence.
 Input:
 {SK2_output}
 
-Output format:
-skills_score: <integer between 0 and 100>
-skills_note: <one sentence note>
+Output format (a single JSON object, nothing else):
+{{"skills_score": <integer between 0 and 100>, "skills_note": "<one sentence note>"}}
 """ 
 
 # --- Prompt Chain Execution ---
 
 def run_skills_chain(resume, job_description):
-    # Step SK1
-    sk1_prompt = SK1_prompt(resume["skills"], job_description)
-    SK1_output = call_openai(sk1_prompt)
-
-    # Step SK2
-    sk2_prompt = SK2_prompt(SK1_output, job_description)
-    SK2_output = call_openai(sk2_prompt)
-
-    # Step SK3
-    sk3_prompt = SK3_prompt(SK2_output)
-    SK3_output = call_openai(sk3_prompt)
-
-    # Extract score/note
-    lines = SK3_output.strip().split("\n")
-    skills_score = int(lines[0].split(":")[1].strip())
-    skills_note = lines[1].split(":", 1)[1].strip()
-    
-    return skills_score, skills_note
+    return run_sync(arun_category_chain("skills", resume, job_description))
 
 ### Prompt for LA's (Languages)
 
@@ -394,33 +908,15 @@ Be precise and do not inflate the score without strong evidence.
 Input:
 {LA2_output}
 
-Output format:
-languages_score: <integer between 0 and 100>
-languages_note: <one sentence note>
+Output format (a single JSON object, nothing else):
+{{"languages_score": <integer between 0 and 100>, "languages_note": "<one sentence note>"}}
 """ 
 
 # --- Prompt Chain Execution ---
 
 def run_languages_chain(resume, job_description):
-    # Step LA1
-    resume_text = f"{resume.get('summary', '')}\n{resume.get('education', '')}\n{resume.get('experience', '')}\n{resume.get('skills', '')}"
-    la1_prompt = LA1_prompt(resume_text, job_description)
-    LA1_output = call_openai(la1_prompt)
-
-    # Step LA2
-    la2_prompt = LA2_prompt(LA1_output, job_description)
-    LA2_output = call_openai(la2_prompt)
-
-    # Step LA3
-    la3_prompt = LA3_prompt(LA2_output)
-    LA3_output = call_openai(la3_prompt)
+    return run_sync(arun_category_chain("languages", resume, job_description))
 
-    # Extract score/note
-    lines = LA3_output.strip().split("\n")
-    languages_score = int(lines[0].split(":")[1].strip())
-    languages_note = lines[1].split(":", 1)[1].strip()
-    
-    return languages_score, languages_note
 
 
 ### Prompt for O's (Other Qualities)
@@ -471,33 +967,15 @@ Be precise and do not inflate the score without strong evidence. Be harsh and do
 Input:
 {O2_output}
 
-Output format:
-other_score: <integer between 0 and 100>
-other_note: <one sentence note>
+Output format (a single JSON object, nothing else):
+{{"other_score": <integer between 0 and 100>, "other_note": "<one sentence note>"}}
 """ 
 
 # --- Prompt Chain Execution ---
 
 def run_other_chain(resume, job_description):
-    # Step O1
-    resume_text = f"{resume.get('summary', '')}\n{resume.get('education', '')}\n{resume.get('experience', '')}\n{resume.get('skills', '')}"
-    o1_prompt = O1_prompt(resume_text, job_description)
-    O1_output = call_openai(o1_prompt)
+    return run_sync(arun_category_chain("other", resume, job_description))
 
-    # Step O2
-    o2_prompt = O2_prompt(O1_output, job_description)
-    O2_output = call_openai(o2_prompt)
-
-    # Step O3
-    o3_prompt = O3_prompt(O2_output)
-    O3_output = call_openai(o3_prompt)
-
-    # Extract score/note
-    lines = O3_output.strip().split("\n")
-    other_score = int(lines[0].split(":")[1].strip())
-    other_note = lines[1].split(":", 1)[1].strip()
-
-    return other_score, other_note
 
 
 ### Prompt for S's (Summary)
@@ -559,14 +1037,13 @@ Be very picky with how you grade. Do not be generous in favor of the applicant.
 Evaluation:
 {S2_output}
 
-Output format:
-summary_score: <integer between 0 and 100>  
-summary_note: <one sentence note>
+Output format (a single JSON object, nothing else):
+{{"summary_score": <integer between 0 and 100>, "summary_note": "<one sentence note>"}}
 """
 
 # --- Prompt Chain Execution ---
 
-def run_summary_chain(ats_row, job_description):
+async def arun_summary_chain(ats_row, job_description, details=None):
     # Step S1
     s1_prompt = S1_prompt(
         ats_row["experience_score"], ats_row["experience_note"],
@@ -576,42 +1053,266 @@ def run_summary_chain(ats_row, job_description):
         ats_row["languages_score"], ats_row["languages_note"],
         ats_row["other_score"], ats_row["other_note"]
     )
-    S1_output = call_openai(s1_prompt)
+    S1_output = await acall_openai(s1_prompt, stage="S1")
 
     # Step S2
     s2_prompt = S2_prompt(S1_output, job_description)
-    S2_output = call_openai(s2_prompt)
+    S2_output = await acall_openai(s2_prompt, stage="S2")
 
-    # Step S3
+    # Step S3, parsed (and re-asked on a parse failure) on its own
     s3_prompt = S3_prompt(S2_output)
-    S3_output = call_openai(s3_prompt)
+    return await arun_score_stage(s3_prompt, "summary", "S3", details=details)
+
 
-    # Extract score and note
-    lines = S3_output.strip().split("\n")
-    summary_score = int(lines[0].split(":")[1].strip())
-    summary_note = lines[1].split(":", 1)[1].strip()
-    
-    return summary_score, summary_note
+def run_summary_chain(ats_row, job_description):
+    return run_sync(arun_summary_chain(ats_row, job_description))
 
 
-### One Shot Prompts
+### Prompt for JD (Job Description Distillation)
 
-def run_oneshot_chain(resume, job_description, model="gpt-4o"):
+def JD_prompt(job_description):
+    return f"""
+You are a resume analysis system. Given the following job description, extract ONLY the requirements and preferences that candidates will be evaluated against, grouped into six categories.
+Ignore company boilerplate such as mission statements, team or company descriptions, benefits, and "why join us" sections.
+Keep the wording of the requirements precise. If the job description states nothing for a category, write "No specific requirement stated."
+
+Job Description:
+{job_description}
+
+Output format (exactly one line per category):
+experience: <required and preferred work experience>
+location: <job location, on-site/hybrid/remote policy, work authorization>
+education: <required and preferred degrees, majors, certifications>
+skills: <required and preferred technical and soft skills>
+languages: <required or preferred spoken languages>
+other: <other desired qualities, traits, or working style>
+"""
+
+
+### Generic Category Chain Execution
+
+def resume_full_text(resume):
     """
-    One-shot prompt that sends the full resume and job description to the LLM.
-    Returns all scores and notes, with the summary_score computed last based on the others.
+    Concatenates the free-text resume sections used by the languages and other-qualities chains.
+    """
+    return f"{resume.get('summary', '')}\n{resume.get('education', '')}\n{resume.get('experience', '')}\n{resume.get('skills', '')}"
+
+
+# category -> (resume section extractor, step 1 prompt, step 2 prompt, step 3 prompt)
+TOT_CHAINS = {
+    "experience": (lambda resume: resume["experience"], E1_prompt, E2_prompt, E3_prompt),
+    "location": (lambda resume: resume["location"], L1_prompt, L2_prompt, L3_prompt),
+    "education": (lambda resume: resume["education"], ED1_prompt, ED2_prompt, ED3_prompt),
+    "skills": (lambda resume: resume["skills"], SK1_prompt, SK2_prompt, SK3_prompt),
+    "languages": (resume_full_text, LA1_prompt, LA2_prompt, LA3_prompt),
+    "other": (resume_full_text, O1_prompt, O2_prompt, O3_prompt),
+}
+
+# category -> stage label prefix used in metrics (E1, E2, E3, L1, ...)
+CHAIN_STAGE_PREFIXES = {
+    "experience": "E",
+    "location": "L",
+    "education": "ED",
+    "skills": "SK",
+    "languages": "LA",
+    "other": "O",
+}
+
+def local_step1_output(category, resume, job_description):
     """
+    Returns the step 1 answer of a chain computed in-process, or None if step 1 of `category` goes to the LLM.
+    With `LOCAL_SKILLS_MATCH`, SK1 is replaced by the deterministic skills matcher (`skills_matcher.match_skills`).
+    """
+    if category == "skills" and LOCAL_SKILLS_MATCH:
+        return match_skills(resume["skills"], job_description)
+    return None
 
-    resume_text = f"""
-    Name: {resume['name']}
-    Location: {resume['location']}
-    Summary: {resume['summary']}
-    Education: {resume['education']}
-    Experience: {resume['experience']}
-    Skills: {resume['skills']}
+
+def local_chain_result(category, resume, job_description):
+    """
+    Returns the (score, note) of a whole chain computed in-process, or None if the chain goes to the LLM.
+    With `LOCAL_LOCATION_SCORING`, locations the gazetteer can settle skip L1-L3 (`location_gazetteer.score_location`).
+    """
+    if category == "location" and LOCAL_LOCATION_SCORING:
+        return score_location(resume["location"], job_description)
+    return None
+
+
+# Every LLM stage of a ToT run (the JD distillation stage only runs with `DISTILL_JOB_DESCRIPTION`)
+TOT_STAGES = [f"{prefix}{step}" for prefix in CHAIN_STAGE_PREFIXES.values() for step in (1, 2, 3)] + ["S1", "S2", "S3"]
+
+
+async def arun_category_chain(category, resume, job_description, details=None):
+    """
+    Runs the three-step ToT chain (extract -> evaluate -> score) for one category of one resume.
+    The steps are sequential, but independent categories can be awaited concurrently.
+    `details` (dict), if given, receives the logprob statistics of the score (see `arun_score_stage`).
+
+    Returns:
+        tuple: (score, note)
+    """
+    local_result = local_chain_result(category, resume, job_description)
+    if local_result is not None:
+        return local_result
+    step1_output = await arun_chain_extract(category, resume, job_description)
+    return await arun_chain_assess(category, step1_output, job_description, details)
+
+
+async def arun_chain_extract(category, resume, job_description):
     """
+    Step 1 (extract) of a category chain: the in-process answer (`local_step1_output`) or the LLM's.
+    """
+    extract_section, step1_prompt, _, _ = TOT_CHAINS[category]
+    step1_output = local_step1_output(category, resume, job_description)
+    if step1_output is None:
+        step1_output = await acall_openai(step1_prompt(extract_section(resume), job_description), stage=f"{CHAIN_STAGE_PREFIXES[category]}1")
+    return step1_output
+
+
+async def arun_chain_assess(category, step1_output, job_description, details=None):
+    """
+    Steps 2 and 3 (evaluate -> score) of a category chain, which only read the step 1 answer and the job text.
+
+    Returns:
+        tuple: (score, note)
+    """
+    _, _, step2_prompt, step3_prompt = TOT_CHAINS[category]
+    prefix = CHAIN_STAGE_PREFIXES[category]
+    step2_output = await acall_openai(step2_prompt(step1_output, job_description), stage=f"{prefix}2")
+    return await arun_score_stage(step3_prompt(step2_output), category, f"{prefix}3", details=details)
+
+
+### Chain Sessions
+
+# In a session, the step prompts refer to the job description in the system message and to the previous
+# answer in the conversation instead of repeating them
+SESSION_JOB_DESCRIPTION = "(the job description given at the start of this conversation)"
+SESSION_PREVIOUS_ANSWER = "(your previous answer above)"
+
+
+def session_system_prompt(job_description):
+    return f"""
+You are an HR resume screening system working for a highly competitive, selective, and prestigious company. You evaluate one candidate's resume against the job description below in several steps, one category at a time.
+Each of the following messages is one step. Follow its instructions exactly and answer only what it asks for, in the format it asks for.
+
+Job Description:
+{job_description}
+"""
+
+
+async def arun_session_steps(steps, category, job_description, details=None):
+    """
+    Runs a chain as one conversation: a system message with the instructions and the job description, which is
+    the same for every resume, chain and step (so the provider's prompt-prefix cache serves it), then one turn
+    per step. Each step sees the previous turns, so its prompt only adds the new instructions.
+
+    Args:
+        steps (list[tuple]): (prompt, stage) of every free-text step, then of the scoring step.
+        category (str): Category ('summary' for the summary chain) whose score the scoring step gives.
+        details (dict | None): Receives the logprob statistics of the score (see `arun_score_stage`).
+
+    Returns:
+        tuple: (score, note)
+    """
+    history = [{"role": "system", "content": session_system_prompt(job_description)}]
+    *text_steps, (score_prompt, score_stage) = steps
+    for prompt, stage in text_steps:
+        output = await acall_openai(prompt, stage=stage, history=history)
+        history = history + [{"role": "user", "content": prompt}, {"role": "assistant", "content": output}]
+    return await arun_score_stage(score_prompt, category, score_stage, details=details, history=history)
+
+
+async def arun_category_session(category, resume, job_description, details=None):
+    """
+    Session version of `arun_category_chain` (see `CHAIN_SESSIONS`). `job_description` is the full text.
+    """
+    local_result = local_chain_result(category, resume, job_description)
+    if local_result is not None:
+        return local_result
+    extract_section, step1_prompt, step2_prompt, step3_prompt = TOT_CHAINS[category]
+    prefix = CHAIN_STAGE_PREFIXES[category]
+    step1_output = local_step1_output(category, resume, job_description)
+    if step1_output is not None:
+        # Step 1 was answered in-process, so the session starts at step 2
+        return await arun_session_steps([
+            (step2_prompt(step1_output, SESSION_JOB_DESCRIPTION), f"{prefix}2"),
+            (step3_prompt(SESSION_PREVIOUS_ANSWER), f"{prefix}3"),
+        ], category, job_description, details)
+    return await arun_session_steps([
+        (step1_prompt(extract_section(resume), SESSION_JOB_DESCRIPTION), f"{prefix}1"),
+        (step2_prompt(SESSION_PREVIOUS_ANSWER, SESSION_JOB_DESCRIPTION), f"{prefix}2"),
+        (step3_prompt(SESSION_PREVIOUS_ANSWER), f"{prefix}3"),
+    ], category, job_description, details)
+
+
+async def arun_summary_session(ats_row, job_description, details=None):
+    """
+    Session version of `arun_summary_chain` (see `CHAIN_SESSIONS`). `job_description` is the full text.
+    """
+    s1_prompt = S1_prompt(
+        ats_row["experience_score"], ats_row["experience_note"],
+        ats_row["location_score"], ats_row["location_note"],
+        ats_row["education_score"], ats_row["education_note"],
+        ats_row["skills_score"], ats_row["skills_note"],
+        ats_row["languages_score"], ats_row["languages_note"],
+        ats_row["other_score"], ats_row["other_note"]
+    )
+    return await arun_session_steps([
+        (s1_prompt, "S1"),
+        (S2_prompt(SESSION_PREVIOUS_ANSWER, SESSION_JOB_DESCRIPTION), "S2"),
+        (S3_prompt(SESSION_PREVIOUS_ANSWER), "S3"),
+    ], "summary", job_description, details)
+
+
+### Prompt Versioning
 
-    prompt = f"""
+def prompt_template_hash(templates):
+    """
+    Hashes the text of prompt templates, rendered with '{parameter}' placeholders.
+    Any wording change in a template changes the hash, which invalidates results cached under it.
+    """
+    rendered = []
+    for template in templates:
+        placeholders = {name: "{" + name + "}" for name in inspect.signature(template).parameters}
+        rendered.append(template(**placeholders))
+    return hashlib.sha256("\n".join(rendered).encode("utf-8")).hexdigest()
+
+
+TOT_PROMPT_TEMPLATES = [
+    E1_prompt, E2_prompt, E3_prompt,
+    L1_prompt, L2_prompt, L3_prompt,
+    ED1_prompt, ED2_prompt, ED3_prompt,
+    SK1_prompt, SK2_prompt, SK3_prompt,
+    LA1_prompt, LA2_prompt, LA3_prompt,
+    O1_prompt, O2_prompt, O3_prompt,
+    S1_prompt, S2_prompt, S3_prompt
+]
+
+
+def tot_prompt_templates(distill_jd, sessions=CHAIN_SESSIONS):
+    """
+    Templates whose wording the ToT results depend on, for `prompt_template_hash`.
+    Chain sessions add the session system prompt and do not use the distillation prompt. With `LOCAL_SKILLS_MATCH`
+    the skills matcher's answer format and taxonomy take the place of SK1; with `LOCAL_LOCATION_SCORING` the
+    location note format, bands and gazetteer are added; with `PRUNE_UNCONSTRAINED_CHAINS` the job constraint
+    rules and neutral score.
+    """
+    templates = TOT_PROMPT_TEMPLATES
+    if LOCAL_SKILLS_MATCH:
+        templates = [template for template in templates if template is not SK1_prompt] + [skills_match_summary, skill_taxonomy_text]
+    if LOCAL_LOCATION_SCORING:
+        templates = templates + [location_note, location_scoring_text]
+    if PRUNE_UNCONSTRAINED_CHAINS:
+        templates = templates + [constraint_rules_text]
+    if sessions:
+        return templates + [session_system_prompt]
+    return templates + ([JD_prompt] if distill_jd else [])
+
+
+### One Shot Prompts
+
+def oneshot_prompt(resume_text, job_description):
+    return f"""
 You are an experienced HR resume reviewer. Given the full resume and job description below, evaluate the candidate in the following categories.
 
 For each category, assign a score from 0 to 100 where:
@@ -639,68 +1340,296 @@ Resume:
 Job Description:
 {job_description}
 
-Output format:
-location_score: <int>
-location_note: <short explanation>
+Output format (a single JSON object, nothing else):
+{{
+  "location_score": <int>,
+  "location_note": "<short explanation>",
+  "experience_score": <int>,
+  "experience_note": "<short explanation>",
+  "education_score": <int>,
+  "education_note": "<short explanation>",
+  "skills_score": <int>,
+  "skills_note": "<short explanation>",
+  "languages_score": <int>,
+  "languages_note": "<short explanation>",
+  "other_score": <int>,
+  "other_note": "<short explanation>",
+  "summary_score": <int>,
+  "summary_note": "<short explanation>"
+}}
+"""
+
+
+def oneshot_resume_text(resume):
+    return f"""
+    Name: {resume['name']}
+    Location: {resume['location']}
+    Summary: {resume['summary']}
+    Education: {resume['education']}
+    Experience: {resume['experience']}
+    Skills: {resume['skills']}
+    """
 
-experience_score: <int>
-experience_note: <short explanation>
 
-education_score: <int>
-education_note: <short explanation>
+async def arun_oneshot_chain(resume, job_description, model=None):
+    prompt = oneshot_prompt(oneshot_resume_text(resume), job_description)
+    response = await acall_openai(prompt, model=model, stage="oneshot", response_format=SCORE_RESPONSE_FORMAT)
+    return response
 
-skills_score: <int>
-skills_note: <short explanation>
 
-languages_score: <int>
-languages_note: <short explanation>
+def run_oneshot_chain(resume, job_description, model=None):
+    """
+    One-shot prompt that sends the full resume and job description to the LLM.
+    Returns all scores and notes, with the summary_score computed last based on the others.
+    """
+    return run_sync(arun_oneshot_chain(resume, job_description, model=model))
 
-other_score: <int>
-other_note: <short explanation>
 
-summary_score: <int>
-summary_note: <short explanation>
-"""
+ONESHOT_FIELDS = [
+    "location_score", "location_note",
+    "experience_score", "experience_note",
+    "education_score", "education_note",
+    "skills_score", "skills_note",
+    "languages_score", "languages_note",
+    "other_score", "other_note",
+    "summary_score", "summary_note"
+]
 
-    response = call_openai(prompt, model=model)
-    return response
+# Extra result columns written with `LOGPROB_SCORING` (expected score and entropy of every score)
+LOGPROB_COLUMNS = [
+    f"{field}_{statistic}" for field in ["summary_score"] + [f for f in ONESHOT_FIELDS if f.endswith("_score") and f != "summary_score"]
+    for statistic in ("expected", "entropy")
+]
 
 
 def parse_oneshot_response(response):
     """
     Parses the response from run_oneshot_chain() into a dictionary 
     with keys matching the ats_results DataFrame columns.
+    The JSON answer is parsed first, then 'key: value' lines; fields that cannot be found are None.
     """
-    fields = [
-        "location_score", "location_note",
-        "experience_score", "experience_note",
-        "education_score", "education_note",
-        "skills_score", "skills_note",
-        "languages_score", "languages_note",
-        "other_score", "other_note",
-        "summary_score", "summary_note"
-    ]
-
-    result = {}
-    lines = response.strip().splitlines()
-
-    for line in lines:
-        if ":" in line:
-            key, value = line.split(":", 1)
-            key = key.strip().lower()
-            value = value.strip()
-
-            if "score" in key:
-                try:
-                    result[key] = int(value)
-                except ValueError:
-                    result[key] = None
-            elif "note" in key:
-                result[key] = value
+    fields = parse_score_fields(response)
+    return {field: fields.get(field) for field in ONESHOT_FIELDS}
 
-    # Fill in missing fields as None
-    for field in fields:
-        if field not in result:
-            result[field] = None
 
-    return result
+async def arun_oneshot_scores(resume, job_description, model=None, attempts=SCORE_REPAIR_ATTEMPTS):
+    """
+    Runs the one-shot prompt and parses it. If any score is missing, only the one-shot call is re-asked
+    (up to `attempts` times); fields still missing afterwards stay None.
+
+    Returns:
+        dict: The parsed fields (see `parse_oneshot_response`), plus '*_score_expected' / '*_score_entropy'
+            with `LOGPROB_SCORING`.
+    """
+    prompt = oneshot_prompt(oneshot_resume_text(resume), job_description)
+    token_logprobs = None
+    if LOGPROB_SCORING:
+        response, token_logprobs = await acall_openai_logprobs(prompt, model=model, stage="oneshot", response_format=SCORE_RESPONSE_FORMAT)
+    else:
+        response = await acall_openai(prompt, model=model, stage="oneshot", response_format=SCORE_RESPONSE_FORMAT,
+                                      stop_fields=ONESHOT_FIELDS)
+    parsed = parse_oneshot_response(response)
+    statistics = score_statistics(token_logprobs) if token_logprobs else {}
+
+    for attempt in range(1, attempts + 1):
+        if all(parsed[field] is not None for field in ONESHOT_FIELDS if field.endswith("_score")):
+            break
+        print(f"[WARN] Could not parse every one-shot score, re-asking ({attempt}/{attempts})")
+        response = await acall_openai(repair_prompt(prompt, response), model=model, stage="oneshot_repair",
+                                      response_format=SCORE_RESPONSE_FORMAT)
+        repaired = parse_oneshot_response(response)
+        parsed = {field: parsed[field] if repaired[field] is None else repaired[field] for field in ONESHOT_FIELDS}
+
+    if LOGPROB_SCORING:
+        for field in ONESHOT_FIELDS:
+            if field.endswith("_score"):
+                parsed[f"{field}_expected"] = statistics.get(f"{field}_expected")
+                parsed[f"{field}_entropy"] = statistics.get(f"{field}_entropy")
+    return parsed
+
+
+def run_oneshot_scores(resume, job_description, model=None):
+    return run_sync(arun_oneshot_scores(resume, job_description, model=model))
+
+
+# --- Packed One-Shot ---
+
+def oneshot_packed_prompt(candidates_text, job_description):
+    return f"""
+You are an experienced HR resume reviewer. Below are the resumes of several candidates, each introduced by its candidate tag, and one job description. Evaluate every candidate in the following categories, independently of the other candidates.
+
+For each category, assign a score from 0 to 100 where:
+- 90–100: Excellent match
+- 70–89: Strong match
+- 50–69: Moderate match
+- 30–49: Weak match
+- 0–29: Poor or no match
+
+Include a brief justification (1–2 sentences) with each score.
+
+The categories are:
+- location
+- experience
+- education
+- skills
+- languages
+- other
+
+Once those are complete, compute an overall **summary_score** (0–100) and **summary_note** for each candidate that reflects how well the candidate matches the job, based on the above categories.
+
+Candidates:
+{candidates_text}
+
+Job Description:
+{job_description}
+
+Output format (a single JSON object with one entry per candidate tag, nothing else):
+{{
+  "<candidate tag>": {{
+    "location_score": <int>,
+    "location_note": "<short explanation>",
+    "experience_score": <int>,
+    "experience_note": "<short explanation>",
+    "education_score": <int>,
+    "education_note": "<short explanation>",
+    "skills_score": <int>,
+    "skills_note": "<short explanation>",
+    "languages_score": <int>,
+    "languages_note": "<short explanation>",
+    "other_score": <int>,
+    "other_note": "<short explanation>",
+    "summary_score": <int>,
+    "summary_note": "<short explanation>"
+  }}
+}}
+"""
+
+
+def candidate_tag(resume):
+    """
+    Stable tag of a resume in packed prompts, derived from its content (not from its position in the pack).
+    """
+    return "C" + hashlib.sha256(oneshot_resume_text(resume).encode("utf-8")).hexdigest()[:8].upper()
+
+
+def plan_oneshot_packs(resumes, job_description, token_budget=ONESHOT_PACK_TOKEN_BUDGET,
+                       max_candidates=ONESHOT_PACK_MAX_CANDIDATES, answer_tokens=ONESHOT_PACK_ANSWER_TOKENS):
+    """
+    Splits resumes into packs, adding candidates to a pack while its estimated prompt and answer tokens
+    stay within `token_budget` (a candidate that alone exceeds it still gets a pack of its own).
+
+    Returns:
+        list[list[int]]: Resume indices of every pack, in input order.
+    """
+    base_tokens = len(oneshot_packed_prompt("", job_description)) // 4
+    packs, current, current_tokens = [], [], base_tokens
+    for i, resume in enumerate(resumes):
+        tokens = len(oneshot_resume_text(resume)) // 4 + answer_tokens
+        if current and (current_tokens + tokens > token_budget or len(current) >= max_candidates):
+            packs.append(current)
+            current, current_tokens = [], base_tokens
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        packs.append(current)
+    return packs
+
+
+def parse_oneshot_packed_response(response, tags):
+    """
+    Extends `parse_oneshot_response` to a packed answer: the JSON object keyed by candidate tag is parsed
+    first; otherwise the text is cut at each tag and every block is parsed on its own.
+
+    Returns:
+        dict: tag -> parsed fields (see `parse_oneshot_response`), None for candidates without a block.
+    """
+    blocks = {}
+    parsed = _json_object(response)
+    if parsed is not None:
+        for tag in tags:
+            if isinstance(parsed.get(tag), dict):
+                blocks[tag] = json.dumps(parsed[tag])
+    if not blocks:
+        positions = sorted((response.find(tag), tag) for tag in tags if tag in response)
+        for (start, tag), (end, _) in zip(positions, positions[1:] + [(len(response), None)]):
+            blocks[tag] = response[start + len(tag):end]
+    return {tag: parse_oneshot_response(blocks[tag]) if tag in blocks else None for tag in tags}
+
+
+async def arun_oneshot_packed(resumes, job_description, model=None, max_concurrency=MAX_CONCURRENT_RESUMES, on_parsed=None,
+                              token_budget=ONESHOT_PACK_TOKEN_BUDGET, max_candidates=ONESHOT_PACK_MAX_CANDIDATES):
+    """
+    One-shot evaluation with several resumes per prompt (see `plan_oneshot_packs`) and one copy of the job
+    description. Candidates whose block is missing or lacks a score are re-run individually with
+    `arun_oneshot_scores`, and so are the candidates of a packed prompt that failed after the scheduler's
+    retries. A resume whose individual run fails as well is skipped without affecting the others.
+    Logprob statistics are not computed for packed answers.
+
+    Args:
+        on_parsed (Callable | None): Called with (resume index, parsed fields) as soon as a resume is done.
+
+    Returns:
+        list[dict | None]: The parsed fields of every resume (see `parse_oneshot_response`), in input order;
+        None for the resumes that failed.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    results = [None] * len(resumes)
+
+    def done(i, parsed):
+        results[i] = parsed
+        if on_parsed is not None:
+            on_parsed(i, parsed)
+
+    async def run_single(i):
+        async with semaphore:
+            try:
+                parsed = await arun_oneshot_scores(resumes[i], job_description, model=model)
+            except Exception as e:
+                # Keep the rest of the run; the resume stays unevaluated and is retried on the next run
+                print(f"[WARN] One-shot evaluation of resume {i + 1} of {len(resumes)} failed after retries and was skipped: "
+                      f"{type(e).__name__}: {e}")
+                return
+        done(i, parsed)
+
+    async def run_pack(pack):
+        tags = {}
+        for i in pack:
+            tags.setdefault(candidate_tag(resumes[i]), []).append(i)
+        if len(tags) == 1:
+            await asyncio.gather(*(run_single(i) for i in pack))
+            return
+
+        candidates_text = "\n".join(
+            f"Candidate {tag}:\n{oneshot_resume_text(resumes[indices[0]])}" for tag, indices in tags.items()
+        )
+        try:
+            async with semaphore:
+                response = await acall_openai(oneshot_packed_prompt(candidates_text, job_description), model=model,
+                                              stage="oneshot_packed", response_format=SCORE_RESPONSE_FORMAT)
+        except Exception as e:
+            print(f"[WARN] A packed one-shot prompt of {len(pack)} resumes failed after retries ({type(e).__name__}: {e}), "
+                  f"re-running them individually")
+            await asyncio.gather(*(run_single(i) for i in pack))
+            return
+        parsed_blocks = parse_oneshot_packed_response(response, list(tags))
+
+        retry = []
+        for tag, indices in tags.items():
+            parsed = parsed_blocks[tag]
+            if parsed is None or any(parsed[field] is None for field in ONESHOT_FIELDS if field.endswith("_score")):
+                retry.extend(indices)
+                continue
+            for i in indices:
+                done(i, dict(parsed))
+        if retry:
+            print(f"[WARN] {len(retry)} candidates of a packed one-shot prompt had no complete answer, re-running them individually")
+            await asyncio.gather(*(run_single(i) for i in retry))
+
+    packs = plan_oneshot_packs(resumes, job_description, token_budget=token_budget, max_candidates=max_candidates)
+    print(f"[INFO] Packed {len(resumes)} resumes into {len(packs)} one-shot prompts")
+    await asyncio.gather(*(run_pack(pack) for pack in packs))
+    return results
+
+
+def run_oneshot_packed(resumes, job_description, model=None, on_parsed=None):
+    return run_sync(arun_oneshot_packed(resumes, job_description, model=model, on_parsed=on_parsed))
@@ -0,0 +1,116 @@
+"""
+result_cache.py
+
+Per-resume, content-keyed store for evaluation results.
+
+Every result row is stored under a key built from:
+- the resume content (hash of all its fields),
+- the job description (hash of its text),
+- the prompt templates that produced it (hash of the rendered templates, see `prompts.prompt_template_hash`),
+- the model name and the evaluation kind ('tot' or 'oneshot').
+
+A run can therefore look up which resumes already have a valid result and evaluate only the missing or
+invalidated ones; changing the job description, a prompt or the model invalidates exactly the rows it affects.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from main_config import RESULT_STORE_PATH
+
+
+def text_hash(text):
+    return hashlib.sha256(str(text).encode("utf-8")).hexdigest()
+
+
+def resume_hash(resume):
+    """
+    Hashes every field of a resume dictionary, independent of key order.
+    """
+    return text_hash(json.dumps(resume, sort_keys=True, default=str, ensure_ascii=False))
+
+
+def _json_default(value):
+    # numpy / pandas scalars (e.g. int64 scores read back from a DataFrame)
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def result_key(kind, resume, job_description, prompt_hash, model):
+    """
+    Returns the cache key of one evaluation result.
+    """
+    return text_hash("|".join([kind, resume_hash(resume), text_hash(job_description), prompt_hash, model]))
+
+
+class ResultStore:
+    """
+    SQLite-backed mapping of result key -> result row (dict of scores and notes).
+
+    Args:
+        path (str): Database file. Created on first use.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                row TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get_many(self, keys):
+        """
+        Returns {key: row} for every key that has a stored result.
+        """
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._lock:
+            # Stay well below SQLite's host-parameter limit
+            for start in range(0, len(unique_keys), 500):
+                chunk = unique_keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for key, row in self._conn.execute(f"SELECT key, row FROM results WHERE key IN ({placeholders})", chunk):
+                    found[key] = json.loads(row)
+        return found
+
+    def put_many(self, items):
+        """
+        Stores (key, row) pairs, replacing older results under the same key.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO results (key, row, created_at) VALUES (?, ?, ?)",
+                [(key, json.dumps(row, default=_json_default), now) for key, row in items]
+            )
+            self._conn.commit()
+
+    def put(self, key, row):
+        self.put_many([(key, row)])
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+_stores = {}
+
+
+def get_result_store(path=RESULT_STORE_PATH):
+    """
+    Returns the shared `ResultStore` for `path`, opening it on first use.
+    """
+    if path not in _stores:
+        _stores[path] = ResultStore(path)
+    return _stores[path]
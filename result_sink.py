@@ -0,0 +1,143 @@
+"""
+result_sink.py
+
+Append-only, batched writer for result rows, flushed every `flush_rows` rows or `flush_seconds` seconds to a
+`.jsonl` file or, with `pyarrow`, one `.parquet` row group per flush. Excel is only a final export (`export_excel`).
+"""
+
+import json
+import os
+import threading
+import time
+import pandas as pd
+from result_cache import _json_default
+from main_config import RESULT_SINK_FLUSH_ROWS, RESULT_SINK_FLUSH_SECONDS
+
+
+def _parquet_schema(columns):
+    import pyarrow as pa
+    fields = []
+    for column in columns:
+        if column == "id":
+            fields.append(pa.field(column, pa.int64()))
+        elif column.endswith(("_score", "_score_expected", "_score_entropy", "_score_variance")):
+            fields.append(pa.field(column, pa.float64()))
+        else:
+            fields.append(pa.field(column, pa.string()))
+    return pa.schema(fields)
+
+
+class ResultSink:
+    """
+    Buffered append-only writer for result rows.
+
+    Args:
+        path (str): Output file, `.jsonl` or `.parquet`. Truncated when the sink is opened.
+        columns (list[str]): Columns written for every row, in order (missing values are written as null).
+        flush_rows (int): Rows buffered before a flush.
+        flush_seconds (float): Maximum age of the oldest buffered row before a flush.
+    """
+
+    def __init__(self, path, columns, flush_rows=RESULT_SINK_FLUSH_ROWS, flush_seconds=RESULT_SINK_FLUSH_SECONDS):
+        self.path = path
+        self.columns = list(columns)
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.rows_written = 0
+        self._buffer = []
+        self._buffer_started = None
+        self._lock = threading.Lock()
+        self._parquet_writer = None
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        extension = os.path.splitext(path)[1].lower()
+        if extension == ".parquet":
+            try:
+                import pyarrow.parquet as pq
+            except ImportError as e:
+                raise ImportError("Writing Parquet results requires pyarrow (pip install pyarrow)") from e
+            self.format = "parquet"
+            self._schema = _parquet_schema(self.columns)
+            self._parquet_writer = pq.ParquetWriter(path, self._schema)
+        elif extension in (".jsonl", ".ndjson"):
+            self.format = "jsonl"
+            open(path, "w", encoding="utf-8").close()
+        else:
+            raise ValueError(f"Unsupported result sink format: {path}")
+
+    def write(self, row):
+        """
+        Buffers one result row and flushes if the buffer is full or old enough.
+        """
+        with self._lock:
+            if not self._buffer:
+                self._buffer_started = time.monotonic()
+            self._buffer.append({column: row.get(column) for column in self.columns})
+            if len(self._buffer) >= self.flush_rows or time.monotonic() - self._buffer_started >= self.flush_seconds:
+                self._flush_locked()
+
+    def write_many(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        rows, self._buffer = self._buffer, []
+        if self.format == "parquet":
+            import pyarrow as pa
+            columns = {
+                column: [None if value != value else value for value in (row[column] for row in rows)]
+                for column in self.columns
+            }
+            self._parquet_writer.write_table(pa.Table.from_pydict(columns, schema=self._schema))
+        else:
+            with open(self.path, "a", encoding="utf-8") as f:
+                for row in rows:
+                    # NaN is not valid JSON; write it as null
+                    f.write(json.dumps({k: (None if v != v else v) for k, v in row.items()}, default=_json_default,
+                                       ensure_ascii=False) + "\n")
+        self.rows_written += len(rows)
+
+    def close(self):
+        self.flush()
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def read_results(path, columns=None):
+    """
+    Loads a JSONL or Parquet results file into a DataFrame sorted by id.
+    """
+    if os.path.splitext(path)[1].lower() == ".parquet":
+        frame = pd.read_parquet(path)
+    else:
+        frame = pd.read_json(path, lines=True, dtype=False) if os.path.getsize(path) else pd.DataFrame()
+    if columns is not None:
+        frame = frame.reindex(columns=columns)
+    if "id" in frame and len(frame):
+        frame = frame.sort_values("id").reset_index(drop=True)
+    return frame
+
+
+def export_excel(path, excel_path, columns=None):
+    """
+    Optional final export of a JSONL/Parquet results file to Excel.
+    """
+    frame = read_results(path, columns)
+    frame.to_excel(excel_path, index=False)
+    return frame
@@ -0,0 +1,159 @@
+"""
+scheduler.py
+
+Client-side rate limiting, retries and deadlines for LLM requests: RPM and TPM token buckets, jittered exponential
+backoff on rate-limit, timeout, connection and 5xx errors (honouring Retry-After), and per-call deadlines.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+import openai
+
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+# Rough completion size assumed when a request sets no max_tokens
+DEFAULT_COMPLETION_TOKENS = 300
+
+
+def estimate_tokens(messages, max_tokens=None):
+    """
+    Estimates the TPM cost of a chat request (~4 characters per token, plus the expected completion).
+    """
+    prompt_chars = sum(len(message["content"]) for message in messages)
+    return prompt_chars // 4 + (max_tokens or DEFAULT_COMPLETION_TOKENS)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at `per_minute` units per minute.
+    `reserve(amount)` takes the units immediately and returns how long the caller must wait before using them,
+    so concurrent callers are served in reservation order.
+    """
+
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60.0
+        self.capacity = per_minute
+        self.available = per_minute
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount=1):
+        with self._lock:
+            now = time.monotonic()
+            self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+            self.updated = now
+            self.available -= amount
+            return 0.0 if self.available >= 0 else -self.available / self.rate
+
+
+def is_retryable(exc):
+    if isinstance(exc, (TimeoutError, openai.APITimeoutError, openai.APIConnectionError,
+                        openai.RateLimitError, openai.InternalServerError)):
+        return True
+    status = getattr(exc, "status_code", None)
+    return status is not None and (status in RETRYABLE_STATUS_CODES or status >= 500)
+
+
+def retry_after_seconds(exc):
+    """
+    Returns the server-requested wait from the error's Retry-After headers, or None.
+    """
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RequestScheduler:
+    """
+    Shared gate for LLM requests.
+
+    Args:
+        rpm (int | None): Requests per minute allowed. None disables the request bucket.
+        tpm (int | None): Estimated tokens per minute allowed. None disables the token bucket.
+        max_retries (int): Retries after the first attempt for retryable errors.
+        base_backoff (float): Backoff before the first retry, doubled on each further retry (seconds).
+        max_backoff (float): Upper bound on a single backoff (seconds).
+        timeout (float | None): Timeout of one attempt (seconds).
+        deadline (float | None): Upper bound on the whole call including retries and waits (seconds).
+    """
+
+    def __init__(self, rpm=None, tpm=None, max_retries=6, base_backoff=1.0, max_backoff=60.0, timeout=60.0, deadline=300.0):
+        self.request_bucket = TokenBucket(rpm) if rpm else None
+        self.token_bucket = TokenBucket(tpm) if tpm else None
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.deadline = deadline
+
+    async def _wait_for_capacity(self, estimated_tokens):
+        delay = 0.0
+        if self.request_bucket:
+            delay = max(delay, self.request_bucket.reserve(1))
+        if self.token_bucket:
+            delay = max(delay, self.token_bucket.reserve(estimated_tokens))
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _backoff(self, attempt, exc):
+        retry_after = retry_after_seconds(exc)
+        if retry_after is not None:
+            return min(retry_after, self.max_backoff)
+        # Equal jitter: half the exponential step fixed, half random
+        step = min(self.max_backoff, self.base_backoff * 2 ** attempt)
+        return step / 2 + random.uniform(0, step / 2)
+
+    async def run(self, make_request, estimated_tokens=DEFAULT_COMPLETION_TOKENS):
+        """
+        Awaits `make_request()` (a coroutine factory) under the rate limits, retrying retryable failures.
+        Raises the last error once retries or the deadline are exhausted.
+
+        Returns:
+            tuple: (result of make_request(), number of retries it took)
+        """
+        deadline_at = time.monotonic() + self.deadline if self.deadline else None
+        attempt = 0
+        while True:
+            await self._wait_for_capacity(estimated_tokens)
+
+            timeout = self.timeout
+            if deadline_at is not None:
+                remaining = deadline_at - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"LLM request exceeded its {self.deadline}s deadline")
+                timeout = remaining if timeout is None else min(timeout, remaining)
+
+            try:
+                return await asyncio.wait_for(make_request(), timeout), attempt
+            except Exception as exc:
+                if not is_retryable(exc) or attempt >= self.max_retries:
+                    raise
+                backoff = self._backoff(attempt, exc)
+                if deadline_at is not None and time.monotonic() + backoff >= deadline_at:
+                    raise
+                attempt += 1
+                print(f"[WARN] LLM request failed ({type(exc).__name__}), retry {attempt}/{self.max_retries} in {backoff:.1f}s")
+                await asyncio.sleep(backoff)
@@ -0,0 +1,257 @@
+"""
+section_memo.py
+
+Canonical resume sections and memoization of the chains that read them.
+
+Many resumes of a large pool share sections that are equal in substance but not byte for byte
+("BS Computer Science, UCLA" vs "B.S. in Computer Science – UCLA", "English, Spanish" vs "Spanish; English"),
+which defeats the prompt-keyed LLM response cache. `canonical_section` normalizes a section: Unicode forms,
+casing, punctuation and whitespace, common degree abbreviations and filler words, and the order of list items.
+The chains in `SECTION_MEMO_CHAINS` are then memoized in the result store under (chain, canonical input, job text,
+prompt templates, route), so a chain runs once per distinct canonical input and job instead of once per resume.
+Concurrent resumes with the same canonical input share one execution.
+
+The prompts still receive the resume's own text; canonical forms are only used as keys. The location chain is
+keyed by `location_gazetteer.normalize_location`. Education entries are canonicalized one degree entry at a time
+(entries are the lines, ';'- or bullet-separated parts of the section), keeping the order of the items inside an
+entry so a degree stays paired with its major, and only whole entries are sorted.
+
+The languages chain reads the whole resume (there is no languages section), so no resume section can key it.
+Its step 1 only lists the languages the candidate speaks, and steps 2 and 3 read nothing but that list and the
+job text, so for the chains of `EXTRACT_KEYED_CHAINS` step 1 runs per resume and steps 2-3 are memoized under the
+canonical list of the step 1 answer (`ChainMemo.extract_key`). In chain sessions the later steps also see the
+resume in the conversation, so these chains are not memoized there.
+"""
+
+import asyncio
+import re
+import unicodedata
+from prompts import CHAIN_STAGE_PREFIXES, prompt_template_hash, route_key, tot_prompt_templates
+from location_gazetteer import normalize_location
+from result_cache import get_result_store, text_hash
+from main_config import SECTION_MEMO, SECTION_MEMO_CHAINS, LOGPROB_SCORING
+
+# Phrase pattern -> canonical form, applied to education entries after dots are removed ("B.S." -> "bs")
+DEGREE_ABBREVIATIONS = {
+    r"bachelors? of science|bsc|bsci": "bs",
+    r"bachelors? of arts": "ba",
+    r"bachelors? of engineering|beng": "be",
+    r"masters? of science|msc": "ms",
+    r"masters? of arts": "ma",
+    r"masters? of engineering|meng": "me",
+    r"masters? of business administration": "mba",
+    r"doctor of philosophy|doctorate": "phd",
+    r"associates? of (?:arts|science)|associates? degree": "associate",
+    r"comp sci|compsci": "computer science",
+    r"univ": "university",
+    r"&": "and",
+}
+
+DEGREE_PATTERNS = [(re.compile(rf"(?<!\w)(?:{pattern})(?!\w)"), replacement) for pattern, replacement in DEGREE_ABBREVIATIONS.items()]
+
+FILLER_WORDS = {"in", "of", "at", "the", "a", "an", "degree", "major", "from"}
+
+# Separators between the items of one entry ("BS Computer Science, UCLA", "Spanish; English", "BS - UCLA")
+ITEM_SEPARATORS = re.compile(r"\s[-–—]\s|[–—,;|/•·]")
+
+# Education sections: separators between degree entries, and between the items of one entry
+EDUCATION_ENTRY_SEPARATORS = re.compile(r"[\n;|•·]")
+EDUCATION_ITEM_SEPARATORS = re.compile(r"\s[-–—]\s|[–—,/]")
+
+RESUME_TEXT_FIELDS = ["summary", "education", "experience", "skills"]
+
+# Chains memoized by the canonical list of their step 1 answer instead of a resume section
+EXTRACT_KEYED_CHAINS = {"languages"}
+
+
+def _normalize_text(text):
+    if text is None or text != text:
+        return ""
+    text = unicodedata.normalize("NFKC", str(text)).lower()
+    text = re.sub(r"[’'`\"“”]", "", text)
+    # Dots of abbreviations go ("b.s." -> "bs"); decimal points stay ("3.8")
+    return re.sub(r"\.(?!\d)", "", text)
+
+
+def _canonical_item(item, patterns=(), filler_words=frozenset()):
+    for pattern, replacement in patterns:
+        item = pattern.sub(replacement, item)
+    return " ".join(word for word in re.findall(r"[a-z0-9+#.]+", item) if word not in filler_words)
+
+
+def _canonical_items(text, patterns=(), filler_words=frozenset()):
+    entries = []
+    for line in _normalize_text(text).splitlines():
+        items = {_canonical_item(item, patterns, filler_words) for item in ITEM_SEPARATORS.split(line)} - {""}
+        if items:
+            entries.append(", ".join(sorted(items)))
+    return "\n".join(sorted(set(entries)))
+
+
+def canonical_education(text):
+    """
+    Canonical education section: one line per degree entry with degrees abbreviated and filler words dropped,
+    the items of an entry in their original order and the entries sorted. "B.S. in Computer Science – UCLA" and
+    "BS Computer Science, UCLA" agree, while "BS, Computer Science; MS, Math" and "BS, Math; MS, Computer Science" do not.
+    """
+    entries = set()
+    for entry in EDUCATION_ENTRY_SEPARATORS.split(_normalize_text(text)):
+        items = [_canonical_item(item, DEGREE_PATTERNS, FILLER_WORDS) for item in EDUCATION_ITEM_SEPARATORS.split(entry)]
+        items = [item for item in items if item]
+        if items:
+            entries.add(", ".join(items))
+    return "\n".join(sorted(entries))
+
+
+def canonical_list(text):
+    """
+    Canonical list section (skills, languages): items lowercased, deduplicated and sorted.
+    """
+    return _canonical_items(text)
+
+
+def canonical_text(text):
+    """
+    Canonical free text: casing, quotes, Unicode forms and whitespace normalized, word order kept.
+    """
+    return " ".join(re.findall(r"[a-z0-9+#.]+", _normalize_text(text)))
+
+
+# chain -> canonical form of the resume input the chain reads
+CANONICAL_SECTIONS = {
+    "location": lambda resume: normalize_location(resume.get("location")),
+    "education": lambda resume: canonical_education(resume.get("education")),
+    "skills": lambda resume: canonical_list(resume.get("skills")),
+    "other": lambda resume: "\n".join(canonical_text(resume.get(field)) for field in RESUME_TEXT_FIELDS),
+    "experience": lambda resume: canonical_text(resume.get("experience")),
+}
+
+
+def canonical_section(category, resume):
+    """
+    Returns the canonical form of the resume input of a chain.
+    """
+    return CANONICAL_SECTIONS[category](resume)
+
+
+class ChainMemo:
+    """
+    Result-store-backed memo of chain results (score, note, details) keyed by canonical chain input.
+
+    Args:
+        store (ResultStore): Store the memoized chain results are kept in.
+        chains (list[str]): Chains that are memoized.
+    """
+
+    def __init__(self, store, chains=SECTION_MEMO_CHAINS):
+        self.store = store
+        self.chains = set(chains)
+        self._inflight = {}
+        self._prompt_hashes = {}
+        self.reset_stats()
+
+    def _prompt_hash(self, sessions):
+        if sessions not in self._prompt_hashes:
+            self._prompt_hashes[sessions] = prompt_template_hash(tot_prompt_templates(False, sessions))
+        return self._prompt_hashes[sessions]
+
+    def _key(self, category, canonical_input, job_text, sessions):
+        prefix = CHAIN_STAGE_PREFIXES[category]
+        return text_hash("|".join([
+            "chain", category, canonical_input, text_hash(job_text), self._prompt_hash(sessions),
+            route_key([f"{prefix}{step}" for step in (1, 2, 3)]), "sessions" if sessions else "", "logprobs" if LOGPROB_SCORING else ""
+        ]))
+
+    def key(self, category, resume, job_text, sessions=False):
+        """
+        Returns the memo key of a chain run, or None if `category` is not memoized by resume section
+        (see `extract_key` for the chains of `EXTRACT_KEYED_CHAINS`).
+        `job_text` is the job text the chain receives (distilled slice or full job description).
+        """
+        if category not in self.chains or category in EXTRACT_KEYED_CHAINS:
+            return None
+        return self._key(category, canonical_section(category, resume), job_text, sessions)
+
+    def extracts_first(self, category, sessions=False):
+        """
+        True if the chain of `category` is memoized by its step 1 answer: run step 1, then `extract_key`.
+        """
+        return category in self.chains and category in EXTRACT_KEYED_CHAINS and not sessions
+
+    def extract_key(self, category, step1_output, job_text):
+        """
+        Returns the memo key of steps 2-3 of a chain of `EXTRACT_KEYED_CHAINS` given its step 1 answer.
+        """
+        return self._key(category, "extract:" + canonical_list(step1_output), job_text, False)
+
+    def get(self, key):
+        entry = self.store.get_many([key]).get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["score"], entry["note"], entry.get("details", {})
+
+    def put(self, key, score, note, details=None):
+        self.store.put(key, {"score": score, "note": note, "details": details or {}})
+
+    async def arun(self, key, run_chain):
+        """
+        Returns the memoized (score, note, details) of `key`, or awaits `run_chain()` once for all concurrent callers
+        with the same key and memoizes its result.
+        """
+        if key in self._inflight:
+            self.hits += 1
+            return await asyncio.shield(self._inflight[key])
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            score, note, details = await run_chain()
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved in case no other caller is waiting for it
+            future.exception()
+            raise
+        else:
+            self.put(key, score, note, details)
+            future.set_result((score, note, details))
+            return score, note, details
+        finally:
+            del self._inflight[key]
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def report(self):
+        """
+        Prints how many memoized chain runs were served from the canonical-section memo since the last reset.
+        """
+        total = self.hits + self.misses
+        if total:
+            print(f"[INFO] Section memo: {self.hits} of {total} {'/'.join(sorted(self.chains))} chain runs "
+                  f"({self.hits / total:.0%}) reused a result for the same canonical section")
+
+
+_memo = {}
+
+
+def get_chain_memo():
+    """
+    Returns the shared `ChainMemo` over `RESULT_STORE_PATH` if `SECTION_MEMO` is on, else None.
+    """
+    if not SECTION_MEMO:
+        return None
+    if "memo" not in _memo:
+        _memo["memo"] = ChainMemo(get_result_store())
+    return _memo["memo"]
+
+
+def set_chain_memo(memo):
+    """
+    Replaces the shared `ChainMemo` (None turns memoization off, e.g. for benchmarks that must evaluate every resume).
+    """
+    _memo["memo"] = memo
@@ -0,0 +1,293 @@
+"""
+skills_matcher.py
+
+Deterministic replacement for SK1 (skills extraction) of the skills chain.
+
+SK1 asks the LLM to list the resume skills that the job description asks for, which is string matching. Here
+every skill of `SKILL_TAXONOMY` has a canonical name and its aliases ("Golang" -> Go, "C/C++" -> C and C++,
+"back-end" -> Backend). Text is split into normalized tokens and scanned with a token-level Aho-Corasick
+automaton, so multi-word aliases ("apache spark", "natural language processing") match in one pass and only on
+word boundaries. The job description is compiled once: its skills and an automaton over just their aliases are
+memoized per job description text, after which matching a resume is a single linear scan of its skills field.
+
+Resume skill items the taxonomy does not know are still matched if they appear verbatim in the skills requirements
+of the job description.
+The result (matched and missing skills) is rendered as text and handed to SK2 in place of the SK1 answer, so the
+skills evidence is reproducible and auditable.
+"""
+
+import json
+import re
+from collections import deque
+from functools import lru_cache
+
+# Canonical skill -> aliases. Aliases are tokenized like the text they are matched against (see `normalize_tokens`)
+SKILL_TAXONOMY = {
+    "Python": ["python", "python3"],
+    "Java": ["java"],
+    "Go": ["Go", "golang"],
+    "C": ["C"],
+    "C++": ["c++", "cpp"],
+    "C#": ["c#"],
+    "JavaScript": ["javascript", "js", "node.js", "nodejs"],
+    "TypeScript": ["typescript"],
+    "Rust": ["rust"],
+    "Scala": ["scala"],
+    "Kotlin": ["kotlin"],
+    "Swift": ["swift"],
+    "R": ["R"],
+    "SQL": ["sql", "mysql", "postgresql", "postgres", "sqlite"],
+    "NoSQL": ["nosql", "mongodb", "cassandra", "redis"],
+    "Hadoop": ["hadoop", "hdfs", "mapreduce"],
+    "Spark": ["spark", "apache spark", "pyspark"],
+    "Flink": ["flink", "apache flink"],
+    "Kafka": ["kafka", "apache kafka"],
+    "Big data": ["big data"],
+    "Machine learning": ["machine learning", "ml"],
+    "Deep learning": ["deep learning", "neural network"],
+    "NLP": ["nlp", "natural language processing"],
+    "Computer vision": ["computer vision"],
+    "Recommender systems": ["recommender system", "recommendation system", "recommendation", "recommender"],
+    "Search": ["search", "search engine", "information retrieval"],
+    "Ranking": ["ranking", "learning to rank"],
+    "Ads": ["ads", "advertising", "ad tech"],
+    "Data science": ["data science", "data analysis", "data analytics"],
+    "Backend": ["backend", "back-end", "back end"],
+    "Frontend": ["frontend", "front-end", "front end", "react", "angular", "vue"],
+    "Full-stack": ["full-stack", "fullstack", "full stack"],
+    "Large-scale systems": ["large-scale system", "large scale system", "distributed system", "scalability"],
+    "Cloud": ["aws", "gcp", "azure", "cloud computing"],
+    "Docker": ["docker"],
+    "Kubernetes": ["kubernetes", "k8s"],
+    "Git": ["git", "github"],
+    "Linux": ["linux", "unix"],
+    "TensorFlow": ["tensorflow"],
+    "PyTorch": ["pytorch"],
+    "scikit-learn": ["scikit-learn", "sklearn"],
+    "Communication": ["communication"],
+    "Collaboration": ["collaboration", "teamwork", "team player", "cross-functional"],
+    "Problem solving": ["problem solving", "problem-solving", "troubleshooting"],
+    "Leadership": ["leadership", "mentoring", "mentorship"],
+}
+
+# Words, optionally joined by '&' or '-' into a compound ("R&D", "C-level", "full-stack")
+TOKEN_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9+#.]*(?:[&-][A-Za-z0-9][A-Za-z0-9+#.]*)*")
+COMPOUND_SEPARATORS = re.compile(r"[&-]")
+
+# Single-letter / common-word skills only match in this exact spelling ("Go" and "C", not "go" and "c"), and only
+# where they stand as a list item: after the start of the text, a separator or a list word ("Python, Go", "in R",
+# "C/C++") and before the end, a separator, a sentence end or "and"/"or". "Let's Go" or "Plan C going forward" do not count
+CASE_SENSITIVE_TOKENS = {"Go", "C", "R"}
+LIST_ITEM_BEFORE = re.compile(r"(?:[,;/|(:•·\n]|\b(?:and|or|in|with|using|of))\s*$", re.I)
+LIST_ITEM_AFTER = re.compile(r"\s*(?:[,;/|)•·\n]|\.(?!\w)|(?:and|or)\b|$)", re.I)
+
+# Separators of the items of a resume's skills field
+ITEM_SEPARATORS = re.compile(r"[,;|/\n•·()]|\band\b")
+
+# Longest resume skill item (in tokens) matched verbatim against the job description
+MAX_ITEM_TOKENS = 4
+
+# Headings of the job description blocks that hold its skills requirements ("Minimum Qualifications:"), and the
+# prefix of a distilled skills requirements text (see `jd_distill.build_job_requirements`)
+REQUIREMENTS_HEADING = re.compile(r"^\W*(?:[\w/-]+\s+){0,3}(?:qualifications|requirements|skills)\s*:?\s*$", re.I)
+DISTILLED_REQUIREMENTS = re.compile(r"^\s*skills requirements:", re.I)
+
+# Words that never make a resume item a match on their own ("Team", "Users", "Data", "Working knowledge")
+STOPWORDS = {
+    "a", "an", "and", "or", "the", "of", "in", "on", "for", "to", "with", "as", "at", "by", "from", "such", "etc",
+    "other", "one", "following", "similar", "least", "but", "not", "limited", "your", "our", "we", "you",
+}
+GENERIC_TERMS = {
+    "ability", "application", "applications", "area", "areas", "background", "degree", "development", "domain",
+    "domains", "effective", "experience", "field", "fields", "knowledge", "languages", "majors", "product",
+    "products", "proficiency", "relevant", "service", "services", "skill", "skills", "system", "systems", "team",
+    "teams", "user", "users", "work", "working", "year", "years", "data", "large", "scale", "strong",
+}
+
+
+def _is_list_item(text, start, end):
+    before = start == 0 or not text[:start].strip() or LIST_ITEM_BEFORE.search(text, max(0, start - 12), start)
+    return bool(before) and bool(LIST_ITEM_AFTER.match(text, end))
+
+
+def normalize_tokens(text):
+    """
+    Splits `text` into lowercased tokens. `CASE_SENSITIVE_TOKENS` keep their spelling where they stand as a list
+    item (see `_is_list_item`). Keeps '+', '#' and '.' inside tokens (C++, C#, Node.js) and splits on everything else,
+    so "C/C++" gives ["C", "c++"] and "full-stack" ["full", "stack"]; '&' and '-' compounds with a case-sensitive part
+    stay one token ("R&D" -> "r&d", "C-level" -> "c-level"), so they never match R or C.
+    """
+    text = str(text)
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text):
+        token = match.group().rstrip(".")
+        parts = [part.rstrip(".") for part in COMPOUND_SEPARATORS.split(token)]
+        if len(parts) > 1:
+            if any(part in CASE_SENSITIVE_TOKENS for part in parts):
+                tokens.append(token.lower())
+            else:
+                tokens.extend(part.lower() for part in parts if part)
+        elif token in CASE_SENSITIVE_TOKENS and _is_list_item(text, match.start(), match.start() + len(token)):
+            tokens.append(token)
+        elif token:
+            tokens.append(token.lower())
+    return tokens
+
+
+def alias_variants(alias):
+    """
+    Token sequences an alias matches: the alias itself and, for a word ending the alias, its plural.
+    """
+    tokens = tuple(normalize_tokens(alias))
+    variants = [tokens]
+    last = tokens[-1]
+    if last.isalpha() and len(last) > 3 and not last.endswith("s"):
+        variants.append(tokens[:-1] + (last + "s",))
+    return variants
+
+
+class TokenAutomaton:
+    """
+    Aho-Corasick automaton over token sequences.
+
+    Args:
+        patterns (dict): Token tuple -> label reported when the tuple occurs.
+    """
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for tokens, label in patterns.items():
+            node = 0
+            for token in tokens:
+                if token not in self.goto[node]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[node][token] = len(self.goto) - 1
+                node = self.goto[node][token]
+            self.output[node].append(label)
+
+        # Breadth-first failure links; each node also reports the labels of its failure chain
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for token, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and token not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(token, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def labels(self, tokens):
+        """
+        Returns the labels of every pattern occurring in `tokens`, in order of first occurrence.
+        """
+        found = {}
+        node = 0
+        for token in tokens:
+            while node and token not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(token, 0)
+            for label in self.output[node]:
+                found.setdefault(label, None)
+        return list(found)
+
+
+def _taxonomy_patterns(skills):
+    return {variant: skill for skill in skills for alias in SKILL_TAXONOMY[skill] for variant in alias_variants(alias)}
+
+
+TAXONOMY_AUTOMATON = TokenAutomaton(_taxonomy_patterns(SKILL_TAXONOMY))
+
+
+def skill_taxonomy_text():
+    # Rendered into the prompt hash (see `prompts.tot_prompt_templates`), so taxonomy and tokenization edits invalidate cached results
+    return json.dumps({
+        "taxonomy": SKILL_TAXONOMY, "tokens": TOKEN_PATTERN.pattern, "case_sensitive": sorted(CASE_SENSITIVE_TOKENS),
+        "list_item": [LIST_ITEM_BEFORE.pattern, LIST_ITEM_AFTER.pattern],
+        "requirements": [REQUIREMENTS_HEADING.pattern, DISTILLED_REQUIREMENTS.pattern],
+        "generic": sorted(STOPWORDS | GENERIC_TERMS),
+    }, sort_keys=True)
+
+
+def skills_match_summary(matched_skills, missing_skills):
+    return f"""Skills from the resume that the job description asks for: {matched_skills}
+Skills the job description asks for that the resume does not list: {missing_skills}"""
+
+
+def requirements_text(job_description):
+    """
+    Returns the skills requirements of a job description: the whole text if it is a distilled skills requirements
+    text, else the blank-line separated blocks under a requirements heading ("Qualifications", "Required Skills:"),
+    or "" if there are none. Team, company and benefits blocks are left out.
+    """
+    job_description = str(job_description)
+    if DISTILLED_REQUIREMENTS.match(job_description):
+        return job_description
+    blocks = re.split(r"\n\s*\n", job_description)
+    return "\n\n".join(block for block in blocks if REQUIREMENTS_HEADING.match(block.strip().split("\n", 1)[0]))
+
+
+def _phrases(tokens):
+    return {
+        phrase
+        for size in range(1, MAX_ITEM_TOKENS + 1) for start in range(len(tokens) - size + 1)
+        for phrase in [tuple(tokens[start:start + size])]
+        if not set(phrase) <= STOPWORDS | GENERIC_TERMS
+    }
+
+
+class JobSkills:
+    """
+    Skills of one job description with an automaton over just their aliases (see `compile_job_skills`).
+    """
+
+    def __init__(self, job_description):
+        tokens = normalize_tokens(job_description)
+        self.skills = TAXONOMY_AUTOMATON.labels(tokens)
+        self.automaton = TokenAutomaton(_taxonomy_patterns(self.skills))
+        self.phrases = _phrases(normalize_tokens(requirements_text(job_description)))
+
+    def match(self, resume_skills):
+        """
+        Returns (matched skills, missing skills). Matched skills are the job's taxonomy skills found in the resume,
+        in job description order, followed by resume items the taxonomy does not know that the skills requirements
+        contain verbatim (see `requirements_text`) and that are not just stopwords and generic terms.
+        """
+        if resume_skills is None or resume_skills != resume_skills:
+            return [], list(self.skills)
+        found = set(self.automaton.labels(normalize_tokens(resume_skills)))
+        matched = [skill for skill in self.skills if skill in found]
+        for item in ITEM_SEPARATORS.split(str(resume_skills)):
+            # Drop group headers ("Programming: Perl" -> "Perl")
+            item = item.rsplit(":", 1)[-1]
+            tokens = tuple(normalize_tokens(item))
+            if (tokens and len(tokens) <= MAX_ITEM_TOKENS and tokens in self.phrases
+                    and not TAXONOMY_AUTOMATON.labels(tokens)):
+                label = item.strip()
+                if label not in matched:
+                    matched.append(label)
+        missing = [skill for skill in self.skills if skill not in found]
+        return matched, missing
+
+
+@lru_cache(maxsize=32)
+def compile_job_skills(job_description):
+    """
+    Returns the `JobSkills` of a job description, built once per job description text.
+    """
+    return JobSkills(job_description)
+
+
+def match_skills(resume_skills, job_description):
+    """
+    Matches a resume's skills field against a job description.
+
+    Returns:
+        str: The matched and missing skills, in the form SK2 expects from SK1.
+    """
+    matched, missing = compile_job_skills(job_description).match(resume_skills)
+    return skills_match_summary(", ".join(matched) or "none", ", ".join(missing) or "none")
@@ -0,0 +1,275 @@
+"""
+summary_model.py
+
+Local summary scorer that can stand in for the S1 -> S2 -> S3 summary chain: a ridge regression over the category
+scores and note cues, trained from earlier ToT results, with a split-conformal error bound per row. Predictions
+whose bound exceeds `SUMMARY_MODEL_MAX_ERROR`, or rows outside the training range, fall back to the LLM chain.
+"""
+
+import os
+import re
+import numpy as np
+import pandas as pd
+from result_cache import text_hash
+from main_config import (
+    LOCAL_SUMMARY_MODEL, SUMMARY_MODEL_PATH, SUMMARY_MODEL_TRAINING_PATHS, SUMMARY_MODEL_MIN_ROWS,
+    SUMMARY_MODEL_MAX_ERROR, SUMMARY_MODEL_COVERAGE, SUMMARY_MODEL_CALIBRATION_FRACTION, SUMMARY_MODEL_RIDGE
+)
+
+CATEGORIES = ["experience", "location", "education", "skills", "languages", "other"]
+
+POSITIVE_CUES = re.compile(r"\b(strong|excellent|extensive|exceeds|highly|solid|well[- ]suited|impressive|relevant)\b")
+NEGATIVE_CUES = re.compile(r"\b(lack|lacks|lacking|no|not|missing|limited|weak|insufficient|unclear)\b")
+
+FEATURE_NAMES = [f"{category}_score" for category in CATEGORIES] + [
+    "min_score", "max_score", "positive_cues", "negative_cues"
+]
+
+
+def summary_features(row):
+    """
+    Returns the feature vector of one result row, or None if a category score is missing.
+    """
+    scores = []
+    for category in CATEGORIES:
+        score = row.get(f"{category}_score")
+        if score is None or score != score:
+            return None
+        scores.append(float(score))
+    notes = " ".join(str(row.get(f"{category}_note") or "") for category in CATEGORIES).lower()
+    return np.array(scores + [
+        min(scores), max(scores), len(POSITIVE_CUES.findall(notes)), len(NEGATIVE_CUES.findall(notes))
+    ])
+
+
+def _read_results(path):
+    # Stored snapshots and streamed result files (see `result_sink`)
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".xlsx":
+        return pd.read_excel(path)
+    if extension == ".csv":
+        return pd.read_csv(path)
+    if extension == ".jsonl":
+        return pd.read_json(path, lines=True)
+    if extension == ".parquet":
+        return pd.read_parquet(path)
+    raise ValueError(f"Unsupported results file: {path}")
+
+
+def training_rows(paths=SUMMARY_MODEL_TRAINING_PATHS):
+    """
+    Collects the result rows usable for training from `paths` (missing files are skipped). Rows without an LLM
+    summary score (missing scores, or scored by the local model) are dropped, and duplicate rows are kept once.
+    """
+    rows, seen = [], set()
+    for path in paths:
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            continue
+        for row in _read_results(path).to_dict("records"):
+            if row.get("summary_source") == "local" or summary_features(row) is None:
+                continue
+            summary = row.get("summary_score")
+            if summary is None or summary != summary:
+                continue
+            fingerprint = text_hash("|".join(str(row.get(column)) for column in FEATURE_NAMES[:6] + ["summary_score", "summary_note"]))
+            if fingerprint not in seen:
+                seen.add(fingerprint)
+                rows.append(row)
+    return rows
+
+
+# Lower bound of the predicted spread, as a fraction of the mean absolute training residual, so a spread fit
+# close to zero cannot make a bound arbitrarily narrow. Also offsets the residuals before taking their log
+MIN_SPREAD_FRACTION = 0.1
+
+
+def _ridge(design, targets, ridge):
+    # The intercept is not penalized
+    penalty = ridge * np.eye(design.shape[1])
+    penalty[0, 0] = 0.0
+    return np.linalg.pinv(design.T @ design + penalty) @ design.T @ targets
+
+
+def conformal_quantile(normalized_errors, coverage):
+    """
+    Finite-sample split-conformal quantile: the ceil((n + 1) * coverage)-th smallest normalized error,
+    or inf if there are too few calibration rows for that coverage.
+    """
+    errors = np.sort(np.asarray(normalized_errors, dtype=float))
+    rank = int(np.ceil((len(errors) + 1) * coverage))
+    return float(errors[rank - 1]) if 0 < rank <= len(errors) else float("inf")
+
+
+class SummaryModel:
+    """
+    Ridge regression of `summary_score` on `summary_features`, with conformal per-row error bounds.
+
+    Args:
+        quantile (float): Calibrated quantile of the normalized errors; a row's bound is `quantile * spread(row)`.
+        coverage (float): Coverage the quantile was calibrated for.
+        max_error (float): Predictions with a larger bound (score points) are rejected.
+    """
+
+    def __init__(self, weights, mean, scale, spread_weights, min_spread, quantile, coverage, n_rows, low, high,
+                 max_error=SUMMARY_MODEL_MAX_ERROR):
+        self.weights = weights
+        self.mean = mean
+        self.scale = scale
+        self.spread_weights = spread_weights
+        self.min_spread = min_spread
+        self.quantile = quantile
+        self.coverage = coverage
+        self.n_rows = n_rows
+        self.low = low
+        self.high = high
+        self.max_error = max_error
+        self.fingerprint = text_hash(
+            "|".join(np.asarray(array, dtype=float).tobytes().hex()
+                     for array in (weights, mean, scale, spread_weights, low, high, [min_spread, quantile, coverage]))
+        )[:16]
+        self.reset_stats()
+
+    @classmethod
+    def fit(cls, rows, ridge=SUMMARY_MODEL_RIDGE, max_error=SUMMARY_MODEL_MAX_ERROR, coverage=SUMMARY_MODEL_COVERAGE,
+            calibration_fraction=SUMMARY_MODEL_CALIBRATION_FRACTION, seed=0):
+        """
+        Fits the model on result rows (see `training_rows`), holding out `calibration_fraction` of them
+        (a seeded random split) to calibrate the error bounds.
+        """
+        features = np.array([summary_features(row) for row in rows])
+        targets = np.array([float(row["summary_score"]) for row in rows])
+        order = np.random.default_rng(seed).permutation(len(rows))
+        n_calibration = max(1, int(round(len(rows) * calibration_fraction)))
+        calibration, training = order[:n_calibration], order[n_calibration:]
+
+        mean = features[training].mean(axis=0)
+        scale = features[training].std(axis=0)
+        scale[scale == 0] = 1.0
+        design = np.column_stack([np.ones(len(rows)), (features - mean) / scale])
+
+        weights = _ridge(design[training], targets[training], ridge)
+        residuals = np.abs(targets - design @ weights)
+        min_spread = MIN_SPREAD_FRACTION * max(float(residuals[training].mean()), 1e-6)
+        spread_weights = _ridge(design[training], np.log(residuals[training] + min_spread), ridge)
+
+        spread = np.maximum(np.exp(design[calibration] @ spread_weights), min_spread)
+        quantile = conformal_quantile(residuals[calibration] / spread, coverage)
+        low, high = features[training].min(axis=0), features[training].max(axis=0)
+        return cls(weights, mean, scale, spread_weights, min_spread, quantile, coverage, len(rows), low, high,
+                   max_error)
+
+    def predict(self, row):
+        """
+        Returns (predicted summary score, error bound at `coverage`), or None if the row has a missing score.
+        The bound is inf for a row with a feature outside the training range, where the calibration does not hold.
+        """
+        features = summary_features(row)
+        if features is None:
+            return None
+        x = np.concatenate([[1.0], (features - self.mean) / self.scale])
+        score = float(np.clip(x @ self.weights, 0, 100))
+        if np.any(features < self.low) or np.any(features > self.high):
+            return score, float("inf")
+        bound = self.quantile * max(float(np.exp(x @ self.spread_weights)), self.min_spread)
+        return score, bound
+
+    def score_row(self, row):
+        """
+        Scores the summary of one result row locally if the prediction is confident enough.
+
+        Returns:
+            tuple | None: (summary_score, summary_note), or None if the LLM summary chain should be used.
+        """
+        prediction = self.predict(row)
+        if prediction is None or prediction[1] > self.max_error:
+            self.fallbacks += 1
+            return None
+        self.local += 1
+        scores = {category: row[f"{category}_score"] for category in CATEGORIES}
+        strongest = max(scores, key=scores.get)
+        weakest = min(scores, key=scores.get)
+        note = (f"Estimated by the local summary model from the category scores (strongest: {strongest} "
+                f"{scores[strongest]}, weakest: {weakest} {scores[weakest]}; +/- {prediction[1]:.1f} at "
+                f"{self.coverage:.0%} coverage).")
+        return int(round(prediction[0])), note
+
+    def reset_stats(self):
+        self.local = 0
+        self.fallbacks = 0
+
+    def report(self):
+        """
+        Prints how many summaries were scored locally and how many fell back to the LLM chain since the last reset.
+        """
+        total = self.local + self.fallbacks
+        if total:
+            print(f"[INFO] Local summary model scored {self.local} of {total} summaries; "
+                  f"{self.fallbacks} ({self.fallbacks / total:.0%}) fell back to the LLM summary chain")
+
+    def save(self, path=SUMMARY_MODEL_PATH):
+        np.savez(path, weights=self.weights, mean=self.mean, scale=self.scale, spread_weights=self.spread_weights,
+                 min_spread=self.min_spread, quantile=self.quantile, coverage=self.coverage, n_rows=self.n_rows,
+                 low=self.low, high=self.high)
+
+    @classmethod
+    def load(cls, path=SUMMARY_MODEL_PATH, max_error=SUMMARY_MODEL_MAX_ERROR):
+        """
+        Loads a saved model, or returns None if the file predates the log-spread model and the training feature
+        range (it is then retrained).
+        """
+        data = np.load(path)
+        if "low" not in data.files:
+            return None
+        return cls(data["weights"], data["mean"], data["scale"], data["spread_weights"], float(data["min_spread"]),
+                   float(data["quantile"]), float(data["coverage"]), int(data["n_rows"]), data["low"], data["high"],
+                   max_error)
+
+
+def train_summary_model(paths=SUMMARY_MODEL_TRAINING_PATHS, path=SUMMARY_MODEL_PATH, min_rows=SUMMARY_MODEL_MIN_ROWS,
+                        ridge=SUMMARY_MODEL_RIDGE, max_error=SUMMARY_MODEL_MAX_ERROR):
+    """
+    Trains the local summary model from earlier ToT results and saves it to `path`.
+
+    Args:
+        paths (list[str]): Result files (.xlsx/.csv/.jsonl/.parquet) with the `ATS_Results.xlsx` columns.
+        path (str | None): File the model is saved to. None skips saving.
+        min_rows (int): Minimum number of usable rows; with fewer, no model is trained.
+
+    Returns:
+        SummaryModel | None: The trained model, or None if there were not enough rows.
+    """
+    rows = training_rows(paths)
+    if len(rows) < min_rows:
+        print(f"[WARN] Only {len(rows)} usable result rows (need {min_rows}); the local summary model was not trained")
+        return None
+    model = SummaryModel.fit(rows, ridge, max_error)
+    if path:
+        model.save(path)
+    print(f"[INFO] Trained the local summary model on {len(rows)} rows (conformal quantile {model.quantile:.2f} "
+          f"at {model.coverage:.0%} coverage)")
+    return model
+
+
+_model = {}
+
+
+def get_summary_model():
+    """
+    Returns the local summary model if `LOCAL_SUMMARY_MODEL` is on: loaded from `SUMMARY_MODEL_PATH`, or trained
+    from `SUMMARY_MODEL_TRAINING_PATHS` on first use (also when the saved model is of an older format). None (the LLM summary chain is used) if it is off or
+    there is not enough training data.
+    """
+    if "model" not in _model:
+        if not LOCAL_SUMMARY_MODEL:
+            return None
+        model = SummaryModel.load() if os.path.exists(SUMMARY_MODEL_PATH) else None
+        _model["model"] = model if model is not None else train_summary_model()
+    return _model["model"]
+
+
+def set_summary_model(model):
+    """
+    Replaces the model returned by `get_summary_model` (e.g. after retraining), whatever `LOCAL_SUMMARY_MODEL` says.
+    None disables local scoring.
+    """
+    _model["model"] = model
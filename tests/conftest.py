@@ -0,0 +1,71 @@
+"""
+Shared fixtures: every test runs offline on `FakeLLMBackend`, with in-memory response cache, result store and
+chain memo, inside its own temporary working directory (batch files, journals and metrics land there).
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import prompts
+import result_cache
+import section_memo
+from llm_backends import FakeLLMBackend
+from llm_cache import SQLiteResponseCache
+from metrics import collector as metrics
+from scheduler import RequestScheduler
+from main_config import JOB_DESCRIPTION, RESULT_STORE_PATH
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch, tmp_path):
+    """
+    Routes every LLM call to a fresh fake backend and keeps all caches and stores out of the working tree.
+
+    Returns:
+        FakeLLMBackend: The backend; `calls` counts the requests that reached it.
+    """
+    backend = FakeLLMBackend()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(prompts, "llm_backend", backend)
+    monkeypatch.setattr(prompts, "response_cache", SQLiteResponseCache(":memory:"))
+    monkeypatch.setattr(prompts, "scheduler", RequestScheduler(base_backoff=0.0))
+    monkeypatch.setattr(result_cache, "_stores", {RESULT_STORE_PATH: result_cache.ResultStore(":memory:")})
+    monkeypatch.setattr(section_memo, "_memo", {})
+    metrics.reset()
+    return backend
+
+
+@pytest.fixture
+def job_description():
+    return JOB_DESCRIPTION
+
+
+@pytest.fixture
+def resumes():
+    return [
+        {
+            "name": "Ada Park", "location": "Culver City, CA",
+            "summary": "Backend engineer building search ranking services.",
+            "education": "B.S. in Computer Science, UCLA",
+            "experience": "Software Engineer, Search Infra (2019-2024): built ranking and recommendation pipelines on Spark.",
+            "skills": "Python, Go, Java, Spark, Kafka, machine learning",
+        },
+        {
+            "name": "Ben Ortiz", "location": "Austin, TX",
+            "summary": "Data scientist focused on ads measurement. Fluent in English and Spanish.",
+            "education": "M.S. Statistics, UT Austin",
+            "experience": "Data Scientist (2020-2024): built ads attribution models and dashboards.",
+            "skills": "R, SQL, Python, Tableau",
+        },
+        {
+            "name": "Chen Li", "location": "Seattle, WA",
+            "summary": "Full-stack developer.",
+            "education": "B.A. Mathematics, University of Washington",
+            "experience": "Full-stack Developer (2018-2024): React front ends and Node.js services.",
+            "skills": "JavaScript, TypeScript, React, Docker",
+        },
+    ]
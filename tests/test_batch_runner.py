@@ -0,0 +1,83 @@
+import os
+
+import prompts
+from batch_runner import LocalBatchClient, run_batch_stage, run_tot_batch
+from metrics import collector as metrics
+from tot_engine import TOT_CATEGORIES, evaluate_resumes
+
+
+def test_local_batch_client_runs_the_whole_pipeline(resumes, job_description):
+    rows = run_tot_batch(resumes, job_description, batch_client=LocalBatchClient())
+
+    assert [row["id"] for row in rows] == [1, 2, 3]
+    for row in rows:
+        for step in TOT_CATEGORIES + ["summary"]:
+            assert 0 <= row[f"{step}_score"] <= 100
+            assert row[f"{step}_note"]
+
+
+def test_local_batch_client_labels_calls_with_their_stage(resumes, job_description):
+    run_tot_batch(resumes, job_description, batch_client=LocalBatchClient())
+
+    stages = {stage["stage"] for stage in metrics.summary()["stages"]}
+    assert "unlabeled" not in stages
+    assert {"E1", "E2", "E3", "S1", "S2", "S3"} <= stages
+
+
+def test_async_run_reuses_batch_answers_from_the_response_cache(offline, resumes, job_description):
+    run_tot_batch(resumes, job_description, batch_client=LocalBatchClient())
+    calls = offline.calls
+
+    rows = evaluate_resumes(resumes, job_description)
+
+    assert offline.calls == calls
+    assert all(row is not None for row in rows)
+
+
+def test_stages_are_split_into_files_under_the_request_limit(tmp_path):
+    stage_prompts = {f"{i}|skills": f"Prompt {i}" for i in range(5)}
+
+    outputs = run_batch_stage(LocalBatchClient(), "stage1", stage_prompts, work_dir=str(tmp_path), max_requests=2)
+
+    assert sorted(outputs) == sorted(stage_prompts)
+    assert sorted(name for name in os.listdir(tmp_path) if name.endswith("_requests.jsonl")) == [
+        "stage1_1_requests.jsonl", "stage1_2_requests.jsonl", "stage1_3_requests.jsonl"
+    ]
+
+
+def test_batch_answers_are_cached_under_the_async_stop_fields(monkeypatch):
+    monkeypatch.setattr(prompts, "STREAM_COMPLETIONS", True)
+    fields = ["skills_score", "skills_note"]
+
+    client = LocalBatchClient(complete=lambda body, stage: '{"skills_score": 70, "skills_note": "Solid overlap."}')
+    run_batch_stage(client, "stage3", {"0|skills": "Score it"}, model="gpt-4o", temperature=0.0,
+                    stop_fields={"0|skills": fields})
+
+    messages = [{"role": "user", "content": "Score it"}]
+    assert prompts.response_cache.get(prompts.completion_cache_key("gpt-4o", 0.0, messages, stop_fields=fields)) is not None
+    assert prompts.response_cache.get(prompts.completion_cache_key("gpt-4o", 0.0, messages)) is None
+
+
+def test_unanswered_batch_lines_fall_back_to_direct_calls(resumes, job_description):
+    failing = LocalBatchClient(complete=lambda body, stage: (_ for _ in ()).throw(RuntimeError("batch line failed")))
+
+    rows = run_tot_batch(resumes[:1], job_description, batch_client=failing)
+
+    assert rows[0]["summary_score"] is not None
+
+
+def test_a_failed_direct_fallback_only_drops_its_own_resume(monkeypatch, offline, resumes, job_description):
+    failing = LocalBatchClient(complete=lambda body, stage: (_ for _ in ()).throw(RuntimeError("batch line failed")))
+    generate = offline.generate
+
+    def generate_or_fail(prompt, *args, **kwargs):
+        if "ads attribution models" in prompt:
+            raise RuntimeError("direct call failed")
+        return generate(prompt, *args, **kwargs)
+
+    monkeypatch.setattr(offline, "generate", generate_or_fail)
+
+    rows = run_tot_batch(resumes, job_description, batch_client=failing)
+
+    assert rows[1] is None
+    assert [row["id"] for row in (rows[0], rows[2])] == [1, 3]
@@ -0,0 +1,21 @@
+from cascade import run_cascade_evaluation
+
+
+def test_cascade_promotes_only_the_contenders(offline, resumes, job_description):
+    results = run_cascade_evaluation(resumes, job_description, score_threshold=101, top_k=1, margin=0, save_path=None)
+
+    assert results["id"].tolist() == [1, 2, 3]
+    assert results["summary_score"].notna().all()
+    assert 1 <= (results["tier"] == "tot").sum() < len(resumes)
+    assert set(results["tier"]) <= {"tot", "oneshot"}
+
+
+def test_cascade_reruns_nothing_when_cached(offline, resumes, job_description):
+    first = run_cascade_evaluation(resumes, job_description, score_threshold=0, save_path=None)
+    calls = offline.calls
+
+    second = run_cascade_evaluation(resumes, job_description, score_threshold=0, save_path=None)
+
+    assert offline.calls == calls
+    assert (second["tier"] == "tot").all()
+    assert second["summary_score"].tolist() == first["summary_score"].tolist()
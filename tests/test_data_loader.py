@@ -0,0 +1,82 @@
+import pandas as pd
+import pytest
+
+import prompts
+import section_memo
+from data_loader import iter_resumes, load_or_generate_ats_results, run_or_load_oneshot_evaluation, stream_ats_results
+from llm_cache import NullResponseCache
+from result_cache import ResultStore, get_result_store, resume_hash
+
+
+def test_only_uncached_resumes_are_evaluated(offline, monkeypatch, resumes, job_description):
+    monkeypatch.setattr(prompts, "response_cache", NullResponseCache())
+    monkeypatch.setattr(section_memo, "SECTION_MEMO", False)
+    first = load_or_generate_ats_results(resumes[:2], job_description)
+    calls = offline.calls
+
+    results = load_or_generate_ats_results(resumes, job_description)
+    delta, calls = offline.calls - calls, offline.calls
+    load_or_generate_ats_results(resumes[2:], job_description, result_store=ResultStore(":memory:"))
+
+    assert delta == offline.calls - calls > 0
+    assert results["id"].tolist() == [1, 2, 3]
+    assert results["summary_score"].tolist()[:2] == first["summary_score"].tolist()
+
+
+def test_load_path_is_deprecated_and_ignored(tmp_path, resumes, job_description):
+    snapshot = str(tmp_path / "ATS_Results_Stored.xlsx")
+    pd.DataFrame([{"id": 1, "summary_score": -1, "summary_note": "Stale."}]).to_excel(snapshot, index=False)
+
+    with pytest.warns(DeprecationWarning):
+        results = load_or_generate_ats_results(resumes, job_description, load_path=snapshot, save_path=None,
+                                               stream_path=None)
+
+    assert len(results) == len(resumes)
+    assert (results["summary_score"] >= 0).all()
+
+
+def test_stream_reuses_results_of_the_load_path(offline, resumes, job_description):
+    loaded = load_or_generate_ats_results(resumes, job_description, save_path=None, stream_path=None)
+    calls = offline.calls
+
+    streamed = stream_ats_results(resumes, job_description)
+
+    assert offline.calls == calls
+    assert streamed["summary_score"].tolist() == loaded.sort_values("id")["summary_score"].tolist()
+    assert streamed["model_route"].tolist() == loaded.sort_values("id")["model_route"].tolist()
+
+
+@pytest.mark.parametrize("extension", [".xlsx", ".csv", ".jsonl", ".parquet"])
+def test_every_input_format_yields_the_same_resumes(tmp_path, resumes, extension):
+    if extension == ".parquet":
+        pytest.importorskip("pyarrow")
+    frame = pd.DataFrame(resumes)
+    frame.loc[2, "summary"] = None
+    path = str(tmp_path / f"resumes{extension}")
+    if extension == ".xlsx":
+        frame.to_excel(path, index=False)
+    elif extension == ".csv":
+        frame.to_csv(path, index=False)
+    elif extension == ".jsonl":
+        frame.to_json(path, orient="records", lines=True)
+    else:
+        frame.to_parquet(path, index=False)
+
+    frame.to_excel(tmp_path / "reference.xlsx", index=False)
+    reference = pd.read_excel(tmp_path / "reference.xlsx").to_dict("records")
+
+    streamed = list(iter_resumes(path))
+
+    assert [resume_hash(resume) for resume in streamed] == [resume_hash(resume) for resume in reference]
+
+
+def test_an_empty_result_store_is_not_swapped_for_the_default_one(resumes, job_description):
+    store = ResultStore(":memory:")
+
+    rows = load_or_generate_ats_results(resumes, job_description, result_store=store)
+    oneshot_rows = run_or_load_oneshot_evaluation(resumes, job_description, result_store=store)
+
+    # The result rows go to the given store; the default one only holds shared entries (the distillation)
+    keys = [key for (key,) in store._conn.execute("SELECT key FROM results")]
+    assert len(keys) == len(rows) + len(oneshot_rows)
+    assert get_result_store().get_many(keys) == {}
@@ -0,0 +1,49 @@
+import pytest
+
+import jd_constraints
+from jd_constraints import composite_weights, job_constraints, unconstrained_categories
+from main_config import UNCONSTRAINED_CATEGORY_SCORE
+from metrics import collector as metrics
+from tot_engine import evaluate_resumes
+
+REMOTE_JOB = "Fully remote role. Build data pipelines in Python and SQL. Fluent English required."
+
+
+def test_programming_languages_do_not_constrain_languages(job_description):
+    assert job_constraints(job_description)["languages"] is False
+    assert job_constraints(job_description)["location"] is True
+    assert unconstrained_categories(job_description) == ["languages"]
+
+
+@pytest.mark.parametrize("job_description, constrained", [
+    ("Bilingual support engineer, Python and Go.", {"languages": True, "location": True}),
+    (REMOTE_JOB, {"languages": True, "location": False}),
+    ("Remote-first team, hybrid in our Austin office twice a month.", {"languages": False, "location": True}),
+])
+def test_constraints_follow_the_job_description(job_description, constrained):
+    constraints = job_constraints(job_description)
+
+    assert {category: constraints[category] for category in constrained} == constrained
+
+
+def test_composite_weights_drop_unconstrained_categories(job_description):
+    weights = composite_weights(job_description)
+
+    assert "languages" not in weights
+    assert sum(weights.values()) == pytest.approx(1.0)
+    assert weights["experience"] / weights["skills"] == pytest.approx(0.3 / 0.2)
+
+
+def test_unconstrained_chains_are_skipped(resumes, job_description):
+    rows = evaluate_resumes(resumes, job_description)
+
+    assert {row["languages_score"] for row in rows} == {UNCONSTRAINED_CATEGORY_SCORE}
+    assert all("no languages requirement" in row["languages_note"] for row in rows)
+    assert not {"LA1", "LA2", "LA3"} & {stage["stage"] for stage in metrics.summary()["stages"]}
+
+
+def test_pruning_can_be_turned_off(monkeypatch, job_description):
+    monkeypatch.setattr(jd_constraints, "PRUNE_UNCONSTRAINED_CHAINS", False)
+
+    assert unconstrained_categories(job_description) == []
+    assert composite_weights(job_description) == pytest.approx(composite_weights())
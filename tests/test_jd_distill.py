@@ -0,0 +1,46 @@
+from jd_distill import JD_CATEGORIES, distill_job_description
+from result_cache import ResultStore, get_result_store
+from tot_engine import evaluate_resumes
+
+
+def test_the_job_description_is_distilled_once(offline, job_description):
+    first = distill_job_description(job_description)
+    second = distill_job_description(job_description)
+
+    assert offline.calls == 1
+    assert first == second
+    assert first["skills"] == "Skills requirements: C/C++, Python, Java or Golang; search, ranking or machine learning; Hadoop, Spark or Flink"
+    assert first["summary"].count("requirements:") == len(JD_CATEGORIES)
+
+
+def test_incomplete_distillations_are_used_but_not_stored(offline, monkeypatch, job_description):
+    monkeypatch.setattr(offline, "generate", lambda prompt: "experience: 2+ years of backend work\nskills: Python")
+
+    requirements = distill_job_description(job_description)
+    distill_job_description(job_description)
+
+    assert offline.calls == 2
+    assert requirements["skills"] == "Skills requirements: Python"
+    assert requirements["location"] == job_description
+    assert len(get_result_store()) == 0
+
+
+def test_distillation_uses_an_empty_result_store(job_description):
+    store = ResultStore(":memory:")
+
+    distill_job_description(job_description, result_store=store)
+
+    assert len(store) == 1
+    assert len(get_result_store()) == 0
+
+
+def test_chains_get_the_distilled_requirements_instead_of_the_job_description(offline, monkeypatch, resumes,
+                                                                             job_description):
+    generate, sent = offline.generate, []
+    monkeypatch.setattr(offline, "generate", lambda prompt: sent.append(prompt) or generate(prompt))
+
+    evaluate_resumes(resumes[:1], job_description, distill_jd=True)
+
+    assert job_description in sent[0]
+    assert not any(job_description in prompt for prompt in sent[1:])
+    assert any("Skills requirements: C/C++" in prompt for prompt in sent[1:])
@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+import data_loader
+import prompts
+from batch_runner import LocalBatchClient
+from data_loader import load_or_generate_ats_results
+from journal import RunJournal
+from llm_cache import NullResponseCache
+from main_config import JOURNAL_DIR
+from result_cache import ResultStore
+
+
+def test_replay_returns_the_last_entry_of_every_step(tmp_path):
+    journal = RunJournal("run", directory=str(tmp_path))
+    journal.record_chain("key-1", 1, "skills", 60, "First try.")
+    journal.record_chain("key-1", 1, "skills", 70, "Solid overlap.", {"skills_score_expected": 69.5})
+    journal.record_summary("key-1", 1, 75, "Strong candidate.")
+    journal.record_chain("key-2", 2, "education", 80, "Relevant degree.")
+
+    assert journal.replay() == {
+        "key-1": {"skills": (70, "Solid overlap.", {"skills_score_expected": 69.5}), "summary": (75, "Strong candidate.", {})},
+        "key-2": {"education": (80, "Relevant degree.", {})},
+    }
+    journal.close()
+
+
+def test_a_resumed_journal_skips_a_torn_last_line(tmp_path):
+    journal = RunJournal("run", directory=str(tmp_path))
+    journal.record_chain("key-1", 1, "location", 90, "Same city.")
+    journal.close()
+    with open(journal.path, "a", encoding="utf-8") as f:
+        f.write('{"type": "chain", "key": "key-1", "categ')
+
+    resumed = RunJournal("run", directory=str(tmp_path))
+    assert resumed.replay() == {"key-1": {"location": (90, "Same city.", {})}}
+    resumed.record_summary("key-1", 1, 65, "Good fit.")
+    assert resumed.replay()["key-1"]["summary"] == (65, "Good fit.", {})
+    resumed.close()
+
+
+def test_a_resumed_run_replays_journaled_steps_instead_of_calling_the_llm(offline, monkeypatch, resumes,
+                                                                          job_description):
+    monkeypatch.setattr(prompts, "response_cache", NullResponseCache())
+    monkeypatch.setattr(data_loader, "new_run_id", lambda: "run-1")
+    first = load_or_generate_ats_results(resumes, job_description, save_path=None, stream_path=None,
+                                         result_store=ResultStore(":memory:"))
+    calls = offline.calls
+
+    resumed = load_or_generate_ats_results(resumes, job_description, save_path=None, stream_path=None,
+                                           result_store=ResultStore(":memory:"), resume_run="run-1")
+
+    assert offline.calls == calls
+    assert resumed["summary_score"].tolist() == first["summary_score"].tolist()
+
+
+def test_batch_runs_open_no_journal_and_cannot_be_resumed(resumes, job_description):
+    load_or_generate_ats_results(resumes, job_description, save_path=None, stream_path=None, execution_mode="batch",
+                                 batch_client=LocalBatchClient(), result_store=ResultStore(":memory:"))
+    assert not os.path.exists(JOURNAL_DIR) or not os.listdir(JOURNAL_DIR)
+
+    with pytest.raises(ValueError):
+        load_or_generate_ats_results(resumes, job_description, save_path=None, stream_path=None,
+                                     execution_mode="batch", resume_run="run-1")
@@ -0,0 +1,62 @@
+import llm_cache
+import prompts
+from llm_cache import SQLiteResponseCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache.time, "time", clock)
+    cache = SQLiteResponseCache(":memory:", ttl_seconds=60)
+    cache.set("key", "answer")
+
+    clock.now += 59
+    assert cache.get("key") == "answer"
+    clock.now += 2
+    assert cache.get("key") is None
+
+    cache.set("key", "fresh answer")
+    assert cache.get("key") == "fresh answer"
+
+
+def test_least_recently_used_entries_are_evicted_first(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache.time, "time", clock)
+    cache = SQLiteResponseCache(":memory:", max_bytes=35)
+    for key in ("a", "b", "c"):
+        clock.now += 1
+        cache.set(key, "x" * 10)
+
+    clock.now += 1
+    assert cache.get("a") == "x" * 10
+    clock.now += 1
+    cache.set("d", "x" * 10)
+
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in ("a", "c", "d")] == ["x" * 10] * 3
+    assert cache.stats()["total_bytes"] == 30
+
+
+def test_the_running_size_total_matches_the_stored_entries():
+    cache = SQLiteResponseCache(":memory:")
+    cache.set("a", "x" * 10)
+    cache.set("a", "x" * 4)
+    cache.set("b", "x" * 6)
+
+    assert cache.stats()["total_bytes"] == 10
+
+
+def test_identical_requests_are_answered_from_the_cache(offline):
+    first = prompts.call_openai("Hello")
+
+    assert prompts.call_openai("Hello") == first
+    assert prompts.call_openai("Hello", model="gpt-4o") == first
+    assert offline.calls == 2
+    assert prompts.response_cache.stats()["hits"] == 1
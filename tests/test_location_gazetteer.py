@@ -0,0 +1,62 @@
+import pytest
+
+from location_gazetteer import job_locations, normalize_location, score_location
+from main_config import LOCATION_MISSING_SCORE
+from metrics import collector as metrics
+from tot_engine import evaluate_resumes
+
+
+@pytest.mark.parametrize("location, score", [
+    ("Culver City, CA", 95),
+    ("Greater Los Angeles Area", 95),
+    ("Irvine, California 92618", 80),
+    ("Santa Barbara, CA", 55),
+    ("San Francisco, CA", 35),
+    ("Austin, TX", 20),
+])
+def test_distance_picks_the_score_band(job_description, location, score):
+    assert score_location(location, job_description)[0] == score
+
+
+def test_the_note_names_both_places_and_the_distance(job_description):
+    _, note = score_location("Irvine, CA", job_description)
+
+    assert note.startswith("The candidate is based in Irvine, CA, about 40 miles from the job in Culver City, CA")
+
+
+def test_unknown_cities_far_beyond_the_last_band_are_scored_by_state(job_description):
+    score, note = score_location("Smallville, NY", job_description)
+
+    assert score == 20
+    assert "more than 500 miles" in note
+
+
+def test_unknown_cities_are_measured_against_the_nearest_office():
+    _, note = score_location("Smallville, FL", "Work in our office in Seattle, WA or Boston, MA.")
+
+    assert "more than 500 miles from the job in Boston, MA" in note
+
+
+@pytest.mark.parametrize("location", ["Remote", "Open to relocation", "Springfield, Nowhere", "Mars"])
+def test_unsettled_locations_go_to_the_llm(job_description, location):
+    assert score_location(location, job_description) is None
+
+
+def test_missing_locations_get_the_missing_score(job_description):
+    assert score_location(None, job_description)[0] == LOCATION_MISSING_SCORE
+
+
+def test_jobs_without_an_office_location_go_to_the_llm():
+    assert job_locations("We are a remote-first company.") == ()
+    assert score_location("Austin, TX", "We are a remote-first company.") is None
+
+
+def test_normalize_location_strips_zip_codes_and_spells_out_abbreviations():
+    assert normalize_location("St. Louis, Missouri 63101") == normalize_location("Saint Louis, MO")
+
+
+def test_settled_locations_skip_the_location_chain(resumes, job_description):
+    rows = evaluate_resumes(resumes, job_description)
+
+    assert [row["location_score"] for row in rows] == [95, 20, 20]
+    assert not {"L1", "L2", "L3"} & {stage["stage"] for stage in metrics.summary()["stages"]}
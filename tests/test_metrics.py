@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from metrics import MetricsCollector, call_cost
+from metrics import collector as metrics
+from tot_engine import evaluate_resumes
+
+
+def test_call_cost_uses_the_per_million_token_prices():
+    assert call_cost("gpt-4o", 1_000_000, 100_000) == pytest.approx(3.50)
+    assert call_cost("unknown-model", 1000, 1000) == 0.0
+
+
+def test_summary_aggregates_calls_per_stage_and_model():
+    collector = MetricsCollector()
+    collector.record("E1", "gpt-4o", prompt_tokens=100, completion_tokens=10, latency=0.2)
+    collector.record("E1", "gpt-4o", prompt_tokens=100, completion_tokens=10, latency=0.4, retries=2)
+    collector.record("E1", "gpt-4o", cache_hit=True)
+    collector.record(None, "gpt-4o-mini", prompt_tokens=50, completion_tokens=5, latency=1.0)
+
+    summary = collector.summary()
+
+    e1, unlabeled = summary["stages"]
+    assert (e1["stage"], e1["calls"], e1["cache_hits"], e1["retries"]) == ("E1", 3, 1, 2)
+    assert (e1["prompt_tokens"], e1["completion_tokens"]) == (200, 20)
+    assert e1["latency_seconds_max"] == 0.4
+    assert unlabeled["stage"] == "unlabeled"
+    assert summary["totals"]["calls"] == 4
+    assert summary["totals"]["prompt_tokens"] == 250
+
+
+def test_every_tot_call_is_recorded_with_its_stage(resumes, job_description):
+    evaluate_resumes(resumes, job_description)
+
+    stages = {stage["stage"]: stage for stage in metrics.summary()["stages"]}
+    assert "unlabeled" not in stages
+    assert {"E1", "E2", "E3", "S1", "S2", "S3", "JD"} <= set(stages)
+    assert all(stage["prompt_tokens"] > 0 for stage in stages.values())
+
+
+def test_export_writes_json_csv_and_prometheus_reports(tmp_path):
+    collector = MetricsCollector()
+    collector.record("S3", "gpt-4o", prompt_tokens=10, completion_tokens=5, latency=0.3)
+
+    collector.export(str(tmp_path / "reports" / "tot"))
+
+    with open(tmp_path / "reports" / "tot_metrics.json", encoding="utf-8") as f:
+        assert json.load(f)["totals"]["calls"] == 1
+    assert len((tmp_path / "reports" / "tot_calls.csv").read_text().splitlines()) == 2
+    prom = (tmp_path / "reports" / "tot_metrics.prom").read_text()
+    assert 'tot_llm_calls_total{stage="S3",model="gpt-4o"} 1' in prom
@@ -0,0 +1,69 @@
+import asyncio
+import json
+
+import pytest
+
+import multi_run
+from multi_run import VARIANCE_COLUMNS, asample_score, run_tot_multiple_times
+
+
+@pytest.fixture
+def sampler(monkeypatch):
+    """
+    Replaces the n-sampling call with one that serves the queued scores; records the `n` of every request.
+    """
+    scores, requests = [], []
+
+    async def samples(prompt, n, **options):
+        requests.append(n)
+        return [json.dumps({"skills_score": scores.pop(0), "skills_note": "Sampled."}) if scores else "No score"
+                for _ in range(n)]
+
+    monkeypatch.setattr(multi_run, "acall_openai_samples", samples)
+    return scores, requests
+
+
+def test_consistent_scores_stop_after_the_first_request(sampler):
+    scores, requests = sampler
+    scores.extend([70, 70, 70])
+
+    mean, variance, note, count = asyncio.run(asample_score("Score it", "skills", "SK3", initial_samples=2,
+                                                            sample_step=2, max_samples=10, se_threshold=1.0))
+
+    assert (mean, variance, note, count) == (70, 0.0, "Sampled.", 2)
+    assert requests == [2]
+
+
+def test_noisy_scores_draw_more_samples_up_to_the_limit(sampler):
+    scores, requests = sampler
+    scores.extend([20, 90] * 5)
+
+    mean, variance, _, count = asyncio.run(asample_score("Score it", "skills", "SK3", initial_samples=2,
+                                                         sample_step=3, max_samples=7, se_threshold=1.0))
+
+    assert requests == [2, 3, 2]
+    assert count == 7
+    assert mean == pytest.approx(sum([20, 90, 20, 90, 20, 90, 20]) / 7)
+    assert variance > 0
+
+
+def test_unparseable_samples_are_dropped(sampler):
+    scores, requests = sampler
+    scores.extend([60, 62])
+
+    mean, _, _, count = asyncio.run(asample_score("Score it", "skills", "SK3", initial_samples=3,
+                                                  sample_step=1, max_samples=3, se_threshold=5.0))
+
+    assert (mean, count) == (61, 2)
+
+
+def test_multi_run_results_carry_variances_and_are_cached(offline, resumes, job_description):
+    first = run_tot_multiple_times(resumes, job_description, max_samples=4)
+    calls = offline.calls
+
+    second = run_tot_multiple_times(resumes, job_description, max_samples=4)
+
+    assert offline.calls == calls
+    assert first["id"].tolist() == [1, 2, 3]
+    assert (first[VARIANCE_COLUMNS] >= 0).all().all()
+    assert second["summary_score"].tolist() == first["summary_score"].tolist()
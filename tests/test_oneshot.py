@@ -0,0 +1,35 @@
+import pytest
+
+from data_loader import run_or_load_oneshot_evaluation
+
+
+@pytest.fixture
+def failing_resume(offline, monkeypatch):
+    """
+    Makes every request that mentions Ben Ortiz fail, packed prompts included.
+    """
+    complete, stream = offline.complete, offline.stream
+
+    def check(messages):
+        if any("Ben Ortiz" in message["content"] for message in messages):
+            raise ValueError("simulated failure")
+
+    async def complete_unless_ben(model, messages, *args, **kwargs):
+        check(messages)
+        return await complete(model, messages, *args, **kwargs)
+
+    async def stream_unless_ben(model, messages, *args, **kwargs):
+        check(messages)
+        async for delta in stream(model, messages, *args, **kwargs):
+            yield delta
+
+    monkeypatch.setattr(offline, "complete", complete_unless_ben)
+    monkeypatch.setattr(offline, "stream", stream_unless_ben)
+
+
+def test_packed_run_isolates_a_failing_resume(failing_resume, resumes, job_description):
+    results = run_or_load_oneshot_evaluation(resumes, job_description, stream_path=None, export_excel=False, packed=True)
+
+    assert results["id"].tolist() == [1, 2, 3]
+    assert results["summary_score"].notna().tolist() == [True, False, True]
+    assert results["model_route"].isna().tolist() == [False, True, False]
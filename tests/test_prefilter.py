@@ -0,0 +1,48 @@
+import numpy as np
+
+from prefilter import BM25Index, prefilter_query, prefilter_resumes, tokenize
+
+QUERY = "Python search ranking machine learning backend"
+
+
+def test_tokenize_keeps_language_names_and_drops_stopwords():
+    assert tokenize("Built C++ and Node.js services for the C# team.") == ["built", "c++", "node.js", "services", "c#", "team"]
+
+
+def test_best_lexical_match_ranks_first(resumes):
+    index = BM25Index()
+    index.add(resumes)
+
+    scores = index.score(QUERY, resumes)
+
+    assert int(np.argmax(scores)) == 0
+    assert scores[2] == 0
+
+
+def test_index_grows_incrementally_and_survives_a_round_trip(tmp_path, resumes):
+    index = BM25Index()
+    assert index.add(resumes[:2]) == 2
+    assert index.add(resumes) == 1
+    assert index.add(resumes) == 0
+
+    index.save(str(tmp_path / "index.npz"))
+    loaded = BM25Index.load(str(tmp_path / "index.npz"))
+
+    assert loaded.doc_ids == index.doc_ids
+    assert np.allclose(loaded.score(QUERY, resumes), index.score(QUERY, resumes))
+
+
+def test_cutoff_always_keeps_the_best_resumes(resumes):
+    scores, keep = prefilter_resumes(resumes, QUERY, index=BM25Index(), min_keep=1, relative_cutoff=0.9,
+                                     index_path=None)
+
+    assert keep[int(np.argmax(scores))]
+    assert not keep[2]
+    assert prefilter_resumes(resumes, QUERY, index=BM25Index(), min_keep=3, index_path=None)[1].all()
+
+
+def test_the_query_is_the_distilled_requirements(job_description):
+    query = prefilter_query(job_description)
+
+    assert "Skills requirements: C/C++" in query
+    assert "TikTok" not in query
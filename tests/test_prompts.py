@@ -0,0 +1,141 @@
+import asyncio
+import math
+
+import pytest
+
+import prompts
+from llm_backends import FakeLLMBackend, OpenAIBackend
+from prompts import (
+    E3_prompt, ScoreParseError, arepair_score_output, backend_key, parse_score_output, route_key, score_fields_complete,
+    score_distributions, score_statistics
+)
+from tot_engine import evaluate_resumes
+
+
+def token(text, *alternatives):
+    top = [[alternative, math.log(p)] for alternative, p in alternatives] if alternatives else [[text, 0.0]]
+    return {"token": text, "logprob": top[0][1], "top": top}
+
+
+@pytest.mark.parametrize("output, expected", [
+    ('{"skills_score": 72, "skills_note": "Solid overlap."}', (72, "Solid overlap.")),
+    ('Here you go:\n```json\n{"skills_score": "72.4", "skills_note": "Solid overlap."}\n```', (72, "Solid overlap.")),
+    ('{"skills_score": 72, "skills_note": "Solid overlap.",', (72, "Solid overlap.")),
+    ("**skills_score:** 65\nskills_note: \"Some gaps.\"", (65, "Some gaps.")),
+])
+def test_parse_score_output_tolerates_common_formats(output, expected):
+    assert parse_score_output(output, "skills") == expected
+
+
+def test_parse_score_output_prefers_the_requested_category():
+    output = '{"experience_score": 40, "experience_note": "Junior.", "skills_score": 80, "skills_note": "Strong."}'
+    assert parse_score_output(output, "skills") == (80, "Strong.")
+    assert parse_score_output(output) == (40, "Junior.")
+
+
+def test_parse_score_output_raises_without_a_score():
+    with pytest.raises(ScoreParseError):
+        parse_score_output("The candidate looks promising.", "skills")
+
+
+@pytest.mark.parametrize("partial, complete", [
+    ('{"skills_score": 72,', False),
+    ('{"skills_score": 72, "skills_note": "Solid', False),
+    ('{"skills_score": 72, "skills_note": "Solid \\"core\\" overlap."', True),
+    ("skills_score: 72\nskills_note: Solid overlap.", False),
+    ("skills_score: 72\nskills_note: Solid overlap.\n", True),
+])
+def test_score_fields_are_complete_once_their_value_ended(partial, complete):
+    assert score_fields_complete(partial, ["skills_score", "skills_note"]) == complete
+
+
+def test_a_score_is_complete_once_a_character_follows_its_number():
+    assert not score_fields_complete('{"skills_score": 7', ["skills_score"])
+    assert score_fields_complete('{"skills_score": 72,', ["skills_score"])
+
+
+def test_scoring_streams_stop_once_the_needed_fields_are_parsed(offline, monkeypatch):
+    prompt = E3_prompt("Five years of backend work, matching the role.")
+    full = offline.generate(prompt)
+
+    output = prompts.call_openai(prompt, stage="E3", stop_fields=["experience_score"])
+
+    assert full.startswith(output) and len(output) < len(full)
+    assert parse_score_output(output, "experience")[0] == parse_score_output(full, "experience")[0]
+    monkeypatch.setattr(prompts, "STREAM_COMPLETIONS", False)
+    assert prompts.call_openai(prompt, stage="E3", stop_fields=["experience_score"]) == full
+
+
+def test_repair_reasks_only_the_scoring_stage(offline):
+    prompt = E3_prompt("Five years of backend work, matching the role.")
+
+    score, note = asyncio.run(arepair_score_output(prompt, "Looks good!", "experience", "E3"))
+
+    assert 0 <= score <= 100 and note
+    assert offline.calls == 1
+
+
+def test_score_statistics_use_the_score_token_alternatives():
+    tokens = [token('{"'), token("skills"), token("_score"), token('":'), token(" "),
+              token("80", ("80", 0.5), ("70", 0.25), ("90", 0.125), ("high", 0.125)),
+              token(', "skills_note": "Strong."}')]
+
+    statistics = score_statistics(tokens)
+
+    # "high" is not a score; the rest is renormalized to 4/7, 2/7, 1/7
+    assert statistics["skills_score_expected"] == pytest.approx(round((80 * 4 + 70 * 2 + 90) / 7, 2))
+    assert statistics["skills_score_entropy"] == pytest.approx(
+        round(-sum(p * math.log2(p) for p in (4 / 7, 2 / 7, 1 / 7)), 4)
+    )
+
+
+def test_score_statistics_ignore_truncated_prefix_alternatives():
+    tokens = [token('{"skills_score": '),
+              token("72", ("72", 0.5), ("7", 0.2), ("75", 0.25), ("8", 0.05)),
+              token(', "skills_note": "Solid."}')]
+
+    distribution = score_distributions(tokens)["skills_score"]
+
+    # "7" is the start of 72 or 75; "8" has no longer alternative, so it may be a score of 8
+    assert distribution == pytest.approx({72: 0.5 / 0.8, 75: 0.25 / 0.8, 8: 0.05 / 0.8})
+
+
+def test_scores_split_over_several_tokens_have_no_distribution():
+    tokens = [token('{"skills_score": '), token("1", ("1", 0.9), ("9", 0.1)), token("00", ("00", 1.0)),
+              token(', "skills_note": "Perfect."}')]
+
+    assert score_distributions(tokens) == {}
+
+
+def test_logprob_scoring_adds_expected_scores_to_the_rows(monkeypatch, resumes, job_description):
+    monkeypatch.setattr(prompts, "LOGPROB_SCORING", True)
+
+    row = evaluate_resumes(resumes[:1], job_description)[0]
+
+    for step in ["experience", "skills", "summary"]:
+        assert 0 <= row[f"{step}_score_expected"] <= 100
+        assert row[f"{step}_score_entropy"] >= 0
+
+
+def test_fake_backend_answers_the_fields_the_output_format_asks_for(offline):
+    answer = offline.generate(E3_prompt("Five years of backend work."))
+
+    assert answer == offline.generate(E3_prompt("Five years of backend work."))
+    assert parse_score_output(answer, "experience")[0] in range(20, 96)
+
+
+def test_fake_backend_answers_are_cached_apart_from_real_ones(offline, monkeypatch):
+    asyncio.run(prompts.acall_openai("Hello"))
+    assert backend_key("gpt-4o") == "gpt-4o@fake"
+    fake_route = route_key(["E1"])
+
+    real = FakeLLMBackend()
+    real.cache_namespace = None
+    monkeypatch.setattr(prompts, "llm_backend", real)
+    asyncio.run(prompts.acall_openai("Hello"))
+
+    assert offline.calls == 1 and real.calls == 1
+    assert backend_key("gpt-4o") == "gpt-4o"
+    monkeypatch.setattr(prompts, "llm_backend", OpenAIBackend())
+    assert backend_key("gpt-4o") == "gpt-4o"
+    assert fake_route == route_key(["E1"]) + "@fake"
@@ -0,0 +1,53 @@
+import math
+
+import pytest
+
+from data_loader import load_or_generate_ats_results
+from result_sink import ResultSink, export_excel, read_results
+
+COLUMNS = ["id", "name", "summary_score"]
+
+
+@pytest.mark.parametrize("extension", [".jsonl", ".parquet"])
+def test_rows_round_trip_through_the_sink(tmp_path, extension):
+    if extension == ".parquet":
+        pytest.importorskip("pyarrow")
+    path = str(tmp_path / f"results{extension}")
+
+    with ResultSink(path, COLUMNS, flush_rows=2) as sink:
+        sink.write_many([
+            {"id": 3, "name": "Chen Li", "summary_score": math.nan},
+            {"id": 1, "name": "Ada Park", "summary_score": 81.0, "extra": "dropped"},
+            {"id": 2, "name": "Ben Ortiz"},
+        ])
+
+    frame = read_results(path, COLUMNS)
+    assert frame["id"].tolist() == [1, 2, 3]
+    assert frame["name"].tolist() == ["Ada Park", "Ben Ortiz", "Chen Li"]
+    assert frame["summary_score"].iloc[0] == 81.0
+    assert frame["summary_score"].iloc[1:].isna().all()
+
+
+def test_rows_are_written_in_batches(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    sink = ResultSink(path, COLUMNS, flush_rows=2, flush_seconds=60)
+
+    sink.write({"id": 1})
+    assert sink.rows_written == 0
+    sink.write({"id": 2})
+    assert sink.rows_written == 2
+    sink.write({"id": 3})
+    sink.close()
+
+    assert len(read_results(path)) == 3
+
+
+def test_a_run_streams_its_rows_to_the_sink(tmp_path, resumes, job_description):
+    path = str(tmp_path / "ats.jsonl")
+
+    results = load_or_generate_ats_results(resumes, job_description, save_path=None, stream_path=path)
+
+    streamed = read_results(path)
+    assert streamed["id"].tolist() == [1, 2, 3]
+    assert streamed["summary_score"].tolist() == results.sort_values("id")["summary_score"].tolist()
+    assert export_excel(path, str(tmp_path / "ats.xlsx"))["id"].tolist() == [1, 2, 3]
@@ -0,0 +1,43 @@
+import pytest
+
+import prompts
+from data_loader import load_or_generate_ats_results
+from main_config import TOT_MODEL
+from metrics import collector as metrics
+from prompts import Route, backend_key, route_key, stage_route, use_routing_profile
+from tot_engine import evaluate_resumes
+
+
+def test_stages_resolve_to_their_most_specific_route():
+    assert stage_route("SK1", "balanced") == Route("gpt-4o-mini", 0.0, 400)
+    assert stage_route("SK1_repair", "balanced") == Route("gpt-4o-mini", 0.0, 400)
+    assert stage_route("S3", "balanced").model == "gpt-4o"
+    assert stage_route("E2", "balanced") == Route("gpt-3.5-turbo", prompts.DEFAULT_TEMPERATURE, 300)
+    assert stage_route("E3", "default") == Route(TOT_MODEL, prompts.DEFAULT_TEMPERATURE, None)
+
+
+def test_unknown_profiles_are_rejected():
+    with pytest.raises(ValueError):
+        prompts.set_routing_profile("cheapest")
+
+
+def test_calls_go_to_the_routed_models(resumes, job_description):
+    with use_routing_profile("fast"):
+        evaluate_resumes(resumes[:1], job_description)
+
+    assert prompts.get_routing_profile() == "default"
+    assert {stage["model"] for stage in metrics.summary()["stages"]} == {"gpt-4o-mini"}
+
+
+def test_results_are_cached_per_route(offline, resumes, job_description):
+    stages = ["E3", "L3", "S3"]
+    assert route_key(stages) == backend_key(TOT_MODEL)
+    assert route_key(stages, "fast") != route_key(stages)
+
+    load_or_generate_ats_results(resumes, job_description, save_path=None, stream_path=None)
+    calls = offline.calls
+    with use_routing_profile("fast"):
+        results = load_or_generate_ats_results(resumes, job_description, save_path=None, stream_path=None)
+
+    assert offline.calls > calls
+    assert results["model_route"].str.startswith("fast").all()
@@ -0,0 +1,99 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import prompts
+import scheduler
+from scheduler import RequestScheduler, TokenBucket, retry_after_seconds
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self, headers=None):
+        super().__init__("rate limited")
+        self.response = SimpleNamespace(headers=headers or {})
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """
+    Records the scheduler's sleeps instead of waiting.
+    """
+    recorded = []
+
+    async def sleep(seconds):
+        recorded.append(seconds)
+
+    monkeypatch.setattr(scheduler.asyncio, "sleep", sleep)
+    return recorded
+
+
+def failing(errors, result="ok"):
+    errors = list(errors)
+
+    async def request():
+        if errors:
+            raise errors.pop(0)
+        return result
+    return request
+
+
+def test_retry_after_headers_are_read_in_seconds():
+    assert retry_after_seconds(RateLimited({"retry-after-ms": "250"})) == 0.25
+    assert retry_after_seconds(RateLimited({"retry-after": "3"})) == 3.0
+    assert retry_after_seconds(RateLimited({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0.0
+    assert retry_after_seconds(RateLimited()) is None
+
+
+def test_retries_honour_retry_after(sleeps):
+    gate = RequestScheduler(base_backoff=1.0)
+
+    errors = [RateLimited({"retry-after": "7"}), RateLimited({"retry-after-ms": "500"})]
+
+    result, retries = asyncio.run(gate.run(failing(errors)))
+
+    assert (result, retries) == ("ok", 2)
+    assert sleeps == [7.0, 0.5]
+
+
+def test_backoff_grows_exponentially_with_jitter(sleeps):
+    gate = RequestScheduler(base_backoff=1.0, max_backoff=4.0)
+
+    asyncio.run(gate.run(failing([RateLimited()] * 4)))
+
+    steps = [1.0, 2.0, 4.0, 4.0]
+    assert all(step / 2 <= slept <= step for step, slept in zip(steps, sleeps))
+
+
+def test_errors_are_raised_when_not_retryable_or_out_of_retries(sleeps):
+    gate = RequestScheduler(max_retries=2, base_backoff=0.0)
+
+    with pytest.raises(ValueError):
+        asyncio.run(gate.run(failing([ValueError("bad request")])))
+    with pytest.raises(RateLimited):
+        asyncio.run(gate.run(failing([RateLimited()] * 3)))
+    assert len(sleeps) == 2
+
+
+def test_token_bucket_makes_callers_wait_once_the_minute_is_spent():
+    bucket = TokenBucket(60)
+
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0, abs=0.05)
+    assert bucket.reserve(1) == pytest.approx(2.0, abs=0.05)
+
+
+def test_llm_calls_are_retried_through_the_shared_scheduler(offline, monkeypatch):
+    complete, errors = offline.complete, [RateLimited()]
+
+    async def flaky(*args, **kwargs):
+        if errors:
+            raise errors.pop()
+        return await complete(*args, **kwargs)
+
+    monkeypatch.setattr(offline, "complete", flaky)
+
+    assert prompts.call_openai("Hello") == offline.generate("Hello")
+    assert offline.calls == 1 and not errors
@@ -0,0 +1,67 @@
+import pytest
+
+import tot_engine
+from batch_runner import LocalBatchClient, run_tot_batch
+from metrics import collector as metrics
+from section_memo import ChainMemo, canonical_education, get_chain_memo
+from result_cache import ResultStore
+from tot_engine import evaluate_resumes
+
+LANGUAGE_JOB = "Backend engineer. Fluent English and Spanish required."
+
+
+def stage_calls(stage):
+    return sum(entry["calls"] for entry in metrics.summary()["stages"] if entry["stage"] == stage)
+
+
+def test_equivalent_education_sections_agree():
+    assert canonical_education("B.S. in Computer Science – UCLA") == canonical_education("BS Computer Science, UCLA")
+    assert canonical_education("MS Math\nBS Physics") == canonical_education("BS Physics; MS Math")
+
+
+def test_education_keys_keep_degrees_paired_with_their_majors():
+    assert canonical_education("BS, Computer Science; MS, Math") != canonical_education("BS, Math; MS, Computer Science")
+
+
+def test_languages_are_keyed_by_the_canonical_step1_answer():
+    memo = ChainMemo(ResultStore(":memory:"))
+    resume = {"summary": "Speaks English.", "education": "", "experience": "", "skills": ""}
+
+    assert memo.key("languages", resume, LANGUAGE_JOB) is None
+    assert memo.extracts_first("languages") and not memo.extracts_first("languages", sessions=True)
+    assert memo.extract_key("languages", "English, Spanish", LANGUAGE_JOB) == memo.extract_key("languages", "Spanish; english", LANGUAGE_JOB)
+    assert memo.extract_key("languages", "English", LANGUAGE_JOB) != memo.extract_key("languages", "English, Spanish", LANGUAGE_JOB)
+
+
+@pytest.fixture
+def bilingual_step1(monkeypatch):
+    """
+    Every resume's LA1 answer lists the same languages, in varying form.
+    """
+    answers = iter(["English, Spanish", "Spanish; English", "english, spanish"])
+
+    async def extract(category, resume, job_description):
+        return next(answers) if category == "languages" else await original(category, resume, job_description)
+
+    original = tot_engine.arun_chain_extract
+    monkeypatch.setattr(tot_engine, "arun_chain_extract", extract)
+
+
+def test_async_engine_shares_languages_steps_between_resumes(bilingual_step1, resumes):
+    rows = evaluate_resumes(resumes, LANGUAGE_JOB, distill_jd=False)
+
+    assert stage_calls("LA2") == 1
+    assert get_chain_memo().hits == 2
+    assert len({(row["languages_score"], row["languages_note"]) for row in rows}) == 1
+
+
+def test_batch_runner_shares_languages_steps_between_resumes(resumes):
+    client = LocalBatchClient()
+    answers = iter(["English, Spanish", "Spanish; English", "english, spanish"])
+    complete = client.complete
+    client.complete = lambda body, stage: next(answers) if stage == "LA1" else complete(body, stage)
+
+    rows = run_tot_batch(resumes, LANGUAGE_JOB, batch_client=client, distill_jd=False)
+
+    assert get_chain_memo().hits == 2
+    assert len({(row["languages_score"], row["languages_note"]) for row in rows}) == 1
@@ -0,0 +1,39 @@
+import pytest
+
+from skills_matcher import compile_job_skills, normalize_tokens
+
+
+@pytest.mark.parametrize("text, tokens", [
+    ("Python, Go, Java", ["python", "Go", "java"]),
+    ("C/C++", ["C", "c++"]),
+    ("proficient in C++, Python, Java, or Go.", ["proficient", "in", "c++", "python", "java", "or", "Go"]),
+    ("Led R&D team, C-level reporting", ["led", "r&d", "team", "c-level", "reporting"]),
+    ("Let's Go build it", ["let", "s", "go", "build", "it"]),
+    ("full-stack, back-end", ["full", "stack", "back", "end"]),
+])
+def test_normalize_tokens(text, tokens):
+    assert normalize_tokens(text) == tokens
+
+
+def test_compounds_and_prose_do_not_match_single_letter_skills(job_description):
+    matched, _ = compile_job_skills(job_description).match("Led R&D team, C-level reporting, Go-to-market strategy")
+    assert not {"C", "Go", "R"} & set(matched)
+
+
+def test_listed_single_letter_skills_still_match(job_description):
+    matched, missing = compile_job_skills(job_description).match("Python, Go, Java; C/C++")
+    assert {"C", "C++", "Go", "Java", "Python"} <= set(matched)
+    assert "Go" not in missing
+
+
+def test_phrase_fallback_ignores_job_description_boilerplate(job_description):
+    resume_skills = "Team, Users, TikTok, Hybrid work schedule, Data Security, Trust & Safety, Working knowledge, Perl"
+    matched, _ = compile_job_skills(job_description).match(resume_skills)
+    assert matched == []
+
+
+def test_phrase_fallback_matches_skills_requirements(job_description):
+    matched, _ = compile_job_skills(job_description).match("Computer Engineering, Consumer-facing applications")
+    assert matched == ["Computer Engineering", "Consumer-facing applications"]
+    matched, _ = compile_job_skills("Skills requirements: Perl, Tcl").match("Perl, Fortran")
+    assert matched == ["Perl"]
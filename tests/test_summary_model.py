@@ -0,0 +1,68 @@
+import numpy as np
+
+from summary_model import CATEGORIES, SummaryModel, conformal_quantile
+
+
+def synthetic_rows(count, seed):
+    """
+    Result rows whose summary score is the mean category score, with noise that grows as the
+    experience score drops: strong profiles are easy to predict, weak ones are not.
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    for _ in range(count):
+        scores = rng.integers(20, 100, size=len(CATEGORIES))
+        noise = rng.normal(0, 0.5 + (100 - scores[0]) / 8)
+        row = {f"{category}_score": int(score) for category, score in zip(CATEGORIES, scores)}
+        row.update({f"{category}_note": "" for category in CATEGORIES})
+        row["summary_score"] = float(scores.mean() + noise)
+        rows.append(row)
+    return rows
+
+
+def test_conformal_quantile_uses_the_finite_sample_rank():
+    assert conformal_quantile(range(1, 20), 0.9) == 18
+    assert conformal_quantile([1, 2, 3], 0.9) == float("inf")
+
+
+def test_error_bounds_cover_new_rows_and_vary_per_row():
+    model = SummaryModel.fit(synthetic_rows(2000, seed=1), max_error=5.0)
+    fresh = synthetic_rows(2000, seed=2)
+
+    predictions = [model.predict(row) for row in fresh]
+    covered = [abs(row["summary_score"] - score) <= bound for row, (score, bound) in zip(fresh, predictions)]
+    assert np.mean(covered) >= 0.87
+
+    accepted = [model.score_row(row) is not None for row in fresh]
+    assert 0.1 < np.mean(accepted) < 0.9
+    strong = [row["experience_score"] >= 80 for row in fresh]
+    assert np.mean([a for a, s in zip(accepted, strong) if s]) > np.mean([a for a, s in zip(accepted, strong) if not s])
+
+
+def test_saved_model_round_trips(tmp_path):
+    model = SummaryModel.fit(synthetic_rows(200, seed=3))
+    path = str(tmp_path / "summary_model.npz")
+    model.save(path)
+
+    loaded = SummaryModel.load(path)
+    row = synthetic_rows(1, seed=4)[0]
+    assert loaded.fingerprint == model.fingerprint
+    assert loaded.predict(row) == model.predict(row)
+
+
+def test_models_saved_before_calibration_are_retrained(tmp_path):
+    path = str(tmp_path / "summary_model.npz")
+    np.savez(path, weights=np.zeros(11), mean=np.zeros(10), scale=np.ones(10), covariance=np.eye(11), sigma=3.0, n_rows=50)
+
+    assert SummaryModel.load(path) is None
+
+
+def test_spread_is_positive_and_rows_outside_the_training_range_fall_back():
+    model = SummaryModel.fit(synthetic_rows(500, seed=5), max_error=50.0)
+    assert all(model.predict(row)[1] > 0 for row in synthetic_rows(500, seed=6))
+
+    row = synthetic_rows(1, seed=7)[0]
+    assert model.score_row(row) is not None
+    row["experience_score"] = 0
+    assert model.predict(row)[1] == float("inf")
+    assert model.score_row(row) is None
@@ -0,0 +1,92 @@
+import pytest
+
+import jd_constraints
+import prompts
+import section_memo
+import tot_engine
+from llm_backends import FakeLLMBackend
+from metrics import collector as metrics
+from tot_engine import TOT_CATEGORIES, evaluate_resumes
+
+
+@pytest.fixture
+def llm_chains(monkeypatch):
+    """
+    Sends every chain step to the LLM (no local skills matching or location scoring, chain memo or pruning).
+    """
+    monkeypatch.setattr(jd_constraints, "PRUNE_UNCONSTRAINED_CHAINS", False)
+    monkeypatch.setattr(prompts, "LOCAL_SKILLS_MATCH", False)
+    monkeypatch.setattr(prompts, "LOCAL_LOCATION_SCORING", False)
+    monkeypatch.setattr(section_memo, "SECTION_MEMO", False)
+
+
+class InFlightBackend(FakeLLMBackend):
+    """
+    Fake backend that records how many requests were in flight at the same time.
+    """
+
+    def __init__(self):
+        super().__init__(latency=0.01)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def complete(self, *args, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            return await super().complete(*args, **kwargs)
+        finally:
+            self.in_flight -= 1
+
+
+def test_rows_come_back_in_input_order(resumes, job_description):
+    rows = evaluate_resumes(resumes, job_description)
+
+    assert [row["id"] for row in rows] == [1, 2, 3]
+    for row in rows:
+        for step in TOT_CATEGORIES + ["summary"]:
+            assert 20 <= row[f"{step}_score"] <= 95
+            assert row[f"{step}_note"]
+
+
+def test_category_chains_of_a_resume_run_concurrently(monkeypatch, llm_chains, resumes, job_description):
+    backend = InFlightBackend()
+    monkeypatch.setattr(prompts, "llm_backend", backend)
+
+    evaluate_resumes(resumes[:1], job_description, max_concurrency=1, distill_jd=False)
+
+    assert backend.calls == 3 * len(TOT_CATEGORIES) + 3
+    assert backend.max_in_flight == len(TOT_CATEGORIES)
+
+
+def test_resumes_in_flight_stay_under_the_limit(monkeypatch, llm_chains, resumes, job_description):
+    backend = InFlightBackend()
+    monkeypatch.setattr(prompts, "llm_backend", backend)
+
+    evaluate_resumes(resumes, job_description, max_concurrency=2, distill_jd=False)
+
+    assert backend.max_in_flight == 2 * len(TOT_CATEGORIES)
+
+
+def test_chain_sessions_share_one_system_prefix(offline, monkeypatch, resumes, job_description):
+    monkeypatch.setattr(tot_engine, "CHAIN_SESSIONS", True)
+    complete, stream, sent = offline.complete, offline.stream, []
+
+    def recording(send):
+        def request(model, messages, *args, **kwargs):
+            sent.append(messages)
+            return send(model, messages, *args, **kwargs)
+        return request
+
+    monkeypatch.setattr(offline, "complete", recording(complete))
+    monkeypatch.setattr(offline, "stream", recording(stream))
+
+    rows = evaluate_resumes(resumes, job_description)
+
+    assert all(row["summary_score"] is not None for row in rows)
+    assert {messages[0]["role"] for messages in sent} == {"system"}
+    assert len({messages[0]["content"] for messages in sent}) == 1
+    assert job_description in sent[0][0]["content"]
+    # Scoring steps continue the conversation of their chain
+    assert max(len(messages) for messages in sent) >= 6
+    assert metrics.summary()["totals"]["cached_prompt_tokens"] > 0
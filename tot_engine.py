@@ -0,0 +1,221 @@
+"""
+tot_engine.py
+
+Asynchronous execution engine for the Tree-of-Thought (ToT) evaluation. The six category chains of a resume run
+concurrently and the summary chain waits for their results; resumes run concurrently up to a configurable limit.
+`process_stream_async` does the same for a lazy resume iterator through a bounded queue.
+"""
+
+import asyncio
+from prompts import TOT_CHAINS, arun_category_chain, arun_chain_assess, arun_chain_extract, arun_summary_chain, arun_category_session, arun_summary_session, run_sync
+from jd_distill import adistill_job_description
+from summary_model import get_summary_model
+from section_memo import get_chain_memo
+from jd_constraints import pruned_chain_result
+from main_config import MAX_CONCURRENT_RESUMES, DISTILL_JOB_DESCRIPTION, CHAIN_SESSIONS
+
+TOT_CATEGORIES = list(TOT_CHAINS)
+
+
+async def evaluate_resume_async(resume, job_description, job_requirements=None, completed=None, on_step=None):
+    """
+    Evaluates one resume: runs the six category chains in parallel, then the summary chain.
+    If `job_requirements` (from `jd_distill`) is given, each chain receives only its own slice of the job description.
+
+    Args:
+        completed (dict | None): {category or 'summary': (score, note) or (score, note, details)} of steps already
+            done (e.g. replayed from a run journal); those steps are not run again.
+        on_step (Callable | None): Called with (category or 'summary', score, note, details) as soon as each step
+            finishes. `details` holds the step's logprob statistics with `LOGPROB_SCORING`, and
+            'summary_source': 'local' for summaries scored by the local summary model (else it is empty).
+
+    Returns:
+        dict: '<category>_score' / '<category>_note' for every category plus 'summary_score' / 'summary_note'
+            (and the '*_score_expected' / '*_score_entropy' details, if any).
+    """
+    completed = completed or {}
+
+    def completed_step(step):
+        score, note, *details = completed[step]
+        return score, note, details[0] if details else {}
+
+    def job_context(category):
+        return job_requirements[category] if job_requirements else job_description
+
+    async def run_chain(category):
+        details = {}
+        if CHAIN_SESSIONS:
+            score, note = await arun_category_session(category, resume, job_description, details)
+        else:
+            score, note = await arun_category_chain(category, resume, job_context(category), details)
+        return score, note, details
+
+    async def run_extract_keyed_chain(category, memo):
+        # Step 1 runs per resume; steps 2-3 are shared by every resume with the same canonical step 1 answer
+        step1_output = await arun_chain_extract(category, resume, job_context(category))
+
+        async def assess():
+            details = {}
+            score, note = await arun_chain_assess(category, step1_output, job_context(category), details)
+            return score, note, details
+
+        return await memo.arun(memo.extract_key(category, step1_output, job_context(category)), assess)
+
+    async def run_step(category):
+        if category in completed:
+            return completed_step(category)
+        pruned = pruned_chain_result(category, job_description)
+        memo = get_chain_memo()
+        memo_key = memo.key(category, resume, job_description if CHAIN_SESSIONS else job_context(category), CHAIN_SESSIONS) if memo and pruned is None else None
+        if pruned is not None:
+            score, note, details = *pruned, {}
+        elif memo_key is not None:
+            score, note, details = await memo.arun(memo_key, lambda: run_chain(category))
+        elif memo is not None and memo.extracts_first(category, CHAIN_SESSIONS):
+            score, note, details = await run_extract_keyed_chain(category, memo)
+        else:
+            score, note, details = await run_chain(category)
+        if on_step is not None:
+            on_step(category, score, note, details)
+        return score, note, details
+
+    chain_results = await asyncio.gather(*(run_step(category) for category in TOT_CATEGORIES))
+
+    row, step_details = {}, {}
+    for category, (score, note, details) in zip(TOT_CATEGORIES, chain_results):
+        row[f"{category}_score"] = score
+        row[f"{category}_note"] = note
+        step_details.update(details)
+
+    if "summary" in completed:
+        summary_score, summary_note, details = completed_step("summary")
+    else:
+        details = {}
+        summary_model = get_summary_model()
+        local_summary = summary_model.score_row(row) if summary_model is not None else None
+        if local_summary is not None:
+            summary_score, summary_note = local_summary
+            details["summary_source"] = "local"
+        elif CHAIN_SESSIONS:
+            summary_score, summary_note = await arun_summary_session(row, job_description, details)
+        else:
+            summary_score, summary_note = await arun_summary_chain(row, job_context("summary"), details)
+        if on_step is not None:
+            on_step("summary", summary_score, summary_note, details)
+    row["summary_score"] = summary_score
+    row["summary_note"] = summary_note
+    step_details.update(details)
+    return {**row, **step_details}
+
+
+async def evaluate_resume_with_id(resume_id, resume, job_description, job_requirements=None, completed=None, on_step=None):
+    """
+    Runs `evaluate_resume_async` and logs the outcome.
+
+    Returns:
+        dict | None: The result row with 'id', or None if the evaluation still failed after the scheduler's retries.
+    """
+    try:
+        row = await evaluate_resume_async(resume, job_description, job_requirements, completed, on_step)
+    except Exception as e:
+        # Keep the rest of the run; the resume stays unevaluated and is retried on the next run
+        print(f"[WARN] Resume #{resume_id} failed after retries and was skipped: {type(e).__name__}: {e}")
+        return None
+    print(f" Evaluated resume #{resume_id} - Experience Score: {row['experience_score']} & Summary Score: {row['summary_score']}")
+    return {"id": resume_id, **row}
+
+
+async def evaluate_resumes_async(resumes, job_description, max_concurrency=MAX_CONCURRENT_RESUMES, ids=None, distill_jd=DISTILL_JOB_DESCRIPTION, on_result=None,
+                                 completed=None, on_step=None):
+    """
+    Evaluates all resumes with at most `max_concurrency` resumes in flight at once.
+
+    Args:
+        resumes (list[dict]): Parsed resume dictionaries.
+        job_description (str): Job description string.
+        max_concurrency (int): Maximum number of resumes evaluated concurrently.
+        ids (list[int] | None): Result ids for the resumes. Defaults to position + 1.
+        distill_jd (bool): If True, distill the job description once and give each chain only its slice.
+        on_result (Callable | None): Called with each successful result row as soon as it is ready.
+        completed (list[dict | None] | None): Per resume, the steps already done (see `evaluate_resume_async`).
+        on_step (Callable | None): Called with (resume id, category or 'summary', score, note, details) after every step.
+
+    Returns:
+        list[dict | None]: One result row per resume (with 'id'), in input order. Resumes whose evaluation
+            still failed after the scheduler's retries are None.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    if ids is None:
+        ids = [i + 1 for i in range(len(resumes))]
+
+    # Chain sessions share the full job description instead of per-chain slices
+    job_requirements = await adistill_job_description(job_description) if distill_jd and not CHAIN_SESSIONS and resumes else None
+
+    if completed is None:
+        completed = [None] * len(resumes)
+
+    async def evaluate(resume_id, resume, done):
+        step_callback = None
+        if on_step is not None:
+            step_callback = lambda category, score, note, details: on_step(resume_id, category, score, note, details)
+        async with semaphore:
+            row = await evaluate_resume_with_id(resume_id, resume, job_description, job_requirements, done, step_callback)
+        if row is not None and on_result is not None:
+            on_result(row)
+        return row
+
+    return await asyncio.gather(*(evaluate(resume_id, resume, done) for resume_id, resume, done in zip(ids, resumes, completed)))
+
+
+async def process_stream_async(resumes, handle, max_concurrency=MAX_CONCURRENT_RESUMES, start_id=1):
+    """
+    Runs `await handle(resume_id, resume)` for every resume of an iterable with `max_concurrency` workers.
+
+    The iterable is read on a worker thread (parsing a file must not block the event loop) into a queue of
+    `max_concurrency` slots; the reader waits whenever the queue is full, so memory stays flat however long
+    the input is.
+
+    Args:
+        resumes (Iterable[dict]): Resume dictionaries, typically a generator.
+        handle (Callable): Coroutine function called with (resume id, resume).
+        max_concurrency (int): Number of workers, i.e. resumes handled at once.
+        start_id (int): Id of the first resume; ids count up in input order.
+
+    Returns:
+        int: Number of resumes read.
+    """
+    queue = asyncio.Queue(maxsize=max_concurrency)
+    iterator = iter(resumes)
+    end = object()
+    read = 0
+
+    async def produce():
+        nonlocal read
+        try:
+            while True:
+                resume = await asyncio.to_thread(next, iterator, end)
+                if resume is end:
+                    break
+                await queue.put((start_id + read, resume))
+                read += 1
+        finally:
+            for _ in range(max_concurrency):
+                await queue.put(None)
+
+    async def work():
+        while (item := await queue.get()) is not None:
+            await handle(*item)
+
+    await asyncio.gather(produce(), *(work() for _ in range(max_concurrency)))
+    return read
+
+
+def evaluate_resumes(resumes, job_description, max_concurrency=MAX_CONCURRENT_RESUMES, ids=None, distill_jd=DISTILL_JOB_DESCRIPTION, on_result=None,
+                     completed=None, on_step=None):
+    """
+    Synchronous entry point for `evaluate_resumes_async`, usable from scripts and notebooks.
+    """
+    return run_sync(evaluate_resumes_async(
+        resumes, job_description, max_concurrency=max_concurrency, ids=ids, distill_jd=distill_jd,
+        on_result=on_result, completed=completed, on_step=on_step
+    ))